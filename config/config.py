@@ -18,7 +18,161 @@ class Config:
     VIDEO_PATH = STORAGE_PATH / 'video'
     SNAPSHOTS_PATH = STORAGE_PATH / 'snapshots'
 
+    ARCHIVE_PATH = STORAGE_PATH / 'archive'
+
+    # Camera snapshots (see services/vision_service.py)
+    CAMERA_SOURCE = os.getenv('CAMERA_SOURCE', '0')  # camera index or a video file path
+    CAPTURE_SAMPLE_FPS = float(os.getenv('CAPTURE_SAMPLE_FPS', '2.0'))
+    # Sampled frames whose 64-bit difference hash is within this many bits of the last kept one are skipped
+    SNAPSHOT_DEDUP_DISTANCE = int(os.getenv('SNAPSHOT_DEDUP_DISTANCE', '6'))
+    SNAPSHOT_JPEG_QUALITY = int(os.getenv('SNAPSHOT_JPEG_QUALITY', '85'))
+    SNAPSHOT_QUEUE_SIZE = int(os.getenv('SNAPSHOT_QUEUE_SIZE', '32'))
+
+    # Face identification (OpenCV Zoo YuNet detector + SFace recognizer, see README)
+    MODELS_PATH = Path(os.getenv('MODELS_PATH', PROJECT_ROOT / 'models'))
+    FACE_DETECTION_MODEL = MODELS_PATH / 'face_detection_yunet_2023mar.onnx'
+    FACE_RECOGNITION_MODEL = MODELS_PATH / 'face_recognition_sface_2021dec.onnx'
+    FACE_DETECTION_THRESHOLD = float(os.getenv('FACE_DETECTION_THRESHOLD', '0.9'))
+    # SFace cosine-similarity threshold for a match (OpenCV's recommended value)
+    FACE_MATCH_THRESHOLD = float(os.getenv('FACE_MATCH_THRESHOLD', '0.363'))
+    FACE_WORKERS = int(os.getenv('FACE_WORKERS', '0'))  # 0 = CPU count
+    FACE_BATCH_SIZE = int(os.getenv('FACE_BATCH_SIZE', '8'))
+
+    # Audio archival: finished recordings are transcoded and sharded into AUDIO_PATH/YYYY/MM/DD
+    AUDIO_ARCHIVE_CODEC = os.getenv('AUDIO_ARCHIVE_CODEC', 'flac')  # 'flac' or 'opus'
+    AUDIO_ARCHIVE_INTERVAL_SECONDS = int(os.getenv('AUDIO_ARCHIVE_INTERVAL_SECONDS', '300'))
+    # Well above the longest turn (transcription, admission waits, reply and TTS before the row is written)
+    AUDIO_ARCHIVE_MIN_AGE_SECONDS = int(os.getenv('AUDIO_ARCHIVE_MIN_AGE_SECONDS', '900'))
+    AUDIO_RETENTION_DAYS = int(os.getenv('AUDIO_RETENTION_DAYS', '0'))  # 0 = keep forever
+    AUDIO_MAX_STORAGE_MB = int(os.getenv('AUDIO_MAX_STORAGE_MB', '0'))  # 0 = no size cap
+
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # 'text' or 'json'
+    LOG_FILE = os.getenv('LOG_FILE') or None
+
+    # Per-stage latency tracing (see services/tracing_service.py)
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'true').lower() == 'true'
+    TRACE_LOG_PATH = Path(os.getenv('TRACE_LOG_PATH', STORAGE_PATH / 'traces' / 'spans.jsonl'))
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # 0 = no Prometheus endpoint
+
+    # Monthly conversation partitions (see scripts/manage_partitions.py)
+    PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+    # Detach (archive and drop) partitions older than this (0 = keep everything)
+    PARTITION_RETENTION_MONTHS = int(os.getenv('PARTITION_RETENTION_MONTHS', '0'))
+    # History reads only look back this far, so the planner can skip older partitions (0 = no limit)
+    HISTORY_WINDOW_DAYS = int(os.getenv('HISTORY_WINDOW_DAYS', '0'))
+    # Context tokens for the prompt, past turns and the current input, with or without retrieval
+    # (0 = no budget: up to 1000 turns, or the recent and relevant turns with retrieval)
+    HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', '1536'))
+    # Older turns matching the current input by full-text search, added to the history (0 = off)
+    HISTORY_SEARCH_RESULTS = int(os.getenv('HISTORY_SEARCH_RESULTS', '3'))
+    # Minimum ts_rank_cd of those matches: 1.0 per query word the user said, 0.4 per word in a reply (0 = any match)
+    HISTORY_SEARCH_MIN_RANK = float(os.getenv('HISTORY_SEARCH_MIN_RANK', '2.0'))
+
+    WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
+    # Pinned language skips auto-detection on every call (empty = detect)
+    WHISPER_LANGUAGE = os.getenv('WHISPER_LANGUAGE', 'en')
+    # Default decoding profile (auth, conversation, archive - see services/transcription_service.py)
+    WHISPER_PROFILE = os.getenv('WHISPER_PROFILE', 'conversation')
+    # torch intra-op threads for interactive profiles (0 = one per WHISPER_CPU_CORES core, else torch default)
+    WHISPER_THREADS = int(os.getenv('WHISPER_THREADS', '0'))
+    # torch intra-op threads for the archive profile (0 = torch default, usually one per physical core)
+    WHISPER_ARCHIVE_THREADS = int(os.getenv('WHISPER_ARCHIVE_THREADS', '0'))
+
+    # Speech synthesis: 'pyttsx3' (system voices) or 'piper' (neural, pip install piper-tts==1.2.0)
+    TTS_BACKEND = os.getenv('TTS_BACKEND', 'pyttsx3')
+    PIPER_VOICE = MODELS_PATH / os.getenv('PIPER_VOICE', 'en_US-lessac-medium.onnx')
+    # Sentences synthesized ahead of the one playing, and threads synthesizing them
+    TTS_LOOKAHEAD_SENTENCES = int(os.getenv('TTS_LOOKAHEAD_SENTENCES', '1'))
+    TTS_SYNTH_WORKERS = int(os.getenv('TTS_SYNTH_WORKERS', '2'))
+
+    # CPU partitioning between pipeline stages (services/resource_scheduler.py): core lists in
+    # taskset format, e.g. "0-3" (empty = no pinning). Ollama is a separate process - start it
+    # with `taskset -c <OLLAMA_CPU_CORES> ollama serve`; its thread count is sent per request.
+    WHISPER_CPU_CORES = os.getenv('WHISPER_CPU_CORES', '')
+    OLLAMA_CPU_CORES = os.getenv('OLLAMA_CPU_CORES', '')
+    TTS_CPU_CORES = os.getenv('TTS_CPU_CORES', '')
+    OLLAMA_NUM_THREAD = int(os.getenv('OLLAMA_NUM_THREAD', '0'))  # 0 = one per OLLAMA_CPU_CORES core
+    WHISPER_MAX_CONCURRENT = int(os.getenv('WHISPER_MAX_CONCURRENT', '1'))  # 0 = unlimited
+
+    # Admission control in front of Whisper and the LLM (services/admission_service.py):
+    # logins go first, then conversation turns
+    LLM_MAX_CONCURRENT = int(os.getenv('LLM_MAX_CONCURRENT', '1'))  # match Ollama's OLLAMA_NUM_PARALLEL; 0 = unlimited
+    ADMISSION_QUEUE_AUTH = int(os.getenv('ADMISSION_QUEUE_AUTH', '32'))
+    ADMISSION_QUEUE_INTERACTIVE = int(os.getenv('ADMISSION_QUEUE_INTERACTIVE', '8'))
+    # Queued sessions hear "one moment please" after this long and give up after the maximum (0 = never)
+    ADMISSION_BACKPRESSURE_SECONDS = float(os.getenv('ADMISSION_BACKPRESSURE_SECONDS', '1.5'))
+    ADMISSION_MAX_WAIT_SECONDS = float(os.getenv('ADMISSION_MAX_WAIT_SECONDS', '30'))
+
+    # Session worker processes forked from a supervisor that preloaded Whisper (services/worker_supervisor.py)
+    SUPERVISOR_WORKERS = int(os.getenv('SUPERVISOR_WORKERS', '2'))
+    WORKER_HEARTBEAT_SECONDS = float(os.getenv('WORKER_HEARTBEAT_SECONDS', '2'))
+    # Longer than the slowest step between heartbeat() calls (an LLM reply on CPU)
+    WORKER_HEARTBEAT_TIMEOUT = float(os.getenv('WORKER_HEARTBEAT_TIMEOUT', '120'))
+    # Crashed workers are restarted after a delay that doubles per consecutive crash
+    WORKER_RESTART_BACKOFF_SECONDS = float(os.getenv('WORKER_RESTART_BACKOFF_SECONDS', '1'))
+    WORKER_RESTART_BACKOFF_MAX = float(os.getenv('WORKER_RESTART_BACKOFF_MAX', '60'))
+
+    # Microphone capture: the device is opened at its native rate/channels (0 = device default)
+    # and converted to 16 kHz mono by services/audio_frontend.py
+    AUDIO_DEVICE_RATE = int(os.getenv('AUDIO_DEVICE_RATE', '0'))
+    AUDIO_DEVICE_CHANNELS = int(os.getenv('AUDIO_DEVICE_CHANNELS', '0'))
+    AUDIO_BLOCK_MS = int(os.getenv('AUDIO_BLOCK_MS', '64'))
+    AUDIO_NOISE_GATE = os.getenv('AUDIO_NOISE_GATE', 'true').lower() == 'true'
+    AUDIO_TARGET_DBFS = float(os.getenv('AUDIO_TARGET_DBFS', '-20'))
+    AUDIO_MAX_GAIN_DB = float(os.getenv('AUDIO_MAX_GAIN_DB', '20'))
+
+    # 'manual' waits for ENTER before each recording; 'wake_word' listens continuously
+    TRIGGER_MODE = os.getenv('TRIGGER_MODE', 'manual')
+    # Voice activity detection: utterances are recorded from speech onset until this much silence
+    VAD_THRESHOLD_DB = float(os.getenv('VAD_THRESHOLD_DB', '12'))
+    VAD_PREROLL_MS = int(os.getenv('VAD_PREROLL_MS', '300'))
+    VAD_END_SILENCE_MS = int(os.getenv('VAD_END_SILENCE_MS', '800'))
+    VAD_MAX_UTTERANCE_SECONDS = float(os.getenv('VAD_MAX_UTTERANCE_SECONDS', '15'))
+    VAD_START_TIMEOUT_SECONDS = float(os.getenv('VAD_START_TIMEOUT_SECONDS', '10'))
+    # Wake word templates are recorded with scripts/enroll_wake_word.py
+    WAKE_WORD_TEMPLATES = Path(os.getenv('WAKE_WORD_TEMPLATES', STORAGE_PATH / 'wake_word' / 'templates.npz'))
+    WAKE_WORD_THRESHOLD = float(os.getenv('WAKE_WORD_THRESHOLD', '0'))  # 0 = threshold calibrated at enrollment
+    WAKE_WORD_END_SILENCE_MS = int(os.getenv('WAKE_WORD_END_SILENCE_MS', '300'))
+    WAKE_WORD_MAX_SECONDS = float(os.getenv('WAKE_WORD_MAX_SECONDS', '2.5'))
+    # In wake word mode a session ends after this many turns in a row with no speech
+    SESSION_IDLE_TURNS = int(os.getenv('SESSION_IDLE_TURNS', '3'))
+
+    # WebSocket audio gateway for remote clients (scripts/run_gateway.py)
+    GATEWAY_HOST = os.getenv('GATEWAY_HOST', '127.0.0.1')
+    GATEWAY_PORT = int(os.getenv('GATEWAY_PORT', '8765'))
+    GATEWAY_MAX_SESSIONS = int(os.getenv('GATEWAY_MAX_SESSIONS', '8'))  # per gateway process
+    # Synthesized speech sent ahead of the client's playback acknowledgements
+    GATEWAY_PLAYBACK_WINDOW_MS = int(os.getenv('GATEWAY_PLAYBACK_WINDOW_MS', '1000'))
+    # Client audio buffered while a session is busy elsewhere (oldest is dropped beyond this)
+    GATEWAY_MAX_BUFFER_SECONDS = float(os.getenv('GATEWAY_MAX_BUFFER_SECONDS', '20'))
+
+    # Voice login: the user-ID utterance doubles as a speaker check (password is the fallback).
+    # Off by default: the MFCC-statistics embedding does not reliably tell voices apart
+    # (see services/speaker_service.py), so it replaces the password with a weak check
+    VOICE_LOGIN_ENABLED = os.getenv('VOICE_LOGIN_ENABLED', 'false').lower() == 'true'
+    SPEAKER_VERIFY_THRESHOLD = float(os.getenv('SPEAKER_VERIFY_THRESHOLD', '0.90'))
+    # Identifying a speaker without a spoken ID needs a higher score and a clear winner
+    SPEAKER_IDENTIFY_THRESHOLD = float(os.getenv('SPEAKER_IDENTIFY_THRESHOLD', '0.95'))
+    SPEAKER_IDENTIFY_MARGIN = float(os.getenv('SPEAKER_IDENTIFY_MARGIN', '0.03'))
+    # Enrolled voice/face embeddings are kept in memory; snapshots make startup a memory map
+    EMBEDDING_INDEX_PATH = STORAGE_PATH / 'index'
+    EMBEDDING_INDEX_SNAPSHOT = os.getenv('EMBEDDING_INDEX_SNAPSHOT', 'true').lower() == 'true'
+
+    OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+
+    # LLM routing: trivial turns go to the small model, everything else to the large one.
+    # Leave LLM_SMALL_MODEL empty to send every turn to LLM_MODEL.
+    LLM_MODEL = os.getenv('LLM_MODEL', 'llama3.1:8b')
+    LLM_SMALL_MODEL = os.getenv('LLM_SMALL_MODEL', 'llama3.2:1b')
+    LLM_ROUTE_MAX_WORDS = int(os.getenv('LLM_ROUTE_MAX_WORDS', '12'))
+
+    # Semantic retrieval over past conversations
+    EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'nomic-embed-text')
+    RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '5'))
+    RETRIEVAL_RECENT_TURNS = int(os.getenv('RETRIEVAL_RECENT_TURNS', '6'))
+    # Users with at least this many embedded turns are searched with the approximate index
+    RETRIEVAL_ANN_THRESHOLD = int(os.getenv('RETRIEVAL_ANN_THRESHOLD', '5000'))
 
     @classmethod
     def get_database_url(cls):
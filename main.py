@@ -7,16 +7,43 @@ from services.database_service import DatabaseService
 from services.auth_service import AuthService
 from services.llm_service import LLMService
 from services.tts_service import TTSService
+from services.speaker_service import SpeakerService
+from services.enrolled_index_service import EnrolledIndexService
+from services.wake_word_service import WakeWordService
+from services.embedding_service import pack_embedding
+from services.retrieval_service import RetrievalService
+from services.audio_archive_service import AudioArchiveService
+from services.tracing_service import tracer
+from services.resource_scheduler import resources
+from services.admission_service import BACKPRESSURE_MESSAGE, Overloaded
+from services.logging_service import setup_logging, bind_context
+from config.config import config
 from services.conversation_service import parse_user_id, is_exit_command, build_conversation_history
 
 
-def authenticate_user(audio: AudioService, db: DatabaseService, auth: AuthService, tts: TTSService) -> int:
+def authenticate_user(audio: AudioService, db: DatabaseService, auth: AuthService, tts: TTSService,
+                      speaker: SpeakerService = None, voice_index: EnrolledIndexService = None,
+                      prompt=input, max_idle_turns: int = 0) -> int:
     """
     Handle user authentication flow (new or existing user)
 
+    With a speaker service, the user-ID utterance is also checked against
+    the user's enrolled voice, so a recognised voice logs in without a
+    password. Users are enrolled from their ID utterance on registration
+    or on their first password login.
+
+    Args:
+        speaker: Speaker service for voice login (optional)
+        voice_index: In-memory index of enrolled voices (required with speaker)
+        prompt: Called with a message before each recording (default: wait for ENTER)
+        max_idle_turns: Give up after this many password attempts in a row with no speech (0 = never)
+
     Returns:
         user_id (int) on success, None on failure
     """
+    def hold_on():
+        tts.speak(BACKPRESSURE_MESSAGE)
+
     print("\n" + "=" * 50)
     print("🔐 AUTHENTICATION")
     print("=" * 50)
@@ -24,24 +51,36 @@ def authenticate_user(audio: AudioService, db: DatabaseService, auth: AuthServic
     # Step 1: Get user ID
     max_attempts = 3
     user_id = None
+    voice = None
 
     for attempt in range(1, max_attempts + 1):
         tts.speak("Please state your four digit user I D")
         print("\n🎤 Listening for user ID...")
-        input("Press ENTER when ready to speak your user ID (5 seconds)...")
+        prompt("Press ENTER when ready to speak your user ID (5 seconds)...")
 
-        result = audio.record_and_transcribe(duration=5)
+        result = audio.record_and_transcribe(duration=5, profile='auth', on_wait=hold_on)
         transcription = result['text']
 
         print(f"📝 You said: '{transcription}'")
 
         # Parse user ID
         user_id = parse_user_id(transcription)
+        # With endpointing, silence comes back with no recording at all
+        heard = result['audio_path'] and transcription.strip()
+        voice = speaker.embed(result['audio_path']) if speaker and heard else None
 
         if user_id:
             print(f"✅ Parsed user ID: {user_id}")
             break
-        else:
+
+        # No ID heard - try to recognise the voice among enrolled users
+        if voice is not None:
+            user_id, score = speaker.identify(voice, voice_index)
+            if user_id:
+                print(f"✅ Recognised voice as user {user_id} (score {score:.2f})")
+                break
+
+        if not user_id:
             print(f"⚠️  Could not parse user ID (attempt {attempt}/{max_attempts})")
             if attempt < max_attempts:
                 tts.speak("I didn't catch that. Please try again.")
@@ -55,19 +94,36 @@ def authenticate_user(audio: AudioService, db: DatabaseService, auth: AuthServic
     user_exists = auth.user_exists(user_id)
 
     if user_exists:
-        # Existing user - login flow
+        # Existing user - voice login from the ID utterance
+        enrolled = voice_index.get(user_id) if voice is not None else None
+        if enrolled is not None:
+            accepted, score = speaker.verify(voice, enrolled)
+            if accepted:
+                print(f"✅ Voice recognised (score {score:.2f})")
+                db.update_user_last_seen(user_id)
+                tts.speak(f"Welcome back, User {user_id}.")
+                return user_id
+            print(f"⚠️  Voice not recognised (score {score:.2f}). Falling back to password.")
+
+        # Password login
         print(f"\n👤 User {user_id} found. Verifying password...")
         tts.speak(f"User {user_id} found. Please state your password.")
 
         # Allow unlimited password attempts (as requested)
+        idle_turns = 0
         while True:
             print("\n🎤 Listening for password...")
-            input("Press ENTER when ready to speak your password (5 seconds)...")
+            prompt("Press ENTER when ready to speak your password (5 seconds)...")
 
-            result = audio.record_and_transcribe(duration=5)
+            result = audio.record_and_transcribe(duration=5, profile='auth', on_wait=hold_on)
             password = result['text'].strip()
 
             if not password:
+                idle_turns += 1
+                if max_idle_turns and idle_turns >= max_idle_turns:
+                    print("❌ No password detected. Giving up.")
+                    tts.speak("Authentication failed. Goodbye.")
+                    return None
                 print("⚠️  No password detected. Try again.")
                 tts.speak("I didn't hear anything. Please try again.")
                 continue
@@ -77,6 +133,9 @@ def authenticate_user(audio: AudioService, db: DatabaseService, auth: AuthServic
             # Verify password
             if auth.verify_user(user_id, password):
                 print(f"✅ Authentication successful!")
+                if voice is not None and enrolled is None and auth.set_voice_embedding(user_id, voice):
+                    voice_index.upsert(user_id, voice)
+                    print("🗣️  Voice enrolled for next time")
                 tts.speak(f"Welcome back, User {user_id}.")
                 return user_id
             else:
@@ -89,9 +148,9 @@ def authenticate_user(audio: AudioService, db: DatabaseService, auth: AuthServic
         tts.speak(f"User {user_id} is new. Please create a password.")
 
         print("\n🎤 Listening for password...")
-        input("Press ENTER when ready to speak your password (5 seconds)...")
+        prompt("Press ENTER when ready to speak your password (5 seconds)...")
 
-        result = audio.record_and_transcribe(duration=5)
+        result = audio.record_and_transcribe(duration=5, profile='auth', on_wait=hold_on)
         password = result['text'].strip()
 
         if not password:
@@ -104,6 +163,9 @@ def authenticate_user(audio: AudioService, db: DatabaseService, auth: AuthServic
         # Register user
         if auth.register_user(user_id, password):
             print(f"✅ Account created successfully!")
+            if voice is not None and auth.set_voice_embedding(user_id, voice):
+                voice_index.upsert(user_id, voice)
+                print("🗣️  Voice enrolled")
             tts.speak(f"Account created. Welcome, User {user_id}.")
             return user_id
         else:
@@ -112,7 +174,9 @@ def authenticate_user(audio: AudioService, db: DatabaseService, auth: AuthServic
             return None
 
 
-def conversation_session(user_id: int, audio: AudioService, db: DatabaseService, llm: LLMService, tts: TTSService):
+def conversation_session(user_id: int, audio: AudioService, db: DatabaseService, llm: LLMService, tts: TTSService,
+                         retrieval: RetrievalService = None, prompt=input, trigger_type: str = 'manual',
+                         max_idle_turns: int = 0):
     """
     Run multi-turn conversation loop after authentication
 
@@ -122,7 +186,14 @@ def conversation_session(user_id: int, audio: AudioService, db: DatabaseService,
         db: Database service for storing conversations
         llm: LLM service for generating responses
         tts: TTS service for speaking responses
+        retrieval: Retrieval service for relevant past turns (optional)
+        prompt: Called with a message before each recording (default: wait for ENTER)
+        trigger_type: Stored on each conversation ('manual', 'wake_word' or 'remote')
+        max_idle_turns: End the session after this many turns in a row with no speech (0 = never)
     """
+    def hold_on():
+        tts.speak(BACKPRESSURE_MESSAGE)
+
     print("\n" + "=" * 50)
     print(f"💬 CONVERSATION SESSION - User {user_id}")
     print("=" * 50)
@@ -131,19 +202,31 @@ def conversation_session(user_id: int, audio: AudioService, db: DatabaseService,
     tts.speak("How can I help you?")
 
     # Conversation loop
+    idle_turns = 0
     while True:
         print("\n🎤 Listening...")
-        input("Press ENTER when ready to speak (5 seconds)...")
+        prompt("Press ENTER when ready to speak (5 seconds)...")
 
         # Record and transcribe user input
-        result = audio.record_and_transcribe(duration=5)
+        try:
+            result = audio.record_and_transcribe(duration=5, on_wait=hold_on)
+        except Overloaded:
+            print("⚠️  Transcription turned away (overloaded)")
+            tts.speak("Sorry, I'm overloaded and missed that. Please try again in a moment.")
+            continue
         user_input = result['text'].strip()
         audio_path = result['audio_path']
 
         if not user_input:
+            idle_turns += 1
+            if max_idle_turns and idle_turns >= max_idle_turns:
+                print(f"\n💤 No input - ending session for User {user_id}")
+                tts.speak(f"Goodbye, User {user_id}.")
+                break
             print("⚠️  No input detected. Try again.")
             tts.speak("I didn't hear anything. Please try again.")
             continue
+        idle_turns = 0
 
         print(f"💬 You: {user_input}")
 
@@ -153,63 +236,145 @@ def conversation_session(user_id: int, audio: AudioService, db: DatabaseService,
             tts.speak(f"Goodbye, User {user_id}.")
             break
 
-        # Build conversation history with full context
+        # Build conversation history (recent turns plus relevant past ones)
         print("🤖 Generating response...")
-        conversation_history = build_conversation_history(db, user_id, user_input)
+        conversation_history = build_conversation_history(db, user_id, user_input, retrieval)
 
         # Generate AI response
-        ai_response = llm.generate_response(user_input, conversation_history)
+        try:
+            ai_response = llm.generate_response(user_input, conversation_history, on_wait=hold_on)
+        except Overloaded:
+            print("⚠️  Response turned away (overloaded)")
+            tts.speak("Sorry, I'm too busy to answer right now. Please ask again in a moment.")
+            continue
 
         print(f"🤖 AI: {ai_response}\n")
 
         # Speak response
         tts.speak(ai_response)
 
-        # Save conversation to database
+        # Save conversation to database (with its embedding for later retrieval)
         try:
+            embedding = retrieval.embedder.embed_turn(user_input, ai_response) if retrieval else None
             conv_id = db.create_conversation(
                 user_id=user_id,
                 user_input=user_input,
                 ai_response=ai_response,
-                audio_path=audio_path
+                audio_path=audio_path,
+                embedding=pack_embedding(embedding) if embedding is not None else None,
+                embedding_model=retrieval.embedder.model_name if retrieval else None,
+                trigger_type=trigger_type
             )
             print(f"💾 Conversation saved (ID: {conv_id})")
+            if retrieval:
+                retrieval.add_to_index(user_id, conv_id, embedding)
         except Exception as e:
             print(f"⚠️  Failed to save conversation: {e}")
 
 
+def listen_prompt(message: str):
+    """Prompt for wake word mode: recording starts when speech does, so there is nothing to wait for"""
+
+
+def run_session(audio: AudioService, db: DatabaseService, auth: AuthService, llm: LLMService, tts: TTSService,
+                speaker: SpeakerService, voice_index: EnrolledIndexService, retrieval: RetrievalService,
+                trigger_type: str, prompt=input) -> bool:
+    """
+    Authenticate one user and run their conversation
+
+    Returns:
+        False if authentication failed
+    """
+    session_id = tracer.start_session()
+    bind_context(session_id=session_id, user_id='-')
+    # Unattended sessions end when nobody talks; a manual session has someone at the keyboard
+    max_idle_turns = config.SESSION_IDLE_TURNS if trigger_type != 'manual' else 0
+
+    # Authentication phase
+    try:
+        user_id = authenticate_user(audio, db, auth, tts, speaker, voice_index, prompt=prompt,
+                                    max_idle_turns=max_idle_turns)
+    except Overloaded:
+        print("❌ Login turned away (overloaded)")
+        tts.speak("The system is busy right now. Please try again later.")
+        user_id = None
+    if not user_id:
+        tracer.end_session()
+        return False
+
+    # Conversation phase
+    bind_context(user_id=user_id)
+    conversation_session(user_id, audio, db, llm, tts, retrieval, prompt=prompt, trigger_type=trigger_type,
+                         max_idle_turns=max_idle_turns)
+
+    # Per-route LLM latency so far
+    for route, stats in llm.get_route_stats().items():
+        if stats['count']:
+            print(f"⏱️  LLM {route} route: {stats['count']} turns, avg {stats['avg_seconds']:.2f}s, max {stats['max_seconds']:.2f}s")
+
+    # Stages competing for CPU (see services/resource_scheduler.py)
+    for stage, stats in resources.contention().items():
+        if stats['overlapped']:
+            print(f"⏱️  {stage}: {stats['runs']} runs, {stats['overlapped']:.0%} overlapped another stage, "
+                  f"p95 CPU wait {stats['runqueue_p95']:.3f}s, p95 queue {stats['queue_p95']:.3f}s")
+
+    # Where this session's time went
+    print(f"\n⏱️  Stage latency (session {session_id}):")
+    print(tracer.format_summary(session_id))
+    tracer.end_session()
+    return True
+
+
 def main():
     print("=" * 50)
     print("🎤 CONVERSATIONALIST AI")
     print("=" * 50)
     print()
 
+    setup_logging()
+    if config.METRICS_PORT:
+        tracer.start_http_server()
+    wake_word_mode = config.TRIGGER_MODE == 'wake_word'
+
     # Initialize all services
     print("🔧 Initializing services...")
-    audio = AudioService()
+    audio = AudioService(endpointing=wake_word_mode)
     db = DatabaseService()
     auth = AuthService()
     llm = LLMService()
     tts = TTSService()
+    speaker = voice_index = None
+    if config.VOICE_LOGIN_ENABLED:
+        speaker = SpeakerService()
+        voice_index = EnrolledIndexService('voice_embedding').start()
+    retrieval = RetrievalService(db)
+    archiver = AudioArchiveService()
+    archiver.start()
+    wake = WakeWordService(audio) if wake_word_mode else None
     print("✅ All services initialized\n")
 
-    # Authentication phase
-    user_id = authenticate_user(audio, db, auth, tts)
-
-    if not user_id:
-        print("\n❌ Authentication failed. Exiting.")
-        # Cleanup
-        tts.cleanup()
-        audio.cleanup()
-        auth.close()
-        db.close()
-        return
-
-    # Conversation phase
-    conversation_session(user_id, audio, db, llm, tts)
+    services = (audio, db, auth, llm, tts, speaker, voice_index, retrieval)
+    try:
+        if wake:
+            # Unattended: only the VAD and keyword spotter run until someone says the wake word
+            while True:
+                print("\n👂 Listening for the wake word (Ctrl+C to quit)...")
+                if not wake.wait_for_wake_word():
+                    break
+                print("🔔 Wake word detected")
+                if not run_session(*services, trigger_type='wake_word', prompt=listen_prompt):
+                    print("\n❌ Authentication failed.")
+        elif not run_session(*services, trigger_type='manual'):
+            print("\n❌ Authentication failed. Exiting.")
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopped")
 
     # Cleanup
     print("\n🧹 Cleaning up...")
+    tracer.shutdown()
+    archiver.stop()
+    if voice_index:
+        voice_index.stop()
     tts.cleanup()
     audio.cleanup()
     auth.close()
@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.audio_archive_service import AudioArchiveService
+
+
+def main():
+    print("=" * 50)
+    print("🗜️  ARCHIVING RECORDED AUDIO")
+    print("=" * 50)
+
+    archiver = AudioArchiveService()
+    archived = archiver.run_once()
+    archiver.stop()
+
+    print(f"\n✅ Archive run complete: {archived} recordings archived")
+
+
+if __name__ == "__main__":
+    main()
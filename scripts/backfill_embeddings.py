@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.database_service import DatabaseService
+from services.embedding_service import EmbeddingService, pack_embedding
+
+
+def main():
+    print("=" * 50)
+    print("🧭 BACKFILLING CONVERSATION EMBEDDINGS")
+    print("=" * 50)
+
+    db = DatabaseService()
+    embedder = EmbeddingService()
+
+    embedded = 0
+    skipped = 0
+    after = None
+
+    while True:
+        batch = db.get_conversations_without_embedding(limit=100, after=after, model_name=embedder.model_name)
+        if not batch:
+            break
+
+        for conv in batch:
+            embedding = embedder.embed_turn(conv['user_input'] or '', conv['ai_response'])
+            if embedding is None:
+                skipped += 1
+                continue
+            db.update_conversation_embedding(str(conv['id']), pack_embedding(embedding), embedder.model_name)
+            embedded += 1
+
+        after = (batch[-1]['timestamp'], batch[-1]['id'])
+        print(f"   ✓ {embedded} embedded, {skipped} skipped")
+
+    print(f"\n✅ Backfill complete: {embedded} embedded, {skipped} skipped")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
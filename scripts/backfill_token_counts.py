@@ -0,0 +1,42 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.database_service import DatabaseService
+from services.token_counter import estimate_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store token counts for conversations saved before they were tracked")
+    parser.add_argument('--batch-size', type=int, default=1000, help="rows per UPDATE")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("🔢 BACKFILLING CONVERSATION TOKEN COUNTS")
+    print("=" * 50)
+
+    db = DatabaseService()
+
+    updated = 0
+    after = None
+
+    while True:
+        batch = db.get_conversations_without_token_counts(limit=args.batch_size, after=after)
+        if not batch:
+            break
+
+        updated += db.update_token_counts([
+            (conv['id'], conv['timestamp'], estimate_tokens(conv['user_input']), estimate_tokens(conv['ai_response']))
+            for conv in batch
+        ])
+
+        after = (batch[-1]['timestamp'], batch[-1]['id'])
+        print(f"   ✓ {updated} updated")
+
+    print(f"\n✅ Backfill complete: {updated} updated")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator, List, Set, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.database_service import DatabaseService
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.opus')
+
+# Loaded once per worker process by _init_worker
+_transcriber = None
+_profile = None
+
+
+def _init_worker(model_name: str, profile: str):
+    global _transcriber, _profile
+    # One intra-op thread per process; the pool provides the parallelism
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    from services.transcription_service import TranscriptionService
+    _transcriber = TranscriptionService(model_name)
+    _profile = profile
+
+
+def _transcribe(path: str) -> Tuple[str, str]:
+    return path, _transcriber.transcribe(path, _profile, threads=1)
+
+
+def load_checkpoint(checkpoint: Path, retry_failed: bool) -> Set[str]:
+    """Paths already handled by a previous run (failures too unless retrying)"""
+    done = set()
+    if not checkpoint.exists():
+        return done
+    with open(checkpoint) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line from an interrupted run
+                continue
+            if entry.get('status') == 'ok' or not retry_failed:
+                done.add(entry['path'])
+            else:
+                done.discard(entry['path'])
+    return done
+
+
+def iter_recordings(root: Path, done: Set[str]) -> Iterator[str]:
+    """Stream recording paths under root without listing the whole tree first"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.endswith(AUDIO_EXTENSIONS):
+                path = os.path.join(dirpath, name)
+                if path not in done:
+                    yield path
+
+
+class Checkpoint:
+    """Append-only JSONL log of finished paths, fsynced after each flush"""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(path, 'a')
+
+    def write(self, entries: List[dict]):
+        for entry in entries:
+            self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-transcribe archived recordings and update conversations")
+    parser.add_argument('--model', default=config.WHISPER_MODEL, help="Whisper model to transcribe with")
+    parser.add_argument('--profile', default='archive', choices=['auth', 'conversation', 'archive'],
+                        help="Whisper decoding profile")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--root', type=Path, default=Path(config.AUDIO_PATH), help="directory to scan")
+    parser.add_argument('--checkpoint', type=Path, help="progress file (default: <root>/transcribe_<model>.jsonl)")
+    parser.add_argument('--batch-size', type=int, default=50, help="results per database write")
+    parser.add_argument('--retry-failed', action='store_true', help="retry files that failed in a previous run")
+    parser.add_argument('--dry-run', action='store_true', help="transcribe and print without writing")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or args.root / f"transcribe_{args.model}.jsonl"
+
+    print("=" * 50)
+    print("📝 BATCH TRANSCRIPTION")
+    print("=" * 50)
+    print(f"Model: {args.model} ({args.profile}), workers: {args.workers}")
+    print(f"Checkpoint: {checkpoint_path}")
+
+    done = load_checkpoint(checkpoint_path, args.retry_failed)
+    if done:
+        print(f"Resuming: {len(done)} files already handled")
+
+    db = None if args.dry_run else DatabaseService()
+    checkpoint = None if args.dry_run else Checkpoint(checkpoint_path)
+    results: List[Tuple[str, str]] = []
+    failures: List[dict] = []
+    transcribed = updated = failed = 0
+
+    def flush():
+        nonlocal updated
+        if args.dry_run:
+            for path, text in results:
+                print(f"   {path}: {text}")
+        else:
+            # The database is written before the checkpoint, so an
+            # interrupted flush is simply redone on the next run
+            updated += db.update_transcriptions(results, args.model)
+            checkpoint.write([{'path': path, 'status': 'ok'} for path, _ in results] + failures)
+        results.clear()
+        failures.clear()
+
+    recordings = iter_recordings(args.root, done)
+    max_in_flight = args.workers * 4
+    in_flight = {}
+
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(args.model, args.profile)) as pool:
+        try:
+            while True:
+                for path in recordings:
+                    in_flight[pool.submit(_transcribe, path)] = path
+                    if len(in_flight) >= max_in_flight:
+                        break
+                if not in_flight:
+                    break
+
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path = in_flight.pop(future)
+                    try:
+                        results.append(future.result())
+                        transcribed += 1
+                    except Exception as e:
+                        failures.append({'path': path, 'status': 'failed', 'error': str(e)})
+                        failed += 1
+                        print(f"   ❌ {path}: {e}")
+
+                if len(results) + len(failures) >= args.batch_size:
+                    flush()
+                    print(f"   ✓ {transcribed} transcribed, {failed} failed")
+        except KeyboardInterrupt:
+            print("\n⚠️  Interrupted - saving progress (re-run to resume)")
+            for future in in_flight:
+                future.cancel()
+        finally:
+            flush()
+
+    if checkpoint:
+        checkpoint.close()
+    if db:
+        db.close()
+
+    print(f"\n✅ Transcription complete: {transcribed} transcribed, {failed} failed, "
+          f"{updated} conversation rows updated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.audio_frontend import PolyphaseResampler
+from services.audio_io import read_wav
+from services.transcription_service import PROFILES, TranscriptionService
+
+SAMPLE_RATE = 16000
+
+
+def load_fixtures(fixture_dir: Path) -> List[Tuple[str, np.ndarray, Optional[str]]]:
+    """
+    Load (name, 16 kHz samples, transcript) for every WAV in a directory
+
+    Uses the same name.wav + name.txt layout as scripts/load_test.py; the
+    transcript is None when there is no .txt next to a WAV.
+    """
+    fixtures = []
+    for wav_path in sorted(fixture_dir.glob('*.wav')):
+        samples, rate = read_wav(wav_path)
+        if rate != SAMPLE_RATE:
+            samples = PolyphaseResampler(rate, SAMPLE_RATE).process(samples)
+        transcript_path = wav_path.with_suffix('.txt')
+        transcript = transcript_path.read_text().strip() if transcript_path.exists() else None
+        fixtures.append((wav_path.name, samples, transcript))
+    if not fixtures:
+        raise SystemExit(f"No .wav fixtures found in {fixture_dir}")
+    return fixtures
+
+
+def words(text: str) -> List[str]:
+    return re.sub(r"[^\w\s']", ' ', text.lower()).split()
+
+
+def word_errors(reference: str, hypothesis: str) -> Tuple[int, int]:
+    """(edit distance in words, reference length)"""
+    ref, hyp = words(reference), words(hypothesis)
+    row = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (ref_word != hyp_word))
+    return row[-1], len(ref)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Whisper decoding profiles on fixture recordings")
+    parser.add_argument('fixtures', type=Path, help="directory of name.wav (+ optional name.txt transcript) files")
+    parser.add_argument('--model', default=config.WHISPER_MODEL, help="Whisper model")
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES),
+                        help="profiles to compare")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per fixture and profile")
+    parser.add_argument('--verbose', action='store_true', help="print every transcript")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("⏱️  WHISPER PROFILE BENCHMARK")
+    print("=" * 50)
+
+    fixtures = load_fixtures(args.fixtures)
+    audio_seconds = sum(len(samples) for _, samples, _ in fixtures) / SAMPLE_RATE
+    print(f"Model: {args.model}, {len(fixtures)} fixtures ({audio_seconds:.1f}s of audio), {args.repeat} runs each")
+
+    transcriber = TranscriptionService(args.model)
+    rows = []
+    for profile in args.profiles:
+        # Untimed warm-up: first-call allocations and thread pool start-up
+        transcriber.transcribe(fixtures[0][1], profile)
+
+        latencies = []
+        errors = reference_words = 0
+        for name, samples, transcript in fixtures:
+            for run in range(args.repeat):
+                start = time.perf_counter()
+                text = transcriber.transcribe(samples, profile)
+                latencies.append(time.perf_counter() - start)
+            if args.verbose:
+                print(f"   [{profile}] {name}: {text}")
+            if transcript is not None:
+                fixture_errors, fixture_words = word_errors(transcript, text)
+                errors += fixture_errors
+                reference_words += fixture_words
+
+        total = sum(latencies) / args.repeat
+        rows.append((
+            profile,
+            float(np.percentile(latencies, 50)),
+            float(np.percentile(latencies, 95)),
+            total / audio_seconds,
+            errors / reference_words if reference_words else None,
+        ))
+
+    print("\n" + "-" * 50)
+    print(f"{'profile':<14}{'p50':>9}{'p95':>9}{'RTF':>8}{'WER':>8}")
+    for profile, p50, p95, rtf, wer in rows:
+        wer_text = f"{wer:.1%}" if wer is not None else "-"
+        print(f"{profile:<14}{p50:>8.3f}s{p95:>8.3f}s{rtf:>8.3f}{wer_text:>8}")
+    print("\nRTF = decoding time / audio duration (lower is faster); WER needs .txt transcripts")
+
+
+if __name__ == "__main__":
+    main()
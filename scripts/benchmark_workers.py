@@ -0,0 +1,111 @@
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.logging_service import setup_logging
+from services.worker_supervisor import WorkerSupervisor, heartbeat, memory_usage, preload
+
+# A worker started the old way: its own interpreter, torch import and Whisper load
+COLD_WORKER = """
+import sys, time
+import numpy as np
+sys.path.append({root!r})
+from services.transcription_service import TranscriptionService
+transcriber = TranscriptionService({model!r})
+transcriber.transcribe(np.zeros(16000, dtype=np.float32), 'conversation')
+print('ready', flush=True)
+time.sleep(3600)
+"""
+
+
+def summarize(mode: str, spawn: List[float], memory: List[Dict[str, float]]) -> Dict:
+    return {
+        'mode': mode,
+        'spawn_p50': float(np.percentile(spawn, 50)),
+        'spawn_max': max(spawn),
+        **{key: float(np.mean([m.get(key, 0.0) for m in memory])) for key in ('rss', 'pss', 'private')},
+    }
+
+
+def run_cold(model: str, workers: int) -> Dict:
+    """Start independent interpreters and wait until each has transcribed once"""
+    code = COLD_WORKER.format(root=str(Path(__file__).parent.parent), model=model)
+    processes = []
+    for _ in range(workers):
+        processes.append((time.perf_counter(), subprocess.Popen([sys.executable, '-c', code],
+                                                                stdout=subprocess.PIPE, text=True)))
+    spawn, memory = [], []
+    for started, process in processes:
+        if process.stdout.readline().strip() != 'ready':
+            raise SystemExit(f"Cold worker {process.pid} failed to start")
+        spawn.append(time.perf_counter() - started)
+    for _, process in processes:
+        memory.append(memory_usage(process.pid))
+        process.terminate()
+        process.wait()
+    return summarize('cold start', spawn, memory)
+
+
+def run_forked(model: str, workers: int) -> Dict:
+    """Preload once, fork workers and wait until each has transcribed once"""
+    transcriber = preload(model)
+    ready_read, ready_write = os.pipe()
+
+    def target(slot: int):
+        transcriber.transcribe(np.zeros(16000, dtype=np.float32), 'conversation')
+        os.write(ready_write, bytes([slot]))
+        while True:
+            heartbeat()
+            time.sleep(config.WORKER_HEARTBEAT_SECONDS)
+
+    supervisor = WorkerSupervisor(target, workers)
+    result = {}
+
+    def measure():
+        spawn = []
+        for _ in range(workers):
+            slot = os.read(ready_read, 1)[0]
+            spawn.append(time.perf_counter() - supervisor.slots[slot]['started'])
+        result.update(summarize('fork-server', spawn, supervisor.status()))
+        supervisor.stop()
+
+    threading.Thread(target=measure, daemon=True).start()
+    supervisor.run()
+    os.close(ready_read)
+    os.close(ready_write)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold-started and forked Whisper worker processes")
+    parser.add_argument('--model', default=config.WHISPER_MODEL, help="Whisper model")
+    parser.add_argument('--workers', type=int, default=config.SUPERVISOR_WORKERS, help="worker processes")
+    args = parser.parse_args()
+
+    setup_logging()
+    print("=" * 50)
+    print("🍴 WORKER STARTUP BENCHMARK")
+    print("=" * 50)
+    print(f"Model: {args.model}, {args.workers} workers, each ready after one transcription\n")
+
+    rows = [run_cold(args.model, args.workers), run_forked(args.model, args.workers)]
+
+    print("\n" + "-" * 50)
+    print(f"{'mode':<13}{'spawn p50':>11}{'spawn max':>11}{'RSS MB':>9}{'PSS MB':>9}{'private MB':>12}")
+    for row in rows:
+        print(f"{row['mode']:<13}{row['spawn_p50']:>10.2f}s{row['spawn_max']:>10.2f}s"
+              f"{row['rss']:>9.0f}{row['pss']:>9.0f}{row['private']:>12.0f}")
+    print("\nPer worker. private = memory the worker alone costs; PSS splits shared pages between sharers")
+
+
+if __name__ == "__main__":
+    main()
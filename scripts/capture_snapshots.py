@@ -0,0 +1,46 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.vision_service import CaptureService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample snapshots from a camera or a video file")
+    parser.add_argument('--source', default=config.CAMERA_SOURCE, help="camera index or video file")
+    parser.add_argument('--fps', type=float, default=config.CAPTURE_SAMPLE_FPS, help="frames sampled per second")
+    parser.add_argument('--dedup-distance', type=int, default=config.SNAPSHOT_DEDUP_DISTANCE,
+                        help="max hash distance treated as a duplicate (-1 keeps every frame)")
+    parser.add_argument('--duration', type=float, help="stop after this many seconds")
+    parser.add_argument('--max', type=int, help="stop after this many snapshots")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("📷 CAPTURING SNAPSHOTS")
+    print("=" * 50)
+
+    capture = CaptureService(args.source, args.fps, args.dedup_distance)
+    if not capture.is_file and args.duration is None and args.max is None:
+        print("Capturing until Ctrl+C...")
+
+    start = time.perf_counter()
+    try:
+        for snapshot in capture.snapshots(max_snapshots=args.max, duration=args.duration):
+            print(f"   📸 {snapshot['position']:8.2f}s  {snapshot['path']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.cleanup()
+    elapsed = time.perf_counter() - start
+
+    stats = capture.stats
+    print(f"\n✅ {stats['written']} snapshots written in {elapsed:.2f}s")
+    print(f"   Frames read: {stats['frames']}, sampled: {stats['sampled']}, "
+          f"duplicates skipped: {stats['duplicates']}, dropped: {stats['dropped']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.audio_service import AudioService
+from services.wake_word_service import KeywordSpotter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record wake word examples for TRIGGER_MODE=wake_word")
+    parser.add_argument('--examples', type=int, default=4, help="number of examples to record")
+    parser.add_argument('--output', type=Path, default=config.WAKE_WORD_TEMPLATES, help="templates file")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("👂 WAKE WORD ENROLLMENT")
+    print("=" * 50)
+    print(f"Say your wake word {args.examples} times, pausing after each one.\n")
+
+    # Templates are matched on MFCCs; Whisper is not needed
+    audio = AudioService(load_transcriber=False)
+    spotter = KeywordSpotter(args.output)
+    examples = []
+
+    segments = audio.speech_segments(
+        end_silence_ms=config.WAKE_WORD_END_SILENCE_MS,
+        max_seconds=config.WAKE_WORD_MAX_SECONDS + 1
+    )
+    print(f"🎤 Example 1/{args.examples}...")
+    for samples in segments:
+        seconds = len(samples) / audio.RATE
+        if seconds > config.WAKE_WORD_MAX_SECONDS:
+            print(f"   ⚠️  That took {seconds:.1f}s - keep the wake word under {config.WAKE_WORD_MAX_SECONDS}s")
+            continue
+        examples.append(samples)
+        print(f"   ✓ {seconds:.1f}s")
+        if len(examples) == args.examples:
+            break
+        print(f"🎤 Example {len(examples) + 1}/{args.examples}...")
+    segments.close()
+    audio.cleanup()
+
+    spotter.enroll(examples)
+    spotter.save()
+    print(f"\n✅ Saved {len(examples)} templates to {args.output} (threshold {spotter.threshold:.2f})")
+    print("   Set TRIGGER_MODE=wake_word to use it")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+from services.database_service import DatabaseService
+from manage_partitions import is_partitioned
+
+# Stored columns written to and read from export files (search_vector is generated)
+EXPORT_COLUMNS = ['id', 'user_id', 'timestamp', 'location', 'trigger_type', 'user_input', 'ai_response',
+                  'audio_path', 'video_file_path', 'metadata', 'embedding', 'user_input_tokens', 'ai_response_tokens']
+# Rows per Parquet row group / per progress line
+BATCH_ROWS = 50000
+
+if pa is not None:
+    PARQUET_SCHEMA = pa.schema([
+        ('id', pa.string()),
+        ('user_id', pa.int32()),
+        ('timestamp', pa.timestamp('us')),
+        ('location', pa.string()),
+        ('trigger_type', pa.string()),
+        ('user_input', pa.string()),
+        ('ai_response', pa.string()),
+        ('audio_path', pa.string()),
+        ('video_file_path', pa.string()),
+        ('metadata', pa.string()),  # JSON text
+        ('embedding', pa.binary()),
+        ('user_input_tokens', pa.int32()),
+        ('ai_response_tokens', pa.int32()),
+    ])
+
+
+def file_format(path: Path) -> str:
+    if path.suffix == '.parquet':
+        if pa is None:
+            raise SystemExit("Parquet needs pyarrow (pip install pyarrow); or use a .jsonl.gz file")
+        return 'parquet'
+    if path.name.endswith(('.jsonl', '.jsonl.gz')):
+        return 'jsonl'
+    raise SystemExit(f"Unknown file type: {path.name} (use .parquet, .jsonl.gz or .jsonl)")
+
+
+def filters(cur, user_id: int = None, since: date = None, until: date = None) -> str:
+    """WHERE clause for the per-user and date filters, with values inlined (COPY takes no parameters)"""
+    conditions = ['TRUE']
+    if user_id is not None:
+        conditions.append(cur.mogrify("user_id = %s", (user_id,)).decode())
+    if since:
+        conditions.append(cur.mogrify("timestamp >= %s", (since,)).decode())
+    if until:
+        conditions.append(cur.mogrify("timestamp < %s", (until,)).decode())
+    return ' AND '.join(conditions)
+
+
+def _pipe(produce: Callable, consume: Callable):
+    """
+    Run produce(writable) on a thread and consume(readable) here, joined by an OS pipe
+
+    psycopg2's COPY reads or writes a whole file object in one call; the
+    pipe lets the other side stream at the same time, so memory stays
+    constant however many rows pass through.
+    """
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def run():
+        try:
+            with os.fdopen(write_fd, 'wb') as sink:
+                produce(sink)
+        except BrokenPipeError:
+            pass  # The consumer stopped early; its own error is reported
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        with os.fdopen(read_fd, 'rb') as source:
+            result = consume(source)
+    finally:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return result
+
+
+def _json_lines(source) -> Iterator[bytes]:
+    """JSON documents from COPY text output of a single json column"""
+    for line in source:
+        # JSON escapes every control character, so the only COPY escape left is the doubled backslash
+        yield line.rstrip(b'\n').replace(b'\\\\', b'\\')
+
+
+def _record_batch(rows: List[Dict]):
+    columns = {name: [row.get(name) for row in rows] for name in EXPORT_COLUMNS}
+    columns['timestamp'] = np.array(columns['timestamp'], dtype='datetime64[us]')
+    columns['metadata'] = [None if v is None else json.dumps(v) for v in columns['metadata']]
+    # bytea comes out of row_to_json as "\x<hex>"
+    columns['embedding'] = [None if v is None else bytes.fromhex(v[2:]) for v in columns['embedding']]
+    return pa.RecordBatch.from_arrays([pa.array(columns[f.name], type=f.type) for f in PARQUET_SCHEMA],
+                                      schema=PARQUET_SCHEMA)
+
+
+def _batches(lines: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_conversations(db: DatabaseService, path: Path, where: str) -> int:
+    """
+    Stream matching conversations to a Parquet or JSON Lines file
+
+    PostgreSQL renders each row as JSON inside COPY, so no Python row
+    objects are built for JSON Lines and only one batch at a time for
+    Parquet.
+
+    Returns:
+        Rows written
+    """
+    fmt = file_format(path)
+    columns = ', '.join(EXPORT_COLUMNS)
+    sql = f"COPY (SELECT row_to_json(c) FROM (SELECT {columns} FROM conversations WHERE {where}) c) TO STDOUT"
+
+    def produce(sink):
+        cur = db.conn.cursor()
+        try:
+            cur.copy_expert(sql, sink)
+        finally:
+            cur.close()
+
+    # Written under a temporary name, so a failed export leaves no truncated file behind
+    partial = path.with_name(f"{path.name}.partial")
+
+    def write_jsonl(source) -> int:
+        rows = 0
+        opener = gzip.open if path.suffix == '.gz' else open
+        # Fastest gzip level: exports are bound by compression, not I/O
+        with opener(partial, 'wb', **({'compresslevel': 1} if path.suffix == '.gz' else {})) as f:
+            for batch in _batches(_json_lines(source), BATCH_ROWS):
+                f.write(b'\n'.join(batch) + b'\n')
+                rows += len(batch)
+                print(f"   ✓ {rows} rows")
+        return rows
+
+    def write_parquet(source) -> int:
+        rows = 0
+        with pq.ParquetWriter(partial, PARQUET_SCHEMA, compression='zstd') as writer:
+            for batch in _batches(_json_lines(source), BATCH_ROWS):
+                writer.write_batch(_record_batch([json.loads(line) for line in batch]))
+                rows += len(batch)
+                print(f"   ✓ {rows} rows")
+        return rows
+
+    try:
+        rows = _pipe(produce, write_parquet if fmt == 'parquet' else write_jsonl)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    os.replace(partial, path)
+    return rows
+
+
+def _read_rows(path: Path) -> Iterator[Dict]:
+    if file_format(path) == 'parquet':
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_ROWS, columns=EXPORT_COLUMNS):
+            yield from batch.to_pylist()
+        return
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _copy_field(value) -> str:
+    """One field in COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bytes):
+        value = '\\x' + value.hex()
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def import_conversations(db: DatabaseService, path: Path, where: str) -> Dict[str, int]:
+    """
+    Bulk-load an export file, skipping conversations that already exist
+
+    Rows are streamed with COPY into a temporary staging table, then
+    inserted in one statement: ON CONFLICT DO NOTHING makes re-imports
+    and overlapping files safe, and rows for users missing from this
+    database are skipped (the foreign key would reject them).
+
+    Returns:
+        {'read', 'imported', 'existing', 'unknown_user', 'filtered'}
+    """
+    columns = ', '.join(EXPORT_COLUMNS)
+    cur = db.conn.cursor()
+    try:
+        cur.execute(f"CREATE TEMP TABLE conversations_import ON COMMIT DROP AS SELECT {columns} FROM conversations WITH NO DATA")
+
+        def produce(sink):
+            for batch in _batches(_read_rows(path), BATCH_ROWS):
+                sink.write(''.join('\t'.join(_copy_field(row.get(name)) for name in EXPORT_COLUMNS) + '\n'
+                                   for row in batch).encode())
+
+        _pipe(produce, lambda source: cur.copy_expert(f"COPY conversations_import ({columns}) FROM STDIN", source))
+        cur.execute("SELECT count(*) FROM conversations_import")
+        read = cur.fetchone()[0]
+        print(f"   ✓ {read} rows staged")
+
+        cur.execute(f"SELECT count(*) FROM conversations_import WHERE {where}")
+        selected = cur.fetchone()[0]
+        cur.execute(f"SELECT count(*) FROM conversations_import i WHERE {where} "
+                    "AND NOT EXISTS (SELECT 1 FROM users u WHERE u.user_id = i.user_id)")
+        unknown_user = cur.fetchone()[0]
+
+        if is_partitioned(db):
+            # Months without a partition would otherwise land in the default partition
+            cur.execute("SELECT create_conversation_partition(month) FROM "
+                        f"(SELECT DISTINCT date_trunc('month', timestamp)::date AS month FROM conversations_import WHERE {where}) m")
+
+        cur.execute(
+            f"INSERT INTO conversations ({columns}) SELECT {columns} FROM conversations_import i "
+            f"WHERE {where} AND EXISTS (SELECT 1 FROM users u WHERE u.user_id = i.user_id) "
+            "ON CONFLICT DO NOTHING"
+        )
+        imported = cur.rowcount
+        db.conn.commit()
+    except Exception:
+        db.conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return {
+        'read': read,
+        'imported': imported,
+        'existing': selected - unknown_user - imported,
+        'unknown_user': unknown_user,
+        'filtered': read - selected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk export and import of the conversations table")
+    parser.add_argument('action', choices=['export', 'import'])
+    parser.add_argument('file', type=Path, help="export file: .parquet (needs pyarrow), .jsonl.gz or .jsonl")
+    parser.add_argument('--user', type=int, help="only this user's conversations")
+    parser.add_argument('--since', type=date.fromisoformat, help="only conversations from this date (YYYY-MM-DD)")
+    parser.add_argument('--until', type=date.fromisoformat, help="only conversations before this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    file_format(args.file)
+    print("=" * 50)
+    print(f"📦 CONVERSATION {args.action.upper()}")
+    print("=" * 50)
+
+    db = DatabaseService()
+    cur = db.conn.cursor()
+    where = filters(cur, args.user, args.since, args.until)
+    cur.close()
+
+    start = time.perf_counter()
+    if args.action == 'export':
+        print(f"\n📤 Exporting to {args.file}...")
+        rows = export_conversations(db, args.file, where)
+        elapsed = time.perf_counter() - start
+        size = args.file.stat().st_size / 2 ** 20
+        print(f"\n✅ Exported {rows} conversations in {elapsed:.1f}s "
+              f"({rows / max(elapsed, 1e-9):,.0f} rows/s, {size:.1f} MB)")
+    else:
+        print(f"\n📥 Importing {args.file}...")
+        counts = import_conversations(db, args.file, where)
+        elapsed = time.perf_counter() - start
+        print(f"\n✅ Imported {counts['imported']} of {counts['read']} conversations in {elapsed:.1f}s "
+              f"({counts['read'] / max(elapsed, 1e-9):,.0f} rows/s)")
+        print(f"   {counts['existing']} already present, {counts['unknown_user']} for unknown users, "
+              f"{counts['filtered']} filtered out")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+from websockets.asyncio.client import connect
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.audio_io import read_wav, write_wav
+
+# Audio frame sent per WebSocket message
+FRAME_MS = 20
+# Silence sent before each utterance with server endpointing
+LEAD_IN_MS = 500
+
+
+def load_utterances(paths: List[Path]) -> Tuple[List[bytes], int]:
+    """Read WAV files as 16-bit mono PCM; they must share a sample rate"""
+    utterances, rates = [], set()
+    for path in paths:
+        samples, rate = read_wav(path)
+        rates.add(rate)
+        utterances.append((np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+    if len(rates) != 1:
+        raise SystemExit(f"Utterances must share one sample rate, got {sorted(rates)}")
+    return utterances, rates.pop()
+
+
+async def send_utterance(websocket, pcm: bytes, rate: int, realtime: bool, endpointing: str):
+    """Stream one utterance as the microphone would"""
+    frame = rate * 2 * FRAME_MS // 1000
+    if endpointing == 'server':
+        # Silence around the speech, as from a live microphone: the server's VAD
+        # calibrates its noise floor on the lead-in and ends the utterance on the tail
+        pcm = bytes(rate * 2 * LEAD_IN_MS // 1000) + pcm + bytes(rate * 2 * (config.VAD_END_SILENCE_MS + 200) // 1000)
+    for offset in range(0, len(pcm), frame):
+        await websocket.send(pcm[offset:offset + frame])
+        await asyncio.sleep(FRAME_MS / 1000 if realtime else 0)
+    if endpointing == 'client':
+        await websocket.send(json.dumps({'type': 'end'}))
+
+
+async def run_client(index: int, args, utterances: List[bytes], rate: int) -> Dict:
+    """One remote session: answer each 'listening' with the next utterance until they run out"""
+    turns = itertools.islice(itertools.cycle(utterances), args.turns or len(utterances))
+    result = {'latencies': [], 'transcripts': [], 'error': None}
+    sent_at = None
+    speech = bytearray()
+    speech_rate = None
+    replies = 0
+    sender = None
+
+    async with connect(args.url, max_size=2 ** 22) as websocket:
+        await websocket.send(json.dumps({'type': 'hello', 'sample_rate': rate, 'channels': 1,
+                                         'codec': 'pcm', 'endpointing': args.endpointing}))
+        async for message in websocket:
+            if isinstance(message, bytes):
+                if sent_at is not None:
+                    # Time from the end of the user's speech to the first audio of the answer
+                    result['latencies'].append(time.perf_counter() - sent_at)
+                    sent_at = None
+                speech.extend(message)
+                if args.realtime:
+                    await asyncio.sleep(len(message) / (2 * speech_rate))
+                await websocket.send(json.dumps({'type': 'ack', 'bytes': len(message)}))
+                continue
+
+            event = json.loads(message)
+            kind = event['type']
+            if kind == 'listening':
+                pcm = next(turns, None)
+                if pcm is None:
+                    break
+                if sender:
+                    await sender
+
+                async def speak(pcm=pcm):
+                    nonlocal sent_at
+                    await send_utterance(websocket, pcm, rate, args.realtime, args.endpointing)
+                    sent_at = time.perf_counter()
+
+                sender = asyncio.create_task(speak())
+            elif kind == 'transcript':
+                result['transcripts'].append(event['text'])
+            elif kind == 'speech':
+                speech.clear()
+                speech_rate = event['sample_rate']
+            elif kind == 'speech_end':
+                replies += 1
+                if args.output:
+                    args.output.mkdir(parents=True, exist_ok=True)
+                    write_wav(args.output / f"client{index:02d}_reply{replies:03d}.wav", [bytes(speech)],
+                              1, 2, speech_rate)
+            elif kind == 'error':
+                result['error'] = event['message']
+            elif kind == 'end':
+                break
+    return result
+
+
+async def run_clients(args, utterances: List[bytes], rate: int) -> List[Dict]:
+    return await asyncio.gather(*(run_client(index, args, utterances, rate) for index in range(args.sessions)),
+                                return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Talk to the voice gateway with recorded utterances")
+    parser.add_argument('wavs', nargs='+', type=Path, help="16-bit WAV files, sent in order on each turn")
+    parser.add_argument('--url', default=f"ws://{config.GATEWAY_HOST}:{config.GATEWAY_PORT}", help="gateway URL")
+    parser.add_argument('--sessions', type=int, default=1, help="concurrent clients")
+    parser.add_argument('--turns', type=int, default=0, help="utterances per session (default: one per file)")
+    parser.add_argument('--endpointing', choices=['client', 'server'], default='client',
+                        help="who decides where an utterance ends")
+    parser.add_argument('--realtime', action='store_true', help="send and play audio at real-time speed")
+    parser.add_argument('--output', type=Path, help="save each spoken reply here as a WAV file")
+    args = parser.parse_args()
+
+    utterances, rate = load_utterances(args.wavs)
+    print("=" * 50)
+    print("📡 GATEWAY CLIENT")
+    print("=" * 50)
+    print(f"{args.url}: {args.sessions} sessions, {len(utterances)} utterances at {rate} Hz, "
+          f"{args.endpointing} endpointing\n")
+
+    start = time.perf_counter()
+    results = asyncio.run(run_clients(args, utterances, rate))
+    elapsed = time.perf_counter() - start
+
+    latencies = []
+    print("-" * 50)
+    for index, result in enumerate(results):
+        if isinstance(result, Exception):
+            print(f"client {index}: ❌ {type(result).__name__}: {result}")
+            continue
+        latencies.extend(result['latencies'])
+        status = f"❌ {result['error']}" if result['error'] else "✅"
+        print(f"client {index}: {status} {len(result['transcripts'])} transcripts")
+        for text in result['transcripts']:
+            print(f"    📝 {text}")
+
+    print(f"\nFinished in {elapsed:.1f}s")
+    if latencies:
+        print(f"⏱️  Response latency: p50 {np.percentile(latencies, 50):.2f}s, "
+              f"p95 {np.percentile(latencies, 95):.2f}s ({len(latencies)} replies)")
+
+
+if __name__ == "__main__":
+    main()
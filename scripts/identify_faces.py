@@ -0,0 +1,84 @@
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.auth_service import AuthService
+from services.database_service import DatabaseService
+from services.face_service import FaceService
+from services.vision_service import CaptureService
+
+
+def enroll(face: FaceService, capture: CaptureService, user_id: int, max_snapshots: int):
+    """Average the largest face over the sampled snapshots into users.face_embedding"""
+    frames = [snapshot['frame'] for snapshot in capture.snapshots(max_snapshots=max_snapshots)]
+    embeddings = []
+    for faces in face.embed_frames(frames):
+        if faces:
+            # (x, y, w, h) box: keep the biggest face in each frame
+            _, embedding = max(faces, key=lambda f: f[0][2] * f[0][3])
+            embeddings.append(embedding)
+
+    if not embeddings:
+        print("❌ No face found - nothing enrolled")
+        return
+
+    mean = np.mean(embeddings, axis=0)
+    auth = AuthService()
+    if auth.set_face_embedding(user_id, mean / np.linalg.norm(mean)):
+        print(f"✅ Face enrolled for user {user_id} from {len(embeddings)} snapshots")
+    else:
+        print(f"❌ User {user_id} not found")
+    auth.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Identify enrolled users in camera or video snapshots")
+    parser.add_argument('--source', default=config.CAMERA_SOURCE, help="camera index or video file")
+    parser.add_argument('--fps', type=float, default=config.CAPTURE_SAMPLE_FPS, help="frames sampled per second")
+    parser.add_argument('--duration', type=float, help="stop after this many seconds")
+    parser.add_argument('--max', type=int, help="stop after this many snapshots")
+    parser.add_argument('--conversation-id', help="merge the sightings into this conversation's metadata")
+    parser.add_argument('--enroll', type=int, metavar='USER_ID', help="enroll this user's face instead")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("🙂 FACE IDENTIFICATION")
+    print("=" * 50)
+
+    capture = CaptureService(args.source, args.fps)
+    face = FaceService()
+
+    try:
+        if args.enroll:
+            enroll(face, capture, args.enroll, args.max or 10)
+            return
+
+        results = []
+        for result in face.identify(capture.snapshots(max_snapshots=args.max, duration=args.duration)):
+            results.append(result)
+            names = ", ".join(
+                f"user {f['user_id']} ({f['score']:.2f})" if f['user_id'] else f"unknown ({f['score']:.2f})"
+                for f in result['faces']
+            ) or "no faces"
+            print(f"   📸 {result['position']:8.2f}s  {names}")
+
+        summary = FaceService.summarize(results)
+        print(f"\n✅ {len(results)} snapshots: {len(summary['faces'])} recognised users, "
+              f"{summary['unknown_faces']} unknown faces")
+
+        if args.conversation_id:
+            db = DatabaseService()
+            db.update_conversation_metadata(args.conversation_id, summary)
+            db.close()
+            print(f"💾 Linked to conversation {args.conversation_id}")
+    finally:
+        face.cleanup()
+        capture.cleanup()
+
+
+if __name__ == "__main__":
+    main()
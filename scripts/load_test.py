@@ -0,0 +1,280 @@
+import argparse
+import contextlib
+import io
+import itertools
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+from config.config import config
+from main import authenticate_user, conversation_session
+from services.auth_service import AuthService
+from services.database_service import DatabaseService
+from services.llm_service import LLMService
+from services.logging_service import bind_context, setup_logging
+from services.retrieval_service import RetrievalService
+from services.tracing_service import tracer
+from services.admission_service import PROFILE_PRIORITY, llm_admission, whisper_admission
+from stub_ollama_server import StubOllamaServer
+
+# Spoken turns used when no fixture directory is given (no exit keywords)
+DEFAULT_TURNS = [
+    "hello there",
+    "what's my name",
+    "can you explain how a heat pump works",
+    "thanks",
+    "remind me what we talked about earlier",
+    "what time zone am I in",
+]
+LOAD_TEST_PASSWORD = "load test password"
+SAMPLE_RATE = 16000
+
+
+def write_fixture_wav(path: Path, seconds: float, seed: int):
+    """Write a low-level noise WAV shaped like a real 16 kHz mono recording"""
+    rng = np.random.default_rng(seed)
+    samples = (rng.standard_normal(int(SAMPLE_RATE * seconds)) * 300).astype(np.int16)
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(samples.tobytes())
+
+
+def load_fixtures(fixture_dir: Path = None, seconds: float = 5.0) -> List[Tuple[Path, str]]:
+    """
+    Load (wav_path, transcript) pairs
+
+    A fixture directory holds name.wav files with a name.txt transcript
+    next to each. Without one, noise WAVs are generated for DEFAULT_TURNS.
+    """
+    if fixture_dir:
+        fixtures = []
+        for wav_path in sorted(fixture_dir.glob('*.wav')):
+            transcript_path = wav_path.with_suffix('.txt')
+            if transcript_path.exists():
+                fixtures.append((wav_path, transcript_path.read_text().strip()))
+        if not fixtures:
+            raise SystemExit(f"No .wav/.txt fixture pairs found in {fixture_dir}")
+        return fixtures
+
+    generated = Path(tempfile.mkdtemp(prefix='load_test_fixtures_'))
+    fixtures = []
+    for index, transcript in enumerate(DEFAULT_TURNS):
+        wav_path = generated / f"turn_{index:02d}.wav"
+        write_fixture_wav(wav_path, seconds, seed=index)
+        fixtures.append((wav_path, transcript))
+    return fixtures
+
+
+class FixtureAudioService:
+    """
+    Stand-in for AudioService: plays a scripted sequence of fixture WAVs
+
+    Each "recording" copies a fixture into the output directory (the same
+    disk write a real recording does) and "transcription" returns the
+    scripted text after asr_latency seconds. The gap between one
+    conversation turn's transcript and the next recording is measured as
+    that turn's end-to-end processing latency.
+    """
+
+    def __init__(self, script: List[Tuple[Path, str, bool]], out_dir: Path, asr_latency: float, tracer):
+        self.script = iter(script)
+        self.out_dir = out_dir
+        self.asr_latency = asr_latency
+        self.tracer = tracer
+        self.counter = itertools.count()
+        self.turn_started = None
+        self.turn_latencies: List[float] = []
+
+    def record_and_transcribe(self, duration=5, profile=None, on_wait=None):
+        now = time.perf_counter()
+        if self.turn_started is not None:
+            self.turn_latencies.append(now - self.turn_started)
+            self.turn_started = None
+
+        wav_path, text, is_turn = next(self.script)
+
+        with self.tracer.span('record'):
+            audio_path = self.out_dir / f"{threading.get_ident()}_{next(self.counter)}.wav"
+            shutil.copyfile(wav_path, audio_path)
+
+        # Queue for "Whisper" like AudioService.transcribe_audio does
+        with whisper_admission.admit(PROFILE_PRIORITY.get(profile or config.WHISPER_PROFILE, 'interactive'), on_wait):
+            with self.tracer.span('transcribe'):
+                time.sleep(self.asr_latency)
+
+        if is_turn:
+            self.turn_started = time.perf_counter()
+        return {'audio_path': str(audio_path), 'text': text}
+
+    def cleanup(self):
+        pass
+
+
+class NullTTSService:
+    """Stand-in for TTSService that discards speech after an optional delay"""
+
+    def __init__(self, latency: float = 0.0, tracer=None):
+        self.latency = latency
+        self.tracer = tracer
+
+    def speak(self, text: str):
+        with self.tracer.span('tts'):
+            if self.latency:
+                time.sleep(self.latency)
+
+    def cleanup(self):
+        pass
+
+
+def build_script(user_id: int, fixtures: List[Tuple[Path, str]], turns: int) -> List[Tuple[Path, str, bool]]:
+    """Utterances for one session: user ID, password, conversation turns, goodbye"""
+    audio = itertools.cycle(wav for wav, _ in fixtures)
+    transcripts = itertools.cycle(text for _, text in fixtures)
+    script = [
+        (next(audio), str(user_id), False),
+        (next(audio), LOAD_TEST_PASSWORD, False),
+    ]
+    script += [(next(audio), next(transcripts), True) for _ in range(turns)]
+    script.append((next(audio), "goodbye", False))
+    return script
+
+
+def run_session(index: int, args, fixtures, out_dir: Path, results: list, results_lock: threading.Lock):
+    user_id = args.user_base + index
+    session_id = tracer.start_session(f"load-{index}")
+    bind_context(session_id=session_id)
+
+    audio = FixtureAudioService(build_script(user_id, fixtures, args.turns), out_dir, args.asr_latency, tracer)
+    tts = NullTTSService(args.tts_latency, tracer)
+    db = auth = None
+    error = None
+    try:
+        db = DatabaseService()
+        auth = AuthService()
+        llm = LLMService()
+        retrieval = None if args.no_retrieval else RetrievalService(db)
+
+        def no_wait(message):
+            return None
+
+        if authenticate_user(audio, db, auth, tts, prompt=no_wait) != user_id:
+            raise RuntimeError(f"authentication failed for user {user_id}")
+        bind_context(user_id=user_id)
+        conversation_session(user_id, audio, db, llm, tts, retrieval, prompt=no_wait)
+    except Exception as e:
+        error = f"session {index}: {e}"
+    finally:
+        tracer.end_session()
+        if auth:
+            auth.close()
+        if db:
+            db.close()
+
+    with results_lock:
+        results.append({'latencies': audio.turn_latencies, 'error': error})
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive simulated sessions through the main.py flow with stand-in mic, Whisper, Ollama and TTS"
+    )
+    parser.add_argument('--sessions', type=int, default=4, help="concurrent simulated sessions")
+    parser.add_argument('--turns', type=int, default=10, help="conversation turns per session")
+    parser.add_argument('--fixtures', type=Path, help="directory of name.wav + name.txt fixture pairs")
+    parser.add_argument('--user-base', type=int, default=9000, help="first 4-digit user ID used for load users")
+    parser.add_argument('--asr-latency', type=float, default=0.3, help="simulated Whisper seconds per utterance")
+    parser.add_argument('--tts-latency', type=float, default=0.0, help="simulated seconds per spoken reply")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="stub Ollama base seconds per request")
+    parser.add_argument('--llm-token-latency', type=float, default=0.01, help="stub Ollama seconds per token")
+    parser.add_argument('--ollama-host', help="use this Ollama server instead of the stub")
+    parser.add_argument('--no-retrieval', action='store_true', help="send full history instead of retrieval")
+    parser.add_argument('--verbose', action='store_true', help="show the per-session console output")
+    args = parser.parse_args()
+
+    if not (1000 <= args.user_base and args.user_base + args.sessions - 1 <= 9999):
+        raise SystemExit("Load-test user IDs must stay in the 4-digit range")
+
+    print("=" * 50)
+    print("🏋️  CONVERSATION LOAD TEST")
+    print("=" * 50)
+
+    stub = None
+    if args.ollama_host:
+        config.OLLAMA_HOST = args.ollama_host
+    else:
+        stub = StubOllamaServer(base_latency=args.llm_latency, per_token_latency=args.llm_token_latency).start()
+        config.OLLAMA_HOST = stub.url
+    print(f"Ollama: {config.OLLAMA_HOST}{' (stub)' if stub else ''}")
+
+    setup_logging(level='DEBUG' if args.verbose else 'WARNING')
+
+    fixtures = load_fixtures(args.fixtures)
+    out_dir = Path(tempfile.mkdtemp(prefix='load_test_recordings_'))
+    print(f"Sessions: {args.sessions} × {args.turns} turns, {len(fixtures)} fixtures")
+
+    results: list = []
+    results_lock = threading.Lock()
+    threads = [
+        threading.Thread(target=run_session, args=(i, args, fixtures, out_dir, results, results_lock),
+                         name=f"session-{i}")
+        for i in range(args.sessions)
+    ]
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with output:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - start
+
+    latencies = [latency for result in results for latency in result['latencies']]
+    errors = [result['error'] for result in results if result['error']]
+
+    print("\n" + "-" * 50)
+    print(f"Wall time:      {wall:.2f}s")
+    print(f"Turns:          {len(latencies)}")
+    print(f"Throughput:     {len(latencies) / wall:.2f} turns/sec")
+    print(f"Turn latency:   p50 {percentile(latencies, 50):.3f}s  p95 {percentile(latencies, 95):.3f}s  "
+          f"p99 {percentile(latencies, 99):.3f}s  max {max(latencies, default=0.0):.3f}s")
+    if stub:
+        print(f"Ollama requests: {stub.requests}")
+    print("\nStage latency (all sessions):")
+    print(tracer.format_summary())
+    print("\nAdmission (admitted / told to hold on / rejected):")
+    for controller in (whisper_admission, llm_admission):
+        stats = controller.snapshot()['stats']
+        print(f"   {controller.name:<8}" + "  ".join(
+            f"{cls} {s['admitted']}/{s['backpressure']}/{s['rejected']}" for cls, s in stats.items()))
+
+    if errors:
+        print(f"\n❌ {len(errors)} session(s) failed:")
+        for error in errors:
+            print(f"   {error}")
+
+    tracer.shutdown()
+    if stub:
+        stub.stop()
+    shutil.rmtree(out_dir, ignore_errors=True)
+    if not args.fixtures:
+        shutil.rmtree(fixtures[0][0].parent, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import argparse
+import gzip
+import re
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.database_service import DatabaseService
+
+SCHEMA_PATH = Path(__file__).parent.parent / 'sql' / 'schema.sql'
+PARTITION_NAME = re.compile(r'^conversations_(\d{4})_(\d{2})$')
+# Indexes sql/schema.sql creates on conversations; --migrate renames them off the legacy table
+CONVERSATION_INDEXES = ('idx_conversations_user_id', 'idx_conversations_user_timestamp', 'idx_conversations_timestamp',
+                        'idx_conversations_search', 'idx_conversations_audio_path')
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def is_partitioned(db: DatabaseService) -> bool:
+    cur = db.conn.cursor()
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('conversations')")
+    row = cur.fetchone()
+    cur.close()
+    return row is not None and row[0] == 'p'
+
+
+def list_partitions(db: DatabaseService):
+    """Return [(partition_name, month_start)] for attached monthly partitions, oldest first"""
+    cur = db.conn.cursor()
+    cur.execute(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'conversations'::regclass
+        """
+    )
+    names = [row[0] for row in cur.fetchall()]
+    cur.close()
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def migrate(db: DatabaseService):
+    """Convert a pre-partitioning conversations table into the partitioned layout"""
+    print("\n🔄 Migrating conversations to a partitioned table...")
+    cur = db.conn.cursor()
+    try:
+        # Free up the table, primary key and index names for the new table
+        cur.execute("ALTER TABLE conversations RENAME TO conversations_legacy")
+        cur.execute("ALTER TABLE conversations_legacy RENAME CONSTRAINT conversations_pkey TO conversations_legacy_pkey")
+        for index in CONVERSATION_INDEXES:
+            cur.execute(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_legacy")
+
+        cur.execute(SCHEMA_PATH.read_text())
+
+        cur.execute("SELECT min(timestamp), max(timestamp) FROM conversations_legacy")
+        oldest, newest = cur.fetchone()
+        if oldest is not None:
+            month = date(oldest.year, oldest.month, 1)
+            while month <= date(newest.year, newest.month, 1):
+                cur.execute("SELECT create_conversation_partition(%s)", (month,))
+                month = add_months(month, 1)
+
+        cur.execute("UPDATE conversations_legacy SET timestamp = NOW() WHERE timestamp IS NULL")
+        cur.execute(
+            """
+            SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum)
+            FROM pg_attribute
+            WHERE attrelid = 'conversations_legacy'::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = ''
+            """
+        )
+        columns = cur.fetchone()[0]
+        cur.execute(f"INSERT INTO conversations ({columns}) SELECT {columns} FROM conversations_legacy")
+        moved = cur.rowcount
+
+        db.conn.commit()
+        print(f"✅ Moved {moved} rows; old table kept as conversations_legacy")
+        print("   Drop it once verified: DROP TABLE conversations_legacy;")
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        db.conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def create_future_partitions(db: DatabaseService, months_ahead: int):
+    """Make sure partitions exist from the current month through months_ahead"""
+    print(f"\n📅 Creating partitions through {months_ahead} month(s) ahead...")
+    this_month = date.today().replace(day=1)
+    cur = db.conn.cursor()
+    try:
+        for offset in range(months_ahead + 1):
+            cur.execute("SELECT create_conversation_partition(%s)", (add_months(this_month, offset),))
+            print(f"   ✓ {cur.fetchone()[0]}")
+        db.conn.commit()
+    except Exception as e:
+        print(f"❌ Failed to create partitions: {e}")
+        db.conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def archive_partition(db: DatabaseService, name: str, archive_dir: Path) -> Path:
+    """Write a detached partition to a gzipped CSV file"""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    archive_file = archive_dir / f"{name}.csv.gz"
+    cur = db.conn.cursor()
+    try:
+        with gzip.open(archive_file, 'wb') as f:
+            cur.copy_expert(f'COPY "{name}" TO STDOUT WITH (FORMAT csv, HEADER true)', f)
+    finally:
+        cur.close()
+    return archive_file
+
+
+def retire_old_partitions(db: DatabaseService, retention_months: int, archive_dir: Path = None, drop: bool = True):
+    """Detach (and optionally archive and drop) partitions older than the retention window"""
+    cutoff = add_months(date.today().replace(day=1), -retention_months)
+    expired = [(name, month) for name, month in list_partitions(db) if month < cutoff]
+    print(f"\n🗄️  Retiring partitions before {cutoff:%Y-%m} ({len(expired)} found)...")
+
+    for name, month in expired:
+        cur = db.conn.cursor()
+        try:
+            cur.execute(f'ALTER TABLE conversations DETACH PARTITION "{name}"')
+            db.conn.commit()
+            print(f"   ✓ Detached {name}")
+
+            if archive_dir:
+                archive_file = archive_partition(db, name, archive_dir)
+                print(f"   ✓ Archived {name} → {archive_file}")
+
+            if drop:
+                cur.execute(f'DROP TABLE "{name}"')
+                db.conn.commit()
+                print(f"   ✓ Dropped {name}")
+        except Exception as e:
+            print(f"❌ Failed to retire {name}: {e}")
+            db.conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain monthly partitions of the conversations table")
+    parser.add_argument('--migrate', action='store_true',
+                        help="convert an existing unpartitioned conversations table first")
+    parser.add_argument('--months-ahead', type=int, default=config.PARTITION_MONTHS_AHEAD,
+                        help="create partitions this many months into the future")
+    parser.add_argument('--retention-months', type=int, default=config.PARTITION_RETENTION_MONTHS,
+                        help="detach partitions older than this many months (0 = keep everything)")
+    parser.add_argument('--archive-dir', type=Path, default=config.ARCHIVE_PATH / 'conversations',
+                        help="where detached partitions are written as gzipped CSV")
+    parser.add_argument('--no-archive', action='store_true', help="do not write detached partitions to disk")
+    parser.add_argument('--keep-detached', action='store_true',
+                        help="leave detached partitions in the database instead of dropping them")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("🗂️  CONVERSATION PARTITION MAINTENANCE")
+    print("=" * 50)
+
+    db = DatabaseService()
+
+    if not is_partitioned(db):
+        if not args.migrate:
+            print("❌ conversations is not partitioned. Re-run with --migrate to convert it.")
+            db.close()
+            return
+        migrate(db)
+
+    create_future_partitions(db, args.months_ahead)
+
+    if args.retention_months > 0:
+        if args.no_archive and not args.keep_detached:
+            print("⚠️  Expired partitions will be dropped without an archive")
+        retire_old_partitions(
+            db,
+            args.retention_months,
+            archive_dir=None if args.no_archive else args.archive_dir,
+            drop=not args.keep_detached
+        )
+
+    print("\n" + "=" * 50)
+    print("✅ Partition maintenance complete!")
+    print("=" * 50)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
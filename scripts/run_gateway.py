@@ -0,0 +1,104 @@
+import argparse
+import signal
+import socket
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from main import listen_prompt, run_session
+from services.auth_service import AuthService
+from services.database_service import DatabaseService
+from services.enrolled_index_service import EnrolledIndexService
+from services.gateway_service import AudioGateway, GatewayAudio, GatewayTTS
+from services.llm_service import LLMService
+from services.logging_service import setup_logging
+from services.retrieval_service import RetrievalService
+from services.speaker_service import SpeakerService
+from services.tracing_service import tracer
+from services.transcription_service import TranscriptionService
+from services.tts_service import TTSService
+from services.worker_supervisor import WorkerSupervisor, preload
+
+
+def build_gateway(transcriber: TranscriptionService, host: str, port: int, max_sessions: int):
+    """
+    Gateway whose sessions share Whisper, TTS and speaker models
+
+    Database connections and LLM state are per session.
+
+    Returns:
+        (gateway, cleanup function)
+    """
+    synthesizer = TTSService()
+    speaker = voice_index = None
+    if config.VOICE_LOGIN_ENABLED:
+        speaker = SpeakerService()
+        voice_index = EnrolledIndexService('voice_embedding').start()
+
+    def session(connection):
+        db = DatabaseService()
+        auth = AuthService()
+        try:
+            audio = GatewayAudio(connection, transcriber)
+            tts = GatewayTTS(connection, synthesizer)
+            if not run_session(audio, db, auth, LLMService(), tts, speaker, voice_index, RetrievalService(db),
+                               trigger_type='remote', prompt=listen_prompt):
+                print(f"❌ Client {connection.id}: authentication failed")
+        finally:
+            auth.close()
+            db.close()
+
+    def cleanup():
+        if voice_index:
+            voice_index.stop()
+        synthesizer.cleanup()
+
+    return AudioGateway(session, host, port, max_sessions), cleanup
+
+
+def serve(transcriber: TranscriptionService, args, sock: socket.socket = None):
+    """Run a gateway until SIGTERM or Ctrl+C"""
+    gateway, cleanup = build_gateway(transcriber, args.host, args.port, args.max_sessions)
+    signal.signal(signal.SIGTERM, lambda signum, frame: gateway.stop())
+    try:
+        gateway.run(sock)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve voice sessions to remote clients over WebSocket")
+    parser.add_argument('--host', default=config.GATEWAY_HOST, help="interface to listen on")
+    parser.add_argument('--port', type=int, default=config.GATEWAY_PORT, help="port to listen on")
+    parser.add_argument('--max-sessions', type=int, default=config.GATEWAY_MAX_SESSIONS,
+                        help="concurrent sessions per process")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="fork this many gateway processes sharing one listening socket (0 = single process)")
+    args = parser.parse_args()
+
+    setup_logging()
+    print("=" * 50)
+    print("🌐 VOICE GATEWAY")
+    print("=" * 50)
+    print(f"ws://{args.host}:{args.port}, up to {args.max_sessions} sessions"
+          f"{f' x {args.workers} workers' if args.workers else ''}\n")
+
+    if not args.workers:
+        if config.METRICS_PORT:
+            tracer.start_http_server()
+        serve(TranscriptionService(), args)
+        return
+
+    # Workers share the preloaded model and accept from the same socket
+    transcriber = preload()
+    sock = socket.create_server((args.host, args.port), reuse_port=False)
+    sock.set_inheritable(True)
+    WorkerSupervisor(lambda slot: serve(transcriber, args, sock), args.workers).run()
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
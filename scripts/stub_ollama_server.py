@@ -0,0 +1,149 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Dimension of the fake embeddings (matches nomic-embed-text)
+EMBEDDING_DIM = 768
+
+CANNED_REPLIES = [
+    "Sure, I can help with that.",
+    "That sounds good. Let me know if there's anything else you need.",
+    "Here's a quick answer: it depends on the details, but usually yes.",
+    "I remember you mentioned that earlier. Anything else on your mind?",
+]
+
+
+class StubOllamaServer:
+    """
+    Minimal stand-in for the Ollama HTTP API with configurable latency
+
+    Implements the non-streaming /api/chat, /api/generate and
+    /api/embeddings endpoints used by LLMService and EmbeddingService.
+    Chat latency is base_latency + tokens * per_token_latency, with
+    optional uniform jitter.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, base_latency: float = 0.2,
+                 per_token_latency: float = 0.01, jitter: float = 0.1, embed_latency: float = 0.01):
+        self.base_latency = base_latency
+        self.per_token_latency = per_token_latency
+        self.jitter = jitter
+        self.embed_latency = embed_latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _sleep(self, seconds: float):
+        if self.jitter:
+            seconds *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        time.sleep(max(0.0, seconds))
+
+    def _completion(self, prompt_chars: int):
+        reply = random.choice(CANNED_REPLIES)
+        eval_count = len(reply.split())
+        prompt_eval_count = max(1, prompt_chars // 4)
+
+        start = time.perf_counter_ns()
+        self._sleep(self.base_latency + eval_count * self.per_token_latency)
+        total = time.perf_counter_ns() - start
+
+        timings = {
+            'done': True,
+            'total_duration': total,
+            'prompt_eval_count': prompt_eval_count,
+            'prompt_eval_duration': int(total * 0.3),
+            'eval_count': eval_count,
+            'eval_duration': int(total * 0.7),
+        }
+        return reply, timings
+
+    def _embedding(self, text: str):
+        self._sleep(self.embed_latency)
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], 'little')
+        return np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).tolist()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                model = request.get('model', 'stub')
+                with server._lock:
+                    server.requests += 1
+
+                if self.path == '/api/chat':
+                    prompt_chars = sum(len(m.get('content', '')) for m in request.get('messages', []))
+                    reply, timings = server._completion(prompt_chars)
+                    self._send_json({'model': model, 'message': {'role': 'assistant', 'content': reply}, **timings})
+                elif self.path == '/api/generate':
+                    reply, timings = server._completion(len(request.get('prompt', '')))
+                    self._send_json({'model': model, 'response': reply, **timings})
+                elif self.path == '/api/embeddings':
+                    self._send_json({'embedding': server._embedding(request.get('prompt', ''))})
+                else:
+                    self._send_json({'error': f"unknown endpoint {self.path}"}, status=404)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Serve on a daemon thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='stub-ollama', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in Ollama server with configurable latency")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--base-latency', type=float, default=0.2, help="seconds per chat/generate request")
+    parser.add_argument('--per-token-latency', type=float, default=0.01, help="extra seconds per generated token")
+    parser.add_argument('--jitter', type=float, default=0.1, help="relative uniform jitter on latency")
+    parser.add_argument('--embed-latency', type=float, default=0.01, help="seconds per embedding request")
+    args = parser.parse_args()
+
+    server = StubOllamaServer(args.host, args.port, args.base_latency, args.per_token_latency,
+                              args.jitter, args.embed_latency)
+    print(f"🧪 Stub Ollama listening on {server.url} (set OLLAMA_HOST to use it)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
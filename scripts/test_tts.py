@@ -51,6 +51,19 @@ def main():
     print(f"✅ Natural speech complete")
     print()
 
+    # Test 4: Long reply - later sentences are synthesized while earlier ones play
+    print("Test 4: Long Reply")
+    print("-" * 50)
+    test_reply = ("Heat pumps move heat instead of generating it. In winter they pull warmth from the outside air, "
+                  "even when it feels cold. A refrigerant absorbs that heat and a compressor raises its temperature. "
+                  "In summer the cycle runs in reverse, so the same unit works as an air conditioner.")
+    start = time.time()
+    tts.speak(test_reply)
+    elapsed = time.time() - start
+    print(f"⏱️  Time: {elapsed:.3f}s ({tts.backend.name} backend)")
+    print(f"✅ Long reply complete")
+    print()
+
     # Cleanup
     tts.cleanup()
 
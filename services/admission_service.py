@@ -0,0 +1,159 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.tracing_service import tracer
+from services.logging_service import get_logger
+
+logger = get_logger('admission')
+
+# Priority classes, most urgent first
+PRIORITIES = {'auth': 0, 'interactive': 1}
+# Whisper decoding profile → priority class
+PROFILE_PRIORITY = {'auth': 'auth', 'conversation': 'interactive'}
+
+# Spoken to a session whose request has been queued for a while
+BACKPRESSURE_MESSAGE = "One moment please."
+
+
+class Overloaded(Exception):
+    """A request was turned away: its queue was full or it waited too long"""
+
+
+class AdmissionController:
+    def __init__(self, name: str, capacity: int, queue_limits: Dict[str, int] = None,
+                 backpressure_after: float = None, max_wait: float = None):
+        """
+        Priority admission in front of a shared resource
+
+        At most `capacity` requests run at once. The rest wait in one
+        priority queue (auth before interactive, FIFO within a class)
+        and a finishing request hands its slot straight to the head of
+        the queue, so a login never waits behind more than the requests
+        already running plus earlier logins. Each class has its own
+        queue bound; arrivals beyond it are rejected at once.
+
+        Args:
+            name: Resource name used in logs and span names ('<name>.admit.<class>')
+            capacity: Concurrent requests (0 = unlimited, admission is a no-op)
+            queue_limits: Waiting requests allowed per class (default: config.ADMISSION_QUEUE_*)
+            backpressure_after: Seconds in the queue before on_wait is called
+                (default: config.ADMISSION_BACKPRESSURE_SECONDS, 0 = never)
+            max_wait: Seconds in the queue before giving up with Overloaded
+                (default: config.ADMISSION_MAX_WAIT_SECONDS, 0 = wait forever)
+        """
+        self.name = name
+        self.capacity = capacity
+        self.queue_limits = queue_limits or {
+            'auth': config.ADMISSION_QUEUE_AUTH,
+            'interactive': config.ADMISSION_QUEUE_INTERACTIVE,
+        }
+        self.backpressure_after = config.ADMISSION_BACKPRESSURE_SECONDS if backpressure_after is None else backpressure_after
+        self.max_wait = config.ADMISSION_MAX_WAIT_SECONDS if max_wait is None else max_wait
+
+        self._lock = threading.Lock()
+        self._waiting = []  # heap of (priority, sequence, event, class)
+        self._sequence = itertools.count()
+        self.running = 0
+        self.queued = {cls: 0 for cls in PRIORITIES}
+        self.stats = {cls: {'admitted': 0, 'rejected': 0, 'backpressure': 0} for cls in PRIORITIES}
+
+    @contextmanager
+    def admit(self, priority: str = 'interactive', on_wait: Optional[Callable[[], None]] = None):
+        """
+        Run the enclosed block once admitted
+
+        Args:
+            priority: 'auth' or 'interactive'
+            on_wait: Called once if the request is still queued after
+                backpressure_after seconds (e.g. to tell the user to hold on)
+
+        Raises:
+            Overloaded: The class's queue is full or max_wait ran out
+        """
+        if not self.capacity:
+            yield
+            return
+
+        self._acquire(priority, on_wait)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _acquire(self, priority: str, on_wait: Optional[Callable[[], None]]):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        start = time.perf_counter()
+
+        with self._lock:
+            if self.running < self.capacity and not self._waiting:
+                self.running += 1
+                self.stats[priority]['admitted'] += 1
+                tracer.record(f"{self.name}.admit.{priority}", 0.0)
+                return
+            if self.queued[priority] >= self.queue_limits[priority]:
+                self.stats[priority]['rejected'] += 1
+                logger.warning("%s %s queue full (%d waiting); rejecting", self.name, priority, self.queued[priority])
+                raise Overloaded(f"{self.name} is overloaded ({priority} queue full)")
+            granted = threading.Event()
+            entry = (PRIORITIES[priority], next(self._sequence), granted, priority)
+            heapq.heappush(self._waiting, entry)
+            self.queued[priority] += 1
+
+        # No callback if the request would give up first
+        backpressure = self.backpressure_after if not self.max_wait or self.backpressure_after < self.max_wait else 0
+        if not granted.wait(backpressure or self.max_wait or None) and backpressure:
+            with self._lock:
+                self.stats[priority]['backpressure'] += 1
+            if on_wait:
+                try:
+                    on_wait()
+                except Exception as e:
+                    logger.warning("Backpressure callback failed: %s", e)
+            remaining = self.max_wait - (time.perf_counter() - start) if self.max_wait else None
+            granted.wait(max(remaining, 0.0) if remaining is not None else None)
+
+        with self._lock:
+            # Checked under the lock: a slot may have been handed over since the wait timed out
+            if not granted.is_set():
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self.queued[priority] -= 1
+                self.stats[priority]['rejected'] += 1
+                logger.warning("%s %s request gave up after %.1fs", self.name, priority, time.perf_counter() - start)
+                raise Overloaded(f"{self.name} is overloaded (waited {self.max_wait:.1f}s)")
+
+        tracer.record(f"{self.name}.admit.{priority}", time.perf_counter() - start)
+
+    def _release(self):
+        with self._lock:
+            if self._waiting:
+                # Hand the slot straight to the most urgent waiter (running count unchanged)
+                _, _, granted, priority = heapq.heappop(self._waiting)
+                self.queued[priority] -= 1
+                self.stats[priority]['admitted'] += 1
+                granted.set()
+            else:
+                self.running -= 1
+
+    def snapshot(self) -> Dict:
+        """Current load: {'running', 'queued': {class: n}, 'stats': {class: {admitted, rejected, backpressure}}}"""
+        with self._lock:
+            return {
+                'running': self.running,
+                'queued': dict(self.queued),
+                'stats': {cls: dict(values) for cls, values in self.stats.items()},
+            }
+
+
+# Shared by every session in the process
+whisper_admission = AdmissionController('whisper', config.WHISPER_MAX_CONCURRENT)
+llm_admission = AdmissionController('llm', config.LLM_MAX_CONCURRENT)
@@ -0,0 +1,270 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Tuple
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.database_service import DatabaseService
+from services.logging_service import get_logger
+
+logger = get_logger('archive')
+
+# ffmpeg encoder arguments and file extension per archive codec
+CODECS = {
+    'flac': (['-c:a', 'flac', '-compression_level', '8'], '.flac'),
+    'opus': (['-c:a', 'libopus', '-b:a', '24k', '-application', 'voip'], '.opus'),
+}
+
+# Filenames written by AudioService.record_audio start with this timestamp
+RECORDING_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+# A recording still without a conversation row after this long never gets one
+# (e.g. a password attempt or a failed turn) and is archived anyway
+ORPHAN_SECONDS = 24 * 3600
+
+
+class AudioArchiveService:
+    def __init__(self, db: DatabaseService = None, codec: str = None):
+        """
+        Background archiver for recorded audio
+
+        Finished WAV recordings in config.AUDIO_PATH are transcoded,
+        moved into AUDIO_PATH/YYYY/MM/DD and their conversations.audio_path
+        rows are rewritten in bulk. Retention limits (age and total size)
+        are enforced on the archive.
+
+        Args:
+            db: Database service (a dedicated connection is opened if not provided)
+            codec: 'flac' or 'opus' (default: config.AUDIO_ARCHIVE_CODEC)
+        """
+        self.db = db or DatabaseService()
+        self.codec = codec or config.AUDIO_ARCHIVE_CODEC
+        if self.codec not in CODECS:
+            raise ValueError(f"Unknown audio archive codec: {self.codec}")
+
+        self.ffmpeg = shutil.which('ffmpeg')
+        self.audio_root = Path(config.AUDIO_PATH)
+        self._stop = threading.Event()
+        self._thread = None
+
+        if not self.ffmpeg:
+            logger.warning("ffmpeg not found - recordings will be sharded but not transcoded")
+        logger.info("Audio Archive Service initialized (%s)", self.codec)
+
+    @staticmethod
+    def recorded_at(path: Path) -> datetime:
+        """Recording time from the filename, falling back to the file's mtime"""
+        try:
+            return datetime.strptime(path.name[:15], RECORDING_TIMESTAMP_FORMAT)
+        except ValueError:
+            return datetime.fromtimestamp(path.stat().st_mtime)
+
+    def shard_dir(self, recorded_at: datetime) -> Path:
+        return self.audio_root / f"{recorded_at:%Y}" / f"{recorded_at:%m}" / f"{recorded_at:%d}"
+
+    def transcode(self, src: Path, dest: Path) -> bool:
+        """
+        Transcode one recording with ffmpeg
+
+        Args:
+            src: Source WAV file
+            dest: Destination file (extension should match the codec)
+
+        Returns:
+            True on success
+        """
+        encoder_args, _ = CODECS[self.codec]
+        tmp = dest.with_name(dest.name + '.part')
+        result = subprocess.run(
+            [self.ffmpeg, '-nostdin', '-loglevel', 'error', '-y', '-i', str(src), *encoder_args,
+             '-f', 'ogg' if self.codec == 'opus' else 'flac', str(tmp)],
+            capture_output=True
+        )
+        if result.returncode != 0:
+            logger.error("Failed to transcode %s: %s", src.name, result.stderr.decode(errors='replace').strip())
+            tmp.unlink(missing_ok=True)
+            return False
+        os.replace(tmp, dest)
+        return True
+
+    def pending_recordings(self, limit: int = 500) -> List[Path]:
+        """
+        Finished WAVs still sitting flat in the audio directory
+
+        Files younger than AUDIO_ARCHIVE_MIN_AGE_SECONDS are skipped so a
+        recording whose turn is still running is never moved.
+        """
+        cutoff = time.time() - config.AUDIO_ARCHIVE_MIN_AGE_SECONDS
+        pending = []
+        if not self.audio_root.exists():
+            return pending
+
+        with os.scandir(self.audio_root) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith('.wav'):
+                    continue
+                if entry.stat().st_mtime > cutoff:
+                    continue
+                pending.append(Path(entry.path))
+                if len(pending) >= limit:
+                    break
+        return pending
+
+    def archive_pending(self, batch_size: int = 500) -> int:
+        """
+        Transcode and shard one batch of finished recordings
+
+        Only recordings a conversation row already points at are moved:
+        the row is inserted after the reply is spoken, and a file moved
+        before that would leave the new row with a dangling path. Orphans
+        (ORPHAN_SECONDS without a row) are archived as they are.
+
+        Returns:
+            Number of recordings archived
+        """
+        recordings = [(src, self.recorded_at(src)) for src in self.pending_recordings(batch_size)]
+        if not recordings:
+            return 0
+
+        # Rows are written just after the recording, so a day of slack is plenty
+        since = min(recorded_at for _, recorded_at in recordings) - timedelta(days=1)
+        referenced = self.db.referenced_audio_paths([str(src) for src, _ in recordings], since=since)
+        orphaned = time.time() - ORPHAN_SECONDS
+
+        _, extension = CODECS[self.codec]
+        moves: List[Tuple[str, Optional[str]]] = []
+
+        for src, recorded_at in recordings:
+            if str(src) not in referenced and src.stat().st_mtime > orphaned:
+                continue
+            dest_dir = self.shard_dir(recorded_at)
+            dest_dir.mkdir(parents=True, exist_ok=True)
+
+            if self.ffmpeg:
+                dest = dest_dir / (src.stem + extension)
+                if not self.transcode(src, dest):
+                    continue
+            else:
+                # Copied like a transcode: the original stays until the database is updated
+                dest = dest_dir / src.name
+                tmp = dest.with_name(dest.name + '.part')
+                shutil.copy2(src, tmp)
+                os.replace(tmp, dest)
+
+            moves.append((str(src), str(dest)))
+
+        if not moves:
+            return 0
+
+        try:
+            updated = self.db.update_audio_paths(moves, since=since)
+        except Exception:
+            # The rows still point at the originals: drop the copies, the next run retries
+            for _, dest in moves:
+                Path(dest).unlink(missing_ok=True)
+            raise
+
+        # Only delete the originals once the database points at the archive
+        for src, _ in moves:
+            Path(src).unlink(missing_ok=True)
+
+        logger.info("Archived %d recordings (%d conversation rows updated)", len(moves), updated)
+        return len(moves)
+
+    def _archived_files(self):
+        """Yield (path, size) for archived files, oldest shard first"""
+        for year in sorted(p for p in self.audio_root.iterdir() if p.is_dir() and p.name.isdigit()):
+            for month in sorted(p for p in year.iterdir() if p.is_dir()):
+                for day in sorted(p for p in month.iterdir() if p.is_dir()):
+                    with os.scandir(day) as entries:
+                        files = sorted((e for e in entries if e.is_file()), key=lambda e: e.name)
+                    for entry in files:
+                        yield Path(entry.path), entry.stat().st_size
+
+    def enforce_retention(self) -> int:
+        """
+        Delete archived recordings past the age or total-size limits
+
+        Returns:
+            Number of files deleted
+        """
+        if not self.audio_root.exists():
+            return 0
+        if config.AUDIO_RETENTION_DAYS <= 0 and config.AUDIO_MAX_STORAGE_MB <= 0:
+            return 0
+
+        files = list(self._archived_files())
+        doomed = []
+
+        if config.AUDIO_RETENTION_DAYS > 0:
+            cutoff = datetime.now() - timedelta(days=config.AUDIO_RETENTION_DAYS)
+            cutoff_dir = str(self.shard_dir(cutoff))
+            doomed = [(path, size) for path, size in files if str(path.parent) < cutoff_dir]
+            files = files[len(doomed):]
+
+        if config.AUDIO_MAX_STORAGE_MB > 0:
+            excess = sum(size for _, size in files) - config.AUDIO_MAX_STORAGE_MB * 1024 * 1024
+            for path, size in files:
+                if excess <= 0:
+                    break
+                doomed.append((path, size))
+                excess -= size
+
+        if not doomed:
+            return 0
+
+        # Clear the rows first: a failed update leaves files and rows as they were
+        self.db.update_audio_paths([(str(path), None) for path, _ in doomed])
+        for path, _ in doomed:
+            path.unlink(missing_ok=True)
+
+        # Remove shard directories left empty
+        for path in {path.parent for path, _ in doomed}:
+            for directory in (path, path.parent, path.parent.parent):
+                try:
+                    directory.rmdir()
+                except OSError:
+                    break
+
+        logger.info("Retention removed %d archived recordings", len(doomed))
+        return len(doomed)
+
+    def run_once(self) -> int:
+        """Archive everything pending, then apply retention"""
+        archived = 0
+        while True:
+            count = self.archive_pending()
+            archived += count
+            if count == 0 or self._stop.is_set():
+                break
+        self.enforce_retention()
+        return archived
+
+    def _run(self, interval: int):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("Audio archiver error: %s", e)
+            self._stop.wait(interval)
+
+    def start(self, interval: int = None):
+        """Run the archiver periodically on a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        interval = interval or config.AUDIO_ARCHIVE_INTERVAL_SECONDS
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name='audio-archiver', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and close the database connection"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+        self.db.close()
@@ -0,0 +1,117 @@
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 400  # 25 ms
+HOP_LENGTH = 160  # 10 ms
+N_FFT = 512
+N_MELS = 40
+N_MFCC = 20
+# Frames more than this many dB below the loudest frame are treated as silence
+SILENCE_DB = 35.0
+
+
+def _mel_filterbank(n_mels: int, n_fft: int, rate: int) -> np.ndarray:
+    """(n_mels, n_fft // 2 + 1) triangular mel filters"""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(20.0), hz_to_mel(rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / rate).astype(int)
+
+    filters = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            filters[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filters[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filters
+
+
+def _dct_matrix(n_out: int, n_in: int) -> np.ndarray:
+    """Orthonormal DCT-II basis as an (n_in, n_out) matrix"""
+    n = np.arange(n_in)
+    k = np.arange(n_out)
+    basis = np.cos(np.pi / n_in * (n[:, None] + 0.5) * k[None, :]) * np.sqrt(2.0 / n_in)
+    basis[:, 0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+def frame_level_db(samples: np.ndarray) -> float:
+    """RMS level of a block of float samples in dBFS"""
+    if len(samples) == 0:
+        return -120.0
+    return float(10.0 * np.log10(np.mean(np.square(samples, dtype=np.float64)) + 1e-12))
+
+
+class MFCCExtractor:
+    """MFCC features for 16 kHz mono audio (25 ms frames, 10 ms hop)"""
+
+    def __init__(self):
+        self.mel_filters = _mel_filterbank(N_MELS, N_FFT, SAMPLE_RATE)
+        self.dct = _dct_matrix(N_MFCC, N_MELS)
+        self.window = np.hamming(FRAME_LENGTH).astype(np.float32)
+
+    def mfcc(self, samples: np.ndarray, voiced_only: bool = False) -> np.ndarray:
+        """
+        MFCCs of a 16 kHz signal
+
+        Args:
+            samples: Mono float32 samples
+            voiced_only: Drop frames more than SILENCE_DB below the loudest one
+
+        Returns:
+            (frames, N_MFCC) matrix
+        """
+        if len(samples) < FRAME_LENGTH:
+            return np.zeros((0, N_MFCC), dtype=np.float32)
+
+        emphasized = np.append(samples[0], samples[1:] - 0.97 * samples[:-1]).astype(np.float32)
+        frames = np.lib.stride_tricks.sliding_window_view(emphasized, FRAME_LENGTH)[::HOP_LENGTH] * self.window
+
+        power = np.abs(np.fft.rfft(frames, n=N_FFT)) ** 2
+        if voiced_only:
+            energy_db = 10.0 * np.log10(power.sum(axis=1) + 1e-10)
+            power = power[energy_db > energy_db.max() - SILENCE_DB]
+
+        log_mel = np.log(power @ self.mel_filters.T + 1e-10)
+        return (log_mel @ self.dct).astype(np.float32)
+
+
+class EnergyVAD:
+    """
+    Energy voice-activity detector with an adaptive noise floor
+
+    A block counts as speech when it is threshold_db above the tracked
+    background level (and above an absolute minimum). The first
+    warmup_blocks only calibrate the floor. Afterwards the floor follows
+    the background during non-speech and drifts up only slowly during
+    speech, so a long utterance is not absorbed into it.
+    """
+
+    def __init__(self, threshold_db: float = 12.0, min_db: float = -55.0, warmup_blocks: int = 8):
+        self.threshold_db = threshold_db
+        self.min_db = min_db
+        self.warmup_blocks = warmup_blocks
+        self.reset()
+
+    def reset(self):
+        self.floor_db = None
+        self.blocks = 0
+
+    def is_speech(self, samples: np.ndarray) -> bool:
+        level = frame_level_db(samples)
+        self.blocks += 1
+        if self.floor_db is None or self.blocks <= self.warmup_blocks:
+            self.floor_db = level if self.floor_db is None else min(self.floor_db, level)
+            return False
+
+        speech = level > self.min_db and level > self.floor_db + self.threshold_db
+        if level < self.floor_db:
+            self.floor_db = level
+        else:
+            self.floor_db += (0.002 if speech else 0.05) * (level - self.floor_db)
+        return speech
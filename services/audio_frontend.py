@@ -0,0 +1,220 @@
+from math import gcd
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+
+# Noise gate STFT (at the 16 kHz output rate)
+GATE_FRAME = 512
+GATE_HOP = GATE_FRAME // 2
+
+
+class PolyphaseResampler:
+    """
+    Streaming rational resampler (windowed-sinc FIR in polyphase form)
+
+    Conceptually the input is upsampled by `up`, low-pass filtered and
+    downsampled by `down`; only the filter taps that touch real input
+    samples are ever evaluated, and all outputs of a chunk are computed
+    in one gather + multiply-add. Filter history carries over between
+    chunks, so chunk boundaries are seamless.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, taps_per_phase: int = 32):
+        divisor = gcd(in_rate, out_rate)
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.taps = taps_per_phase
+
+        # Prototype low-pass at the upsampled rate, cut just below the lower Nyquist
+        length = self.up * taps_per_phase
+        cutoff = 0.5 / max(self.up, self.down) * 0.92
+        n = np.arange(length) - (length - 1) / 2
+        prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0) * self.up
+        # phases[p, j] multiplies input sample i - j for outputs at upsampled index i * up + p
+        self.phases = prototype.reshape(taps_per_phase, self.up).T.astype(np.float32)
+        self.reset()
+
+    def reset(self):
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        # Upsampled-rate position of the next output, relative to the start of history
+        self.position = (self.taps - 1) * self.up
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.up == self.down:
+            return samples.astype(np.float32, copy=False)
+
+        buffer = np.concatenate([self.history, samples.astype(np.float32, copy=False)])
+        end = len(buffer) * self.up
+        positions = np.arange(self.position, end, self.down)
+
+        inputs = positions // self.up
+        phases = positions % self.up
+        window = buffer[inputs[:, None] - np.arange(self.taps)[None, :]]
+        output = np.einsum('ij,ij->i', window, self.phases[phases])
+
+        keep = self.taps - 1
+        next_position = positions[-1] + self.down if len(positions) else self.position
+        self.position = next_position - (len(buffer) - keep) * self.up
+        self.history = buffer[len(buffer) - keep:]
+        return output
+
+
+class SpectralGate:
+    """
+    Streaming STFT noise gate
+
+    The noise spectrum is tracked from frames close to the noise floor;
+    every frequency bin is then attenuated in proportion to how much of
+    its power is noise (spectral subtraction), never below min_gain so
+    speech is not chopped up. sqrt-Hann analysis and synthesis windows at
+    50% overlap reconstruct the signal exactly when no bin is gated.
+    """
+
+    def __init__(self, strength: float = 1.5, min_gain: float = 0.1):
+        self.strength = strength
+        self.min_gain = min_gain
+        self.window = np.sqrt(np.hanning(GATE_FRAME + 1)[:-1]).astype(np.float32)
+        self.reset()
+
+    def reset(self):
+        self.noise = None
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.overlap = np.zeros(GATE_HOP, dtype=np.float32)
+        self.gain = None
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        buffer = np.concatenate([self.pending, samples])
+        n_frames = (len(buffer) - GATE_FRAME) // GATE_HOP + 1 if len(buffer) >= GATE_FRAME else 0
+        if n_frames <= 0:
+            self.pending = buffer
+            return np.zeros(0, dtype=np.float32)
+
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, GATE_FRAME)[::GATE_HOP][:n_frames]
+        spectrum = np.fft.rfft(frames * self.window, axis=1)
+        power = np.abs(spectrum) ** 2
+
+        if self.noise is None:
+            self.noise = power.min(axis=0)
+        frame_power = power.sum(axis=1)
+        quiet = frame_power < 2.0 * self.noise.sum()
+        if quiet.any():
+            self.noise = 0.9 * self.noise + 0.1 * power[quiet].mean(axis=0)
+        else:
+            # Let the estimate recover if the room got quieter
+            self.noise = np.minimum(self.noise, power.min(axis=0))
+
+        gain = np.clip(1.0 - self.strength * self.noise / (power + 1e-12), self.min_gain, 1.0)
+        # Let gains fall off gradually between frames to avoid "musical noise"
+        previous = self.gain
+        for i in range(n_frames):
+            if previous is not None:
+                gain[i] = np.maximum(gain[i], 0.5 * previous)
+            previous = gain[i]
+        self.gain = previous
+
+        gated = np.fft.irfft(spectrum * gain, n=GATE_FRAME, axis=1).astype(np.float32) * self.window
+
+        # Overlap-add: each frame completes GATE_HOP output samples
+        output = np.empty(n_frames * GATE_HOP, dtype=np.float32)
+        overlap = self.overlap
+        for i in range(n_frames):
+            output[i * GATE_HOP:(i + 1) * GATE_HOP] = overlap + gated[i, :GATE_HOP]
+            overlap = gated[i, GATE_HOP:]
+        self.overlap = overlap
+
+        self.pending = buffer[n_frames * GATE_HOP:]
+        return output
+
+
+class AudioFrontend:
+    def __init__(self, device_rate: int, channels: int, out_rate: int = 16000, noise_gate: bool = None):
+        """
+        Capture preprocessing: device PCM in, clean 16 kHz mono float out
+
+        Each block is downmixed, resampled to out_rate, DC-corrected and
+        (optionally) noise-gated, all with vectorized NumPy over the
+        whole block.
+
+        Args:
+            device_rate: Native sample rate of the input device
+            channels: Native channel count of the input device
+            out_rate: Output sample rate (Whisper expects 16 kHz)
+            noise_gate: Apply the spectral noise gate (default: config.AUDIO_NOISE_GATE)
+        """
+        self.device_rate = device_rate
+        self.channels = channels
+        self.out_rate = out_rate
+        self.resampler = PolyphaseResampler(device_rate, out_rate)
+        self.gate = SpectralGate() if (config.AUDIO_NOISE_GATE if noise_gate is None else noise_gate) else None
+        self.reset()
+
+    def reset(self):
+        """Forget stream state (call when a new stream is opened)"""
+        self.resampler.reset()
+        if self.gate:
+            self.gate.reset()
+        self.dc = None
+
+    def process(self, pcm: bytes) -> np.ndarray:
+        """
+        Process one block of interleaved int16 device audio
+
+        Args:
+            pcm: Raw bytes as read from the stream
+
+        Returns:
+            float32 samples at out_rate (length varies slightly per block)
+        """
+        samples = np.frombuffer(pcm, dtype='<i2').reshape(-1, self.channels)
+        mono = samples.mean(axis=1, dtype=np.float32) if self.channels > 1 else samples[:, 0].astype(np.float32)
+
+        mono = self.resampler.process(mono / np.float32(32768.0))
+
+        # DC offset tracked across blocks
+        mean = float(mono.mean()) if len(mono) else 0.0
+        self.dc = mean if self.dc is None else 0.95 * self.dc + 0.05 * mean
+        mono = mono - np.float32(self.dc)
+
+        if self.gate:
+            mono = self.gate.process(mono)
+        return mono
+
+
+def normalize_gain(samples: np.ndarray, target_db: float = None, max_gain_db: float = None) -> np.ndarray:
+    """
+    Scale an utterance to a target loudness
+
+    Loudness is measured over the louder half of 20 ms blocks, so pauses
+    don't pull the level down. Gain is capped at max_gain_db and the
+    peak kept under full scale.
+
+    Args:
+        samples: float32 samples
+        target_db: Target RMS in dBFS (default: config.AUDIO_TARGET_DBFS)
+        max_gain_db: Largest boost applied (default: config.AUDIO_MAX_GAIN_DB)
+
+    Returns:
+        Scaled float32 samples
+    """
+    target_db = config.AUDIO_TARGET_DBFS if target_db is None else target_db
+    max_gain_db = config.AUDIO_MAX_GAIN_DB if max_gain_db is None else max_gain_db
+
+    block = 320
+    n_blocks = len(samples) // block
+    if n_blocks == 0:
+        return samples
+    energies = np.mean(np.square(samples[:n_blocks * block].reshape(n_blocks, block)), axis=1)
+    loud = np.sort(energies)[n_blocks // 2:]
+    rms = np.sqrt(loud.mean())
+    if rms <= 0:
+        return samples
+
+    gain = min(10 ** ((target_db - 20 * np.log10(rms)) / 20), 10 ** (max_gain_db / 20))
+    peak = np.abs(samples).max()
+    if peak * gain > 0.99:
+        gain = 0.99 / peak
+    return (samples * np.float32(gain)).astype(np.float32)
@@ -0,0 +1,125 @@
+import struct
+import wave
+from pathlib import Path
+from typing import BinaryIO, Iterable, Tuple, Union
+
+import numpy as np
+
+
+def write_wav(filepath: Union[str, Path, BinaryIO], frames: Iterable[bytes], channels: int, sample_width: int,
+              rate: int):
+    """
+    Write captured PCM frames to a WAV file
+
+    Args:
+        filepath: Destination path or writable binary file object
+        frames: Raw PCM chunks as read from the input stream
+        channels: Number of interleaved channels
+        sample_width: Bytes per sample (2 for int16)
+        rate: Sample rate in Hz
+    """
+    with wave.open(filepath if hasattr(filepath, 'write') else str(filepath), 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(rate)
+        wf.writeframes(b''.join(frames))
+
+
+def read_wav(filepath: Union[str, Path, BinaryIO]) -> Tuple[np.ndarray, int]:
+    """
+    Read a 16-bit PCM WAV file as mono float32
+
+    Args:
+        filepath: Source path or readable binary file object
+
+    Returns:
+        (samples in [-1, 1), sample rate in Hz)
+    """
+    with wave.open(filepath if hasattr(filepath, 'read') else str(filepath), 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"Unsupported sample width: {wf.getsampwidth()} bytes")
+        channels = wf.getnchannels()
+        rate = wf.getframerate()
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype='<i2')
+
+    samples = pcm.reshape(-1, channels).mean(axis=1, dtype=np.float32) if channels > 1 else pcm.astype(np.float32)
+    return samples / 32768.0, rate
+
+
+def _extended_float(data: bytes) -> float:
+    """Decode the 80-bit IEEE extended float AIFF stores its sample rate in"""
+    exponent = int.from_bytes(data[:2], 'big') & 0x7FFF
+    mantissa = int.from_bytes(data[2:10], 'big')
+    return mantissa * 2.0 ** (exponent - 16383 - 63) if mantissa else 0.0
+
+
+def read_aiff(filepath: Union[str, Path, BinaryIO]) -> Tuple[np.ndarray, int]:
+    """
+    Read a 16-bit PCM AIFF / AIFF-C file as mono float32
+
+    macOS's speech synthesizer writes AIFF whatever the file is called.
+    AIFF-C is accepted uncompressed ('NONE', big-endian) or as 'sowt'
+    (little-endian).
+
+    Args:
+        filepath: Source path or readable binary file object
+
+    Returns:
+        (samples in [-1, 1), sample rate in Hz)
+    """
+    if hasattr(filepath, 'read'):
+        data = filepath.read()
+    else:
+        data = Path(filepath).read_bytes()
+    if data[:4] != b'FORM' or data[8:12] not in (b'AIFF', b'AIFC'):
+        raise ValueError("Not an AIFF file")
+
+    channels = width = rate = None
+    dtype = '>i2'
+    pcm = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id = data[offset:offset + 4]
+        size = struct.unpack('>I', data[offset + 4:offset + 8])[0]
+        body = data[offset + 8:offset + 8 + size]
+        if chunk_id == b'COMM':
+            channels, _, width = struct.unpack('>hIh', body[:8])
+            rate = _extended_float(body[8:18])
+            if data[8:12] == b'AIFC':
+                compression = body[18:22]
+                if compression == b'sowt':
+                    dtype = '<i2'
+                elif compression != b'NONE':
+                    raise ValueError(f"Unsupported AIFF-C compression: {compression.decode(errors='replace')}")
+        elif chunk_id == b'SSND':
+            data_offset = struct.unpack('>I', body[:4])[0]
+            pcm = body[8 + data_offset:]
+        # Chunks are padded to an even length
+        offset += 8 + size + (size & 1)
+
+    if channels is None or pcm is None:
+        raise ValueError("AIFF file has no COMM or SSND chunk")
+    if width != 16:
+        raise ValueError(f"Unsupported sample width: {width} bits")
+
+    pcm = np.frombuffer(pcm[:len(pcm) // (2 * channels) * 2 * channels], dtype=dtype)
+    samples = pcm.reshape(-1, channels).mean(axis=1, dtype=np.float32) if channels > 1 else pcm.astype(np.float32)
+    return samples / 32768.0, int(round(rate))
+
+
+def read_audio(filepath: Union[str, Path]) -> Tuple[np.ndarray, int]:
+    """
+    Read a 16-bit PCM WAV or AIFF file as mono float32, going by its header
+
+    Raises:
+        ValueError: The file is empty or in another format
+    """
+    with open(filepath, 'rb') as f:
+        header = f.read(12)
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return read_wav(filepath)
+    if header[:4] == b'FORM' and header[8:12] in (b'AIFF', b'AIFC'):
+        return read_aiff(filepath)
+    if not header:
+        raise ValueError(f"Audio file is empty: {filepath}")
+    raise ValueError(f"Unsupported audio file format (header {header[:4]!r}): {filepath}")
@@ -1,43 +1,131 @@
+import itertools
+import math
 import pyaudio
-import wave
+from collections import deque
 from pathlib import Path
 from datetime import datetime
+from typing import Iterable, Iterator, Optional
 import sys
-import whisper
+
+import numpy as np
 
 sys.path.append(str(Path(__file__).parent.parent))
 from config.config import config
+from services.tracing_service import tracer
+from services.audio_io import write_wav
+from services.audio_features import EnergyVAD
+from services.audio_frontend import AudioFrontend, normalize_gain
+from services.transcription_service import TranscriptionService
+from services.admission_service import PROFILE_PRIORITY, whisper_admission
+from services.logging_service import get_logger
+
+logger = get_logger('audio')
+
+
+def block_count(milliseconds: float) -> int:
+    """Number of config.AUDIO_BLOCK_MS blocks covering a duration"""
+    return max(1, math.ceil(milliseconds / config.AUDIO_BLOCK_MS))
+
+
+def split_speech(blocks: Iterable[np.ndarray], end_silence_ms: int = None, max_seconds: float = None,
+                 start_timeout: float = None) -> Iterator[np.ndarray]:
+    """
+    Split a stream of audio blocks into speech segments
+
+    Each block is only checked for energy against an adaptive noise
+    floor, so waiting for speech costs almost no CPU. A segment starts
+    with a short pre-roll before the onset and ends after end_silence_ms
+    of silence, max_seconds, or the end of the stream.
+
+    Args:
+        blocks: 16 kHz mono float32 blocks of config.AUDIO_BLOCK_MS each
+        end_silence_ms: Silence that ends a segment (default: config.VAD_END_SILENCE_MS)
+        max_seconds: Cut segments at this length (optional)
+        start_timeout: Stop if no speech starts within this many seconds (optional)
+
+    Yields:
+        Samples of each segment
+    """
+    vad = EnergyVAD(threshold_db=config.VAD_THRESHOLD_DB)
+    preroll = deque(maxlen=block_count(config.VAD_PREROLL_MS))
+    hangover = block_count(end_silence_ms or config.VAD_END_SILENCE_MS)
+    max_blocks = block_count(max_seconds * 1000) if max_seconds else None
+    timeout_blocks = block_count(start_timeout * 1000) if start_timeout else None
+
+    segment = None
+    silent = waited = 0
+    for block in blocks:
+        speech = vad.is_speech(block)
+
+        if segment is None:
+            if speech:
+                segment = list(preroll) + [block]
+                silent = 0
+                continue
+            preroll.append(block)
+            waited += 1
+            if timeout_blocks and waited >= timeout_blocks:
+                return
+            continue
+
+        segment.append(block)
+        silent = 0 if speech else silent + 1
+        if silent >= hangover or (max_blocks and len(segment) >= max_blocks):
+            yield np.concatenate(segment)
+            segment = None
+            preroll.clear()
+            waited = 0
+
+    if segment:
+        yield np.concatenate(segment)
+
 
 class AudioService:
-    def __init__(self):
-        self.CHUNK = 1024
+    def __init__(self, transcriber: TranscriptionService = None, endpointing: bool = False,
+                 load_transcriber: bool = True):
+        """
+        Microphone capture and transcription
+
+        The device is opened at its native sample rate and channel count;
+        AudioFrontend turns each block into clean 16 kHz mono as it
+        arrives, and finished utterances are gain-normalized before being
+        saved and handed to Whisper as a float array.
+
+        Args:
+            transcriber: Speech-to-text service (loaded if not provided)
+            endpointing: Record each utterance until the speaker stops
+                (voice activity detection) instead of for a fixed duration
+            load_transcriber: Load Whisper when no transcriber is given
+                (False for capture only, e.g. wake word enrollment)
+        """
         self.FORMAT = pyaudio.paInt16
         self.CHANNELS = 1
         self.RATE = 16000
         self.audio = pyaudio.PyAudio()
-        self.whisper_model = whisper.load_model("base")
-        print("🎙️ Whisper model loaded")
-        print("🎤 Audio service initialized")
 
-    def record_audio(self, duration=5, filename=None):
-        print(f"🔴 Recording for {duration} seconds...")
+        device = self.audio.get_default_input_device_info()
+        self.device_rate = config.AUDIO_DEVICE_RATE or int(device['defaultSampleRate'])
+        self.device_channels = config.AUDIO_DEVICE_CHANNELS or max(1, min(int(device['maxInputChannels']), 2))
+        # Device frames per block
+        self.CHUNK = int(self.device_rate * config.AUDIO_BLOCK_MS / 1000)
+        self.frontend = AudioFrontend(self.device_rate, self.device_channels, self.RATE)
+
+        self.transcriber = transcriber or (TranscriptionService() if load_transcriber else None)
+        self.endpointing = endpointing
+        logger.info("Audio service initialized (%s: %d Hz, %d ch)",
+                    device.get('name', 'default input'), self.device_rate, self.device_channels)
 
-        stream = self.audio.open(
+    def _open_stream(self):
+        self.frontend.reset()
+        return self.audio.open(
             format=self.FORMAT,
-            channels=self.CHANNELS,
-            rate=self.RATE,
+            channels=self.device_channels,
+            rate=self.device_rate,
             input=True,
             frames_per_buffer=self.CHUNK
         )
 
-        frames = []
-        for i in range(0, int(self.RATE / self.CHUNK * duration)):
-            data = stream.read(self.CHUNK)
-            frames.append(data)
-
-        stream.stop_stream()
-        stream.close()
-
+    def _save(self, samples: np.ndarray, filename: str = None) -> str:
         if filename is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"{timestamp}_recording.wav"
@@ -45,25 +133,123 @@ class AudioService:
         filepath = config.AUDIO_PATH / filename
         config.AUDIO_PATH.mkdir(parents=True, exist_ok=True)
 
-        with wave.open(str(filepath), 'wb') as wf:
-            wf.setnchannels(self.CHANNELS)
-            wf.setsampwidth(self.audio.get_sample_size(self.FORMAT))
-            wf.setframerate(self.RATE)
-            wf.writeframes(b''.join(frames))
+        pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+        write_wav(filepath, [pcm], self.CHANNELS, 2, self.RATE)
 
-        print(f"✅ Audio saved: {filepath}")
+        logger.debug("Audio saved: %s", filepath)
         return str(filepath)
 
-    def transcribe_audio(self, audio_path):
-        print("🔄 Transcribing audio...")
-        result = self.whisper_model.transcribe(audio_path)
-        text = result['text'].strip()
-        print(f"📝 Transcribed: {text}")
-        return text
+    def _read_blocks(self) -> Iterator[np.ndarray]:
+        """Preprocessed 16 kHz blocks from the microphone, until the generator is closed"""
+        stream = self._open_stream()
+        try:
+            while True:
+                yield self.frontend.process(stream.read(self.CHUNK, exception_on_overflow=False))
+        finally:
+            stream.stop_stream()
+            stream.close()
+
+    def capture(self, duration=5) -> np.ndarray:
+        """
+        Record for a fixed duration
+
+        Returns:
+            Preprocessed, gain-normalized 16 kHz mono float32 samples
+        """
+        logger.debug("Recording for %s seconds", duration)
+
+        blocks = self._read_blocks()
+        samples = np.concatenate(list(itertools.islice(blocks, block_count(duration * 1000))))
+        blocks.close()
+
+        return normalize_gain(samples)
+
+    @tracer.traced('record')
+    def record_audio(self, duration=5, filename=None):
+        return self._save(self.capture(duration), filename)
+
+    def speech_segments(self, end_silence_ms: int = None, max_seconds: float = None,
+                        start_timeout: float = None) -> Iterator[np.ndarray]:
+        """
+        Yield speech segments from the live microphone stream (see split_speech)
+
+        Yields:
+            Preprocessed 16 kHz mono float32 samples of each segment (not gain-normalized)
+        """
+        blocks = self._read_blocks()
+        try:
+            yield from split_speech(blocks, end_silence_ms, max_seconds, start_timeout)
+        finally:
+            blocks.close()
+
+    @tracer.traced('vad')
+    def capture_until_silence(self, max_duration: float = None, start_timeout: float = None) -> Optional[np.ndarray]:
+        """
+        Record one utterance, from speech onset until the speaker stops
+
+        Args:
+            max_duration: Longest utterance in seconds (default: config.VAD_MAX_UTTERANCE_SECONDS)
+            start_timeout: Give up if nobody speaks within this many seconds
+                (default: config.VAD_START_TIMEOUT_SECONDS)
+
+        Returns:
+            Gain-normalized 16 kHz mono float32 samples, or None if no speech was heard
+        """
+        segments = self.speech_segments(
+            max_seconds=max_duration or config.VAD_MAX_UTTERANCE_SECONDS,
+            start_timeout=start_timeout or config.VAD_START_TIMEOUT_SECONDS
+        )
+        samples = next(segments, None)
+        segments.close()
+
+        if samples is None:
+            logger.debug("No speech before timeout")
+            return None
+        return normalize_gain(samples)
+
+    def record_until_silence(self, max_duration: float = None, start_timeout: float = None,
+                             filename: str = None) -> Optional[str]:
+        """
+        Record one utterance to a WAV file (see capture_until_silence)
+
+        Returns:
+            Path to the WAV file, or None if no speech was heard
+        """
+        samples = self.capture_until_silence(max_duration, start_timeout)
+        return None if samples is None else self._save(samples, filename)
+
+    def transcribe_audio(self, audio, profile: str = None, on_wait=None):
+        """
+        Transcribe through Whisper admission control
+
+        The profile's priority class decides the queue position when
+        sessions compete for Whisper (auth before conversation).
+
+        Args:
+            audio: Path or 16 kHz float32 samples
+            profile: Decoding profile (default: config.WHISPER_PROFILE)
+            on_wait: Called if the request has to queue for a while
+
+        Raises:
+            Overloaded: Whisper is too busy to take the request
+        """
+        if self.transcriber is None:
+            raise RuntimeError("AudioService was created with load_transcriber=False")
+        priority = PROFILE_PRIORITY.get(profile or config.WHISPER_PROFILE, 'interactive')
+        with whisper_admission.admit(priority, on_wait):
+            return self.transcriber.transcribe(audio, profile)
 
-    def record_and_transcribe(self, duration=5):
-        filepath = self.record_audio(duration)
-        text = self.transcribe_audio(filepath)
+    def record_and_transcribe(self, duration=5, profile: str = None, on_wait=None):
+        if self.endpointing:
+            samples = self.capture_until_silence()
+            if samples is None:
+                return {'audio_path': None, 'text': ''}
+        else:
+            with tracer.span('record'):
+                samples = self.capture(duration)
+        filepath = self._save(samples)
+        # Whisper gets the in-memory samples; the WAV is only for the archive
+        text = self.transcribe_audio(samples, profile, on_wait)
         return {'audio_path': filepath, 'text': text}
 
     def cleanup(self):
@@ -4,14 +4,21 @@ from pathlib import Path
 from typing import Optional, Dict
 from datetime import datetime
 
+import numpy as np
+
 sys.path.append(str(Path(__file__).parent.parent))
 from services.database_service import DatabaseService
+from services.embedding_service import pack_embedding, unpack_embedding
+from services.tracing_service import tracer
+from services.logging_service import get_logger
+
+logger = get_logger('auth')
 
 class AuthService:
     def __init__(self):
         """Initialize authentication service"""
         self.db = DatabaseService()
-        print("🔐 Auth Service initialized")
+        logger.info("Auth Service initialized")
 
     def _hash_password(self, password: str) -> str:
         """
@@ -68,9 +75,10 @@ class AuthService:
             cur.close()
             return result is not None
         except Exception as e:
-            print(f"❌ Error checking user existence: {e}")
+            logger.error("Error checking user existence: %s", e)
             return False
 
+    @tracer.traced('auth.register')
     def register_user(self, user_id: int, password: str) -> bool:
         """
         Register a new user with ID and password
@@ -85,7 +93,7 @@ class AuthService:
         try:
             # Check if user already exists
             if self.user_exists(user_id):
-                print(f"⚠️  User {user_id} already exists")
+                logger.warning("User %s already exists", user_id)
                 return False
 
             # Hash the password
@@ -103,14 +111,15 @@ class AuthService:
             self.db.conn.commit()
             cur.close()
 
-            print(f"✅ User {user_id} registered successfully")
+            logger.info("User %s registered", user_id)
             return True
 
         except Exception as e:
-            print(f"❌ Error registering user: {e}")
+            logger.error("Error registering user: %s", e)
             self.db.conn.rollback()
             return False
 
+    @tracer.traced('auth.verify')
     def verify_user(self, user_id: int, password: str) -> bool:
         """
         Verify user credentials (login)
@@ -130,14 +139,14 @@ class AuthService:
             cur.close()
 
             if result is None:
-                print(f"⚠️  User {user_id} not found")
+                logger.warning("User %s not found", user_id)
                 return False
 
             password_hash = result[0]
 
             # Verify password
             if self._verify_password(password, password_hash):
-                print(f"✅ User {user_id} authenticated")
+                logger.info("User %s authenticated", user_id)
                 
                 # Update last_seen
                 cur = self.db.conn.cursor()
@@ -150,13 +159,91 @@ class AuthService:
                 
                 return True
             else:
-                print(f"❌ Invalid password for user {user_id}")
+                logger.warning("Invalid password for user %s", user_id)
                 return False
 
         except Exception as e:
-            print(f"❌ Error verifying user: {e}")
+            logger.error("Error verifying user: %s", e)
+            return False
+
+    def set_voice_embedding(self, user_id: int, embedding: np.ndarray) -> bool:
+        """
+        Enroll (or replace) a user's voice
+
+        Args:
+            user_id: 4-digit user ID
+            embedding: L2-normalized speaker embedding
+
+        Returns:
+            True if the user row was updated
+        """
+        try:
+            cur = self.db.conn.cursor()
+            cur.execute(
+                "UPDATE users SET voice_embedding = %s WHERE user_id = %s",
+                (pack_embedding(embedding), user_id)
+            )
+            updated = cur.rowcount == 1
+            self.db.conn.commit()
+            cur.close()
+            if updated:
+                logger.info("Voice enrolled for user %s", user_id)
+            return updated
+        except Exception as e:
+            logger.error("Error saving voice embedding: %s", e)
+            self.db.conn.rollback()
+            return False
+
+    def set_face_embedding(self, user_id: int, embedding: np.ndarray) -> bool:
+        """
+        Enroll (or replace) a user's face
+
+        Args:
+            user_id: 4-digit user ID
+            embedding: L2-normalized face embedding
+
+        Returns:
+            True if the user row was updated
+        """
+        try:
+            cur = self.db.conn.cursor()
+            cur.execute(
+                "UPDATE users SET face_embedding = %s WHERE user_id = %s",
+                (pack_embedding(embedding), user_id)
+            )
+            updated = cur.rowcount == 1
+            self.db.conn.commit()
+            cur.close()
+            if updated:
+                logger.info("Face enrolled for user %s", user_id)
+            return updated
+        except Exception as e:
+            logger.error("Error saving face embedding: %s", e)
+            self.db.conn.rollback()
             return False
 
+    def get_voice_embedding(self, user_id: int) -> Optional[np.ndarray]:
+        """
+        Get a user's enrolled voice
+
+        Args:
+            user_id: 4-digit user ID
+
+        Returns:
+            Speaker embedding, or None if the user has not enrolled
+        """
+        try:
+            cur = self.db.conn.cursor()
+            cur.execute("SELECT voice_embedding FROM users WHERE user_id = %s", (user_id,))
+            result = cur.fetchone()
+            cur.close()
+            if result is None or result[0] is None:
+                return None
+            return unpack_embedding(result[0])
+        except Exception as e:
+            logger.error("Error getting voice embedding: %s", e)
+            return None
+
     def get_user_info(self, user_id: int) -> Optional[Dict]:
         """
         Get user information
@@ -175,7 +262,7 @@ class AuthService:
             cur.close()
             return dict(user) if user else None
         except Exception as e:
-            print(f"❌ Error getting user info: {e}")
+            logger.error("Error getting user info: %s", e)
             return None
 
     def close(self):
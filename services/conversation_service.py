@@ -3,7 +3,10 @@ from pathlib import Path
 from typing import Optional, List, Dict
 
 sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
 from services.database_service import DatabaseService
+from services.tracing_service import tracer
+from services.token_counter import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
 
 
 def parse_user_id(transcription: str) -> Optional[int]:
@@ -80,17 +83,31 @@ def is_exit_command(text: str) -> bool:
     return any(keyword in text_lower for keyword in exit_keywords)
 
 
-def build_conversation_history(db: DatabaseService, user_id: int, current_input: str) -> List[Dict]:
-    """
-    Build full conversation history for LLM context
+def _turn_tokens(conv: Dict) -> int:
+    """Context a past turn takes up: both messages plus their template overhead"""
+    return estimate_tokens(conv.get('user_input')) + estimate_tokens(conv.get('ai_response')) + 2 * MESSAGE_OVERHEAD_TOKENS
+
 
-    Loads all past conversations for the user and formats them
+@tracer.traced('history')
+def build_conversation_history(db: DatabaseService, user_id: int, current_input: str, retrieval=None) -> List[Dict]:
+    """
+    Build conversation history for LLM context
+
+    Without a retrieval service, loads the newest past conversations that
+    fit config.HISTORY_TOKEN_BUDGET alongside the system prompt and the
+    current input (using the token counts stored with each turn). With
+    one, loads the most recent few turns plus the past turns most
+    relevant to the current input, within the same budget: recent turns
+    first, then relevant ones in order of relevance. Either way, older
+    turns sharing words with the current input (full-text search,
+    config.HISTORY_SEARCH_RESULTS) are added, and the result is formatted
     as a message list suitable for Ollama chat API
 
     Args:
         db: Database service instance
         user_id: Integer user ID
         current_input: The user's current message
+        retrieval: RetrievalService instance (optional)
 
     Returns:
         List of message dicts with 'role' and 'content' keys
@@ -113,11 +130,50 @@ PERSONALITY:
         {'role': 'system', 'content': system_prompt}
     ]
 
-    # Load past conversations (all of them, as requested)
-    past_conversations = db.get_user_conversations(user_id, limit=1000)
-
-    # Format past conversations (they come back newest-first, so reverse)
-    past_conversations.reverse()
+    # Past turns that mention what the user is asking about ("what did I tell you about X")
+    matches = []
+    if config.HISTORY_SEARCH_RESULTS:
+        matches = db.search_conversations(user_id, current_input, limit=config.HISTORY_SEARCH_RESULTS, match_any=True)
+
+    budget = None
+    if config.HISTORY_TOKEN_BUDGET:
+        # What is left for past turns next to the prompt, matches and current input
+        budget = max(config.HISTORY_TOKEN_BUDGET - estimate_tokens(system_prompt) - estimate_tokens(current_input)
+                     - 2 * MESSAGE_OVERHEAD_TOKENS - sum(conv['tokens'] for conv in matches), 0)
+
+    if retrieval is None and budget is not None:
+        # As many recent turns as fit, oldest first
+        past_conversations = db.get_conversations_within_budget(user_id, budget)
+    elif retrieval is None:
+        # Load past conversations (all of them, as requested), oldest first
+        past_conversations = db.get_user_conversations(user_id, limit=1000, oldest_first=True)
+    else:
+        # Most recent turns plus the most relevant older ones, merged oldest first
+        if budget is None:
+            past_conversations = db.get_user_conversations(user_id, limit=config.RETRIEVAL_RECENT_TURNS,
+                                                           oldest_first=True)
+        else:
+            past_conversations = db.get_conversations_within_budget(user_id, budget,
+                                                                    max_turns=config.RETRIEVAL_RECENT_TURNS)
+            budget -= sum(_turn_tokens(conv) for conv in past_conversations)
+        recent_ids = [str(conv['id']) for conv in past_conversations]
+        relevant_ids = retrieval.retrieve(user_id, current_input, exclude=recent_ids)
+        relevant = db.get_conversations_by_ids(relevant_ids)
+        if budget is not None:
+            by_id = {str(conv['id']): conv for conv in relevant}
+            kept = set()
+            for conv_id in relevant_ids:
+                conv = by_id.get(conv_id)
+                if conv is not None and _turn_tokens(conv) <= budget:
+                    budget -= _turn_tokens(conv)
+                    kept.add(conv_id)
+            relevant = [conv for conv in relevant if str(conv['id']) in kept]
+        past_conversations = relevant + past_conversations
+
+    # Matches not already included go before the rest, oldest first
+    included = {str(conv['id']) for conv in past_conversations}
+    extra = [conv for conv in matches if str(conv['id']) not in included]
+    past_conversations = sorted(extra, key=lambda conv: conv['timestamp']) + past_conversations
 
     for conv in past_conversations:
         # Add user input
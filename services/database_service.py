@@ -1,12 +1,44 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Optional, Dict, List
-from datetime import datetime
+from psycopg2.extras import Json, RealDictCursor, execute_values
+from typing import Optional, Dict, List, Iterator, Set, Tuple
+from datetime import datetime, timedelta
+import uuid
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 from config.config import config
+from services.tracing_service import tracer
+from services.token_counter import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+from services.logging_service import get_logger
+
+logger = get_logger('database')
+
+# Columns returned for conversation rows by default
+CONVERSATION_COLUMNS = ['id', 'user_id', 'timestamp', 'location', 'trigger_type', 'user_input', 'ai_response']
+# Larger columns only returned when asked for
+MEDIA_COLUMNS = ['audio_path', 'video_file_path', 'metadata']
+# Context a turn takes up: both messages plus their template overhead. Rows not
+# backfilled yet fall back to ~4 characters per token.
+TURN_TOKENS_SQL = (
+    "COALESCE(user_input_tokens, length(user_input) / 4, 0) + "
+    f"COALESCE(ai_response_tokens, length(ai_response) / 4, 0) + {2 * MESSAGE_OVERHEAD_TOKENS}"
+)
+# Text search configuration of conversations.search_vector (sql/schema.sql)
+SEARCH_CONFIG = 'english'
+
+
+def _conversation_columns(include_media: bool = False) -> str:
+    columns = CONVERSATION_COLUMNS + MEDIA_COLUMNS if include_media else CONVERSATION_COLUMNS
+    return ', '.join(columns)
+
+
+def _history_since() -> datetime:
+    """Lower timestamp bound for history reads, so the planner prunes older partitions"""
+    if config.HISTORY_WINDOW_DAYS <= 0:
+        return datetime.min
+    return datetime.now() - timedelta(days=config.HISTORY_WINDOW_DAYS)
+
 
 class DatabaseService:
     def __init__(self):
@@ -22,9 +54,9 @@ class DatabaseService:
                 user=config.DB_USER,
                 password=config.DB_PASSWORD
             )
-            print("✅ Database connected")
+            logger.info("Database connected")
         except Exception as e:
-            print(f"❌ Database connection failed: {e}")
+            logger.error("Database connection failed: %s", e)
             raise
 
     def execute_sql_file(self, sql_file_path: str):
@@ -35,9 +67,9 @@ class DatabaseService:
             cur.execute(sql)
             self.conn.commit()
             cur.close()
-            print(f"✅ Executed {sql_file_path}")
+            logger.info("Executed %s", sql_file_path)
         except Exception as e:
-            print(f"❌ Failed to execute SQL: {e}")
+            logger.error("Failed to execute SQL: %s", e)
             self.conn.rollback()
             raise
 
@@ -56,10 +88,12 @@ class DatabaseService:
             self.conn.commit()
             cur.close()
         except Exception as e:
-            print(f"❌ Failed to update last_seen: {e}")
+            logger.error("Failed to update last_seen: %s", e)
             self.conn.rollback()
 
-    def create_conversation(self, user_id: int, user_input: str, ai_response: str = None, audio_path: str = None) -> str:
+    @tracer.traced('db.save')
+    def create_conversation(self, user_id: int, user_input: str, ai_response: str = None, audio_path: str = None,
+                            embedding: bytes = None, trigger_type: str = None, embedding_model: str = None) -> str:
         """Create a new conversation record.
 
         Args:
@@ -67,6 +101,9 @@ class DatabaseService:
             user_input: User's input text
             ai_response: AI's response text (optional)
             audio_path: Path to audio file (optional)
+            embedding: Packed float32 embedding of the turn (optional)
+            trigger_type: What started the session, e.g. 'manual' or 'wake_word' (optional)
+            embedding_model: Name of the model that produced the embedding (optional)
 
         Returns:
             String representation of the conversation ID
@@ -74,41 +111,500 @@ class DatabaseService:
         try:
             cur = self.conn.cursor()
             cur.execute(
-                "INSERT INTO conversations (user_id, timestamp, user_input, ai_response, audio_path) VALUES (%s, %s, %s, %s, %s) RETURNING id",
-                (user_id, datetime.now(), user_input, ai_response, audio_path)
+                "INSERT INTO conversations (user_id, timestamp, user_input, ai_response, audio_path, embedding, embedding_model, trigger_type, user_input_tokens, ai_response_tokens) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id",
+                (user_id, datetime.now(), user_input, ai_response, audio_path,
+                 psycopg2.Binary(embedding) if embedding is not None else None,
+                 embedding_model if embedding is not None else None, trigger_type,
+                 estimate_tokens(user_input), estimate_tokens(ai_response))
             )
             conv_id = cur.fetchone()[0]
             self.conn.commit()
             cur.close()
             return str(conv_id)
         except Exception as e:
-            print(f"❌ Failed to create conversation: {e}")
+            logger.error("Failed to create conversation: %s", e)
             self.conn.rollback()
             raise
 
-    def get_user_conversations(self, user_id: int, limit: int = 10):
-        """Get conversation history for a user.
+    @tracer.traced('db.history')
+    def get_user_conversations(self, user_id: int, limit: int = 10, include_media: bool = False,
+                               oldest_first: bool = False) -> List[Dict]:
+        """Get the most recent conversations for a user.
 
         Args:
             user_id: Integer ID of the user
             limit: Maximum number of conversations to return (default: 10)
+            include_media: Also return audio_path, video_file_path and metadata
+            oldest_first: Return the selected conversations in chronological order
 
         Returns:
-            List of conversation dictionaries
+            List of conversation dictionaries (newest first unless oldest_first)
+        """
+        columns = _conversation_columns(include_media)
+        query = f"SELECT {columns} FROM conversations WHERE user_id = %s AND timestamp >= %s ORDER BY timestamp DESC, id DESC LIMIT %s"
+        if oldest_first:
+            query = f"SELECT * FROM ({query}) recent ORDER BY timestamp, id"
+
+        try:
+            cur = self.conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(query, (user_id, _history_since(), limit))
+            conversations = cur.fetchall()
+            cur.close()
+            return [dict(conv) for conv in conversations]
+        except Exception as e:
+            logger.error("Failed to get conversations: %s", e)
+            return []
+
+    @tracer.traced('db.history')
+    def get_conversations_within_budget(self, user_id: int, token_budget: int, max_turns: int = 1000) -> List[Dict]:
+        """Get the newest conversations whose stored token counts fit a budget, oldest first.
+
+        A running sum over the (user_id, timestamp) index walks back from
+        the newest turn and stops including turns at the first one that
+        would exceed the budget, so no text is tokenized at read time.
+
+        Args:
+            user_id: Integer ID of the user
+            token_budget: Context tokens available for past turns
+            max_turns: Upper bound on turns scanned (default: 1000)
+
+        Returns:
+            List of conversation dictionaries in chronological order
+        """
+        columns = _conversation_columns()
+        try:
+            cur = self.conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(
+                f"SELECT {columns} FROM ("
+                f"SELECT {columns}, SUM({TURN_TOKENS_SQL}) OVER (ORDER BY timestamp DESC, id DESC ROWS UNBOUNDED PRECEDING) AS running_tokens "
+                "FROM conversations WHERE user_id = %s AND timestamp >= %s ORDER BY timestamp DESC, id DESC LIMIT %s"
+                ") recent WHERE running_tokens <= %s ORDER BY timestamp, id",
+                (user_id, _history_since(), max_turns, token_budget)
+            )
+            conversations = cur.fetchall()
+            cur.close()
+            return [dict(conv) for conv in conversations]
+        except Exception as e:
+            logger.error("Failed to get conversations: %s", e)
+            return []
+
+    @tracer.traced('db.search')
+    def search_conversations(self, user_id: int, query: str, limit: int = 10, match_any: bool = False) -> List[Dict]:
+        """Full-text search over a user's conversations, best matches first.
+
+        Uses the GIN index on (user_id, search_vector). Matches are ranked
+        by cover density (how many query terms occur, and how close
+        together), with words the user said counting more than replies.
+
+        Args:
+            user_id: Integer ID of the user
+            query: Search text in web search syntax ("quoted phrases", -excluded, or)
+                - or any free text with match_any
+            limit: Maximum number of conversations to return (default: 10)
+            match_any: Match turns containing any of the query's words instead
+                of all of them (for matching a whole spoken question). Only
+                turns ranking at least config.HISTORY_SEARCH_MIN_RANK are
+                returned, so a single shared word is not enough
+
+        Returns:
+            List of conversation dictionaries with 'rank' and 'tokens'
+            (context size, as used for history budgets) added
         """
+        if not query or not query.strip():
+            return []
+
+        columns = _conversation_columns()
+        min_rank = ""
+        params = (query, user_id, _history_since(), limit)
+        if match_any:
+            tsquery = f"replace(plainto_tsquery('{SEARCH_CONFIG}', %s)::text, ' & ', ' | ')::tsquery"
+            # Each occurrence of a query word ranks 1.0 in the user's words and 0.4 in a reply.
+            # The bar is capped at the query's word count (numnode counts the | operators too)
+            if config.HISTORY_SEARCH_MIN_RANK:
+                min_rank = "AND ts_rank_cd(search_vector, q) >= LEAST(%s, (numnode(q) + 1) / 2.0) "
+                params = (query, user_id, _history_since(), config.HISTORY_SEARCH_MIN_RANK, limit)
+        else:
+            tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
         try:
             cur = self.conn.cursor(cursor_factory=RealDictCursor)
             cur.execute(
-                "SELECT * FROM conversations WHERE user_id = %s ORDER BY timestamp DESC LIMIT %s",
-                (user_id, limit)
+                f"SELECT {columns}, ts_rank_cd(search_vector, q) AS rank, {TURN_TOKENS_SQL} AS tokens "
+                f"FROM conversations, {tsquery} AS q "
+                f"WHERE user_id = %s AND timestamp >= %s AND search_vector @@ q {min_rank}"
+                "ORDER BY rank DESC, timestamp DESC LIMIT %s",
+                params
             )
             conversations = cur.fetchall()
             cur.close()
             return [dict(conv) for conv in conversations]
         except Exception as e:
-            print(f"❌ Failed to get conversations: {e}")
+            logger.error("Failed to search conversations: %s", e)
+            self.conn.rollback()
+            return []
+
+    def get_conversation_page(self, user_id: int, limit: int = 50, cursor: Tuple = None,
+                              include_media: bool = False) -> Tuple[List[Dict], Optional[Tuple]]:
+        """Get one page of a user's conversations, newest first, using a keyset cursor.
+
+        Args:
+            user_id: Integer ID of the user
+            limit: Page size (default: 50)
+            cursor: (timestamp, id) returned with the previous page, or None for the first page
+            include_media: Also return audio_path, video_file_path and metadata
+
+        Returns:
+            (conversations, next_cursor) - next_cursor is None on the last page
+        """
+        columns = _conversation_columns(include_media)
+        try:
+            cur = self.conn.cursor(cursor_factory=RealDictCursor)
+            if cursor is None:
+                cur.execute(
+                    f"SELECT {columns} FROM conversations WHERE user_id = %s AND timestamp >= %s ORDER BY timestamp DESC, id DESC LIMIT %s",
+                    (user_id, _history_since(), limit)
+                )
+            else:
+                # The plain timestamp bounds let the planner skip partitions outside the page
+                cur.execute(
+                    f"SELECT {columns} FROM conversations WHERE user_id = %s AND timestamp >= %s AND timestamp <= %s AND (timestamp, id) < (%s, %s) ORDER BY timestamp DESC, id DESC LIMIT %s",
+                    (user_id, _history_since(), cursor[0], cursor[0], cursor[1], limit)
+                )
+            conversations = [dict(conv) for conv in cur.fetchall()]
+            cur.close()
+        except Exception as e:
+            logger.error("Failed to get conversation page: %s", e)
+            return [], None
+
+        if len(conversations) < limit:
+            return conversations, None
+        last = conversations[-1]
+        return conversations, (last['timestamp'], last['id'])
+
+    def iter_user_conversations(self, user_id: int, batch_size: int = 1000, include_media: bool = False,
+                                oldest_first: bool = True) -> Iterator[Dict]:
+        """Stream all of a user's conversations through a server-side cursor.
+
+        Rows are fetched batch_size at a time, so memory use stays constant
+        regardless of history length.
+
+        Args:
+            user_id: Integer ID of the user
+            batch_size: Rows fetched per round trip (default: 1000)
+            include_media: Also return audio_path, video_file_path and metadata
+            oldest_first: Chronological order (default) or newest first
+
+        Yields:
+            Conversation dictionaries
+        """
+        columns = _conversation_columns(include_media)
+        direction = 'ASC' if oldest_first else 'DESC'
+        cur = self.conn.cursor(name=f"conversations_{uuid.uuid4().hex}", cursor_factory=RealDictCursor)
+        cur.itersize = batch_size
+        try:
+            cur.execute(
+                f"SELECT {columns} FROM conversations WHERE user_id = %s AND timestamp >= %s ORDER BY timestamp {direction}, id {direction}",
+                (user_id, _history_since())
+            )
+            for conv in cur:
+                yield dict(conv)
+        finally:
+            cur.close()
+
+    def get_conversation_embeddings(self, user_id: int) -> List[tuple]:
+        """Get all stored turn embeddings for a user.
+
+        Args:
+            user_id: Integer ID of the user
+
+        Returns:
+            List of (conversation_id, embedding_bytes, embedding_model) tuples;
+            embedding_model is None for rows embedded before it was recorded
+        """
+        try:
+            cur = self.conn.cursor()
+            cur.execute(
+                "SELECT id, embedding, embedding_model FROM conversations WHERE user_id = %s AND timestamp >= %s AND embedding IS NOT NULL",
+                (user_id, _history_since())
+            )
+            rows = cur.fetchall()
+            cur.close()
+            return rows
+        except Exception as e:
+            logger.error("Failed to get conversation embeddings: %s", e)
+            return []
+
+    def get_conversations_by_ids(self, conversation_ids: List[str]) -> List[Dict]:
+        """Get specific conversations, oldest first.
+
+        Args:
+            conversation_ids: Conversation IDs to fetch
+
+        Returns:
+            List of conversation dictionaries ordered by timestamp
+        """
+        if not conversation_ids:
+            return []
+
+        try:
+            cur = self.conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(
+                "SELECT id, user_id, timestamp, user_input, ai_response FROM conversations WHERE id = ANY(%s::uuid[]) AND timestamp >= %s ORDER BY timestamp",
+                (list(conversation_ids), _history_since())
+            )
+            conversations = cur.fetchall()
+            cur.close()
+            return [dict(conv) for conv in conversations]
+        except Exception as e:
+            logger.error("Failed to get conversations: %s", e)
+            return []
+
+    def get_conversations_without_embedding(self, limit: int = 100, after: tuple = None,
+                                            model_name: str = None) -> List[Dict]:
+        """Get conversations that have not been embedded yet, oldest first.
+
+        Args:
+            limit: Maximum number of conversations to return (default: 100)
+            after: (timestamp, id) of the last row already seen, to page past
+                rows that could not be embedded
+            model_name: Also return rows embedded by a different model, so
+                they can be re-embedded after EMBEDDING_MODEL changes
+
+        Returns:
+            List of conversation dictionaries
+        """
+        missing = "(embedding IS NULL OR embedding_model <> %s)" if model_name else "embedding IS NULL"
+        params = (model_name,) if model_name else ()
+        try:
+            cur = self.conn.cursor(cursor_factory=RealDictCursor)
+            if after is None:
+                cur.execute(
+                    f"SELECT id, user_id, timestamp, user_input, ai_response FROM conversations WHERE {missing} ORDER BY timestamp, id LIMIT %s",
+                    params + (limit,)
+                )
+            else:
+                cur.execute(
+                    f"SELECT id, user_id, timestamp, user_input, ai_response FROM conversations WHERE {missing} AND (timestamp, id) > (%s, %s) ORDER BY timestamp, id LIMIT %s",
+                    params + (after[0], after[1], limit)
+                )
+            conversations = cur.fetchall()
+            cur.close()
+            return [dict(conv) for conv in conversations]
+        except Exception as e:
+            logger.error("Failed to get conversations: %s", e)
             return []
 
+    def get_conversations_without_token_counts(self, limit: int = 1000, after: tuple = None) -> List[Dict]:
+        """Get conversations whose token counts have not been stored yet, oldest first.
+
+        Args:
+            limit: Maximum number of conversations to return (default: 1000)
+            after: (timestamp, id) of the last row already seen
+
+        Returns:
+            List of conversation dictionaries
+        """
+        try:
+            cur = self.conn.cursor(cursor_factory=RealDictCursor)
+            if after is None:
+                cur.execute(
+                    "SELECT id, timestamp, user_input, ai_response FROM conversations WHERE user_input_tokens IS NULL OR ai_response_tokens IS NULL ORDER BY timestamp, id LIMIT %s",
+                    (limit,)
+                )
+            else:
+                cur.execute(
+                    "SELECT id, timestamp, user_input, ai_response FROM conversations WHERE (user_input_tokens IS NULL OR ai_response_tokens IS NULL) AND (timestamp, id) > (%s, %s) ORDER BY timestamp, id LIMIT %s",
+                    (after[0], after[1], limit)
+                )
+            conversations = cur.fetchall()
+            cur.close()
+            return [dict(conv) for conv in conversations]
+        except Exception as e:
+            logger.error("Failed to get conversations: %s", e)
+            return []
+
+    def update_token_counts(self, counts: List[Tuple[str, datetime, int, int]]) -> int:
+        """Store token counts for many conversations in one statement.
+
+        Args:
+            counts: (conversation_id, timestamp, user_input_tokens, ai_response_tokens)
+                tuples; the timestamp lets each row be found in its partition
+
+        Returns:
+            Number of conversation rows updated
+        """
+        if not counts:
+            return 0
+
+        try:
+            cur = self.conn.cursor()
+            execute_values(
+                cur,
+                "UPDATE conversations AS c SET user_input_tokens = v.user_tokens, ai_response_tokens = v.response_tokens "
+                "FROM (VALUES %s) AS v(id, timestamp, user_tokens, response_tokens) "
+                "WHERE c.id = v.id AND c.timestamp = v.timestamp",
+                [(str(conv_id), timestamp, user_tokens, response_tokens)
+                 for conv_id, timestamp, user_tokens, response_tokens in counts],
+                template="(%s::uuid, %s::timestamp, %s::integer, %s::integer)",
+                page_size=len(counts)
+            )
+            updated = cur.rowcount
+            self.conn.commit()
+            cur.close()
+            return updated
+        except Exception as e:
+            logger.error("Failed to update token counts: %s", e)
+            self.conn.rollback()
+            raise
+
+    def update_conversation_embedding(self, conversation_id: str, embedding: bytes, embedding_model: str = None):
+        """Store the embedding for an existing conversation.
+
+        Args:
+            conversation_id: Conversation ID
+            embedding: Packed float32 embedding of the turn
+            embedding_model: Name of the model that produced it (optional)
+        """
+        try:
+            cur = self.conn.cursor()
+            cur.execute(
+                "UPDATE conversations SET embedding = %s, embedding_model = %s WHERE id = %s",
+                (psycopg2.Binary(embedding), embedding_model, conversation_id)
+            )
+            self.conn.commit()
+            cur.close()
+        except Exception as e:
+            logger.error("Failed to update conversation embedding: %s", e)
+            self.conn.rollback()
+            raise
+
+    def update_conversation_metadata(self, conversation_id: str, metadata: Dict):
+        """Merge keys into a conversation's metadata (existing keys are overwritten).
+
+        Args:
+            conversation_id: Conversation ID
+            metadata: JSON-serializable dict to merge in
+        """
+        try:
+            cur = self.conn.cursor()
+            cur.execute(
+                "UPDATE conversations SET metadata = COALESCE(metadata, '{}'::jsonb) || %s WHERE id = %s",
+                (Json(metadata), conversation_id)
+            )
+            self.conn.commit()
+            cur.close()
+        except Exception as e:
+            logger.error("Failed to update conversation metadata: %s", e)
+            self.conn.rollback()
+            raise
+
+    def referenced_audio_paths(self, paths: List[str], since: datetime = None) -> Set[str]:
+        """Which of these recordings a conversation row points at.
+
+        Args:
+            paths: Recording paths
+            since: Oldest timestamp the rows can have, so older partitions
+                are pruned (optional)
+
+        Returns:
+            The paths that appear in conversations.audio_path
+        """
+        if not paths:
+            return set()
+
+        try:
+            cur = self.conn.cursor()
+            cur.execute(
+                "SELECT DISTINCT audio_path FROM conversations WHERE audio_path = ANY(%s) AND timestamp >= %s",
+                (list(paths), since or datetime.min)
+            )
+            referenced = {row[0] for row in cur.fetchall()}
+            cur.close()
+            return referenced
+        except Exception as e:
+            logger.error("Failed to look up audio paths: %s", e)
+            self.conn.rollback()
+            raise
+
+    def update_audio_paths(self, path_updates: List[Tuple[str, Optional[str]]], since: datetime = None) -> int:
+        """Rewrite conversations.audio_path for many recordings in one statement.
+
+        Args:
+            path_updates: (old_path, new_path) pairs; new_path None clears the path
+            since: Oldest timestamp the affected rows can have, so older
+                partitions are pruned (optional)
+
+        Returns:
+            Number of conversation rows updated
+        """
+        if not path_updates:
+            return 0
+
+        try:
+            cur = self.conn.cursor()
+            # execute_values only allows the VALUES placeholder, so inline the bound
+            since_literal = cur.mogrify("%s", (since or datetime.min,)).decode()
+            execute_values(
+                cur,
+                "UPDATE conversations AS c SET audio_path = v.new_path "
+                "FROM (VALUES %s) AS v(old_path, new_path) "
+                f"WHERE c.audio_path = v.old_path AND c.timestamp >= {since_literal}",
+                [(old, new) for old, new in path_updates],
+                template="(%s, %s::text)",
+                page_size=len(path_updates)
+            )
+            updated = cur.rowcount
+            self.conn.commit()
+            cur.close()
+            return updated
+        except Exception as e:
+            logger.error("Failed to update audio paths: %s", e)
+            self.conn.rollback()
+            raise
+
+    def update_transcriptions(self, transcriptions: List[Tuple[str, str]], model_name: str) -> int:
+        """Replace user_input for many recordings in one statement.
+
+        The previous text is kept once in metadata.original_user_input, the
+        token count is updated and the turn's embedding is cleared so it
+        gets re-embedded.
+
+        Args:
+            transcriptions: (audio_path, text) pairs
+            model_name: Whisper model that produced the text
+
+        Returns:
+            Number of conversation rows updated
+        """
+        if not transcriptions:
+            return 0
+
+        try:
+            cur = self.conn.cursor()
+            model_literal = cur.mogrify("%s", (model_name,)).decode()
+            execute_values(
+                cur,
+                "UPDATE conversations AS c SET "
+                "user_input = v.text, "
+                "user_input_tokens = v.tokens, "
+                "embedding = NULL, embedding_model = NULL, "
+                "metadata = COALESCE(c.metadata, '{}'::jsonb) || jsonb_build_object("
+                "'original_user_input', COALESCE(c.metadata->>'original_user_input', c.user_input), "
+                f"'transcription_model', {model_literal}) "
+                "FROM (VALUES %s) AS v(audio_path, text, tokens) "
+                "WHERE c.audio_path = v.audio_path",
+                [(audio_path, text, estimate_tokens(text)) for audio_path, text in transcriptions],
+                template="(%s, %s, %s::integer)",
+                page_size=len(transcriptions)
+            )
+            updated = cur.rowcount
+            self.conn.commit()
+            cur.close()
+            return updated
+        except Exception as e:
+            logger.error("Failed to update transcriptions: %s", e)
+            self.conn.rollback()
+            raise
+
     def close(self):
         if self.conn:
             self.conn.close()
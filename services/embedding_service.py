@@ -0,0 +1,86 @@
+import ollama
+import numpy as np
+from typing import Optional
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.tracing_service import tracer
+from services.logging_service import get_logger
+
+logger = get_logger('embedding')
+
+
+def pack_embedding(vector: np.ndarray) -> bytes:
+    """
+    Pack an embedding as little-endian float32 bytes for a BYTEA column
+
+    Args:
+        vector: 1-D embedding vector
+
+    Returns:
+        Packed bytes
+    """
+    return np.asarray(vector, dtype='<f4').tobytes()
+
+
+def unpack_embedding(blob) -> np.ndarray:
+    """
+    Unpack a BYTEA embedding written by pack_embedding()
+
+    Args:
+        blob: bytes or memoryview from the database
+
+    Returns:
+        1-D float32 vector
+    """
+    return np.frombuffer(bytes(blob), dtype='<f4')
+
+
+class EmbeddingService:
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name or config.EMBEDDING_MODEL
+        self.client = ollama.Client(host=config.OLLAMA_HOST)
+        logger.info("Embedding Service initialized with model: %s", self.model_name)
+
+    @tracer.traced('embed')
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """
+        Embed text with the local Ollama embedding model
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            L2-normalized float32 vector, or None on failure
+        """
+        if not text or not text.strip():
+            return None
+
+        try:
+            response = self.client.embeddings(model=self.model_name, prompt=text)
+            vector = np.asarray(response['embedding'], dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm == 0:
+                return None
+            return vector / norm
+        except Exception as e:
+            logger.error("Error generating embedding: %s", e)
+            return None
+
+    def embed_turn(self, user_input: str, ai_response: str = None) -> Optional[np.ndarray]:
+        """
+        Embed one conversation turn (user input plus AI response)
+
+        Args:
+            user_input: User's input text
+            ai_response: AI's response text (optional)
+
+        Returns:
+            L2-normalized float32 vector, or None on failure
+        """
+        text = f"User: {user_input}"
+        if ai_response:
+            text += f"\nAssistant: {ai_response}"
+        return self.embed(text)
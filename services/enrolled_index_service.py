@@ -0,0 +1,327 @@
+import json
+import os
+import select
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.database_service import DatabaseService
+from services.embedding_service import unpack_embedding
+from services.logging_service import get_logger
+
+logger = get_logger('enrolled_index')
+
+# users columns holding per-user embeddings that can be indexed
+ENROLLED_COLUMNS = ('voice_embedding', 'face_embedding')
+# Channel the users triggers in sql/schema.sql notify on
+NOTIFY_CHANNEL = 'user_embedding_changed'
+
+
+class EmbeddingMatrix:
+    """
+    One row per user in a contiguous float32 matrix
+
+    Rows can be updated in place and removed by moving the last row into
+    the gap, so the live rows are always vectors[:len(self)]. The matrix
+    may start out as a read-only memory map of a snapshot; it is copied
+    into memory on the first write.
+    """
+
+    def __init__(self, dim: int = 0):
+        self.dim = dim
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.user_ids: List[int] = []
+        self.rows: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def build(self, user_ids: List[int], vectors: np.ndarray):
+        """Replace the contents (vectors may be a memory map)"""
+        self.dim = vectors.shape[1] if len(user_ids) else self.dim
+        self.vectors = vectors
+        self.user_ids = list(user_ids)
+        self.rows = {user_id: row for row, user_id in enumerate(self.user_ids)}
+
+    def _writable(self, rows_needed: int):
+        if self.vectors.flags.writeable and self.vectors.shape[0] >= rows_needed:
+            return
+        n = len(self.user_ids)
+        grown = np.zeros((max(rows_needed, n * 2, 64), self.dim), dtype=np.float32)
+        grown[:n] = self.vectors[:n]
+        self.vectors = grown
+
+    def get(self, user_id: int) -> Optional[np.ndarray]:
+        row = self.rows.get(user_id)
+        return None if row is None else np.array(self.vectors[row])
+
+    def upsert(self, user_id: int, vector: np.ndarray):
+        if not self.user_ids:
+            # The old buffer may still hold removed rows of another size
+            self.dim = len(vector)
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+        elif len(vector) != self.dim:
+            logger.warning("Skipping user %s: embedding has %d dims, index has %d", user_id, len(vector), self.dim)
+            return
+
+        row = self.rows.get(user_id)
+        if row is None:
+            row = len(self.user_ids)
+            self._writable(row + 1)
+            self.user_ids.append(user_id)
+            self.rows[user_id] = row
+        else:
+            self._writable(len(self.user_ids))
+        self.vectors[row] = vector
+
+    def remove(self, user_id: int):
+        row = self.rows.pop(user_id, None)
+        if row is None:
+            return
+        last = len(self.user_ids) - 1
+        self._writable(last + 1)
+        if row != last:
+            moved = self.user_ids[last]
+            self.vectors[row] = self.vectors[last]
+            self.user_ids[row] = moved
+            self.rows[moved] = row
+        self.user_ids.pop()
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """
+        Top-k users by cosine similarity
+
+        Args:
+            query: L2-normalized vector
+            k: Number of results
+
+        Returns:
+            List of (user_id, score) pairs, best first
+        """
+        n = len(self.user_ids)
+        if n == 0 or k <= 0 or len(query) != self.dim:
+            return []
+
+        scores = self.vectors[:n] @ query
+        if k < n:
+            candidates = np.argpartition(scores, -k)[-k:]
+        else:
+            candidates = np.arange(n)
+        best = candidates[np.argsort(scores[candidates])[::-1]]
+        return [(self.user_ids[i], float(scores[i])) for i in best]
+
+    def best_matches(self, queries: np.ndarray) -> List[Tuple[Optional[int], float]]:
+        """
+        Best user for each of many queries in one matrix product
+
+        Args:
+            queries: (m, dim) matrix of L2-normalized vectors
+
+        Returns:
+            (user_id, score) per query row; (None, 0.0) if the index is empty
+        """
+        n = len(self.user_ids)
+        if n == 0 or len(queries) == 0 or queries.shape[1] != self.dim:
+            return [(None, 0.0)] * len(queries)
+
+        scores = queries @ self.vectors[:n].T
+        best = scores.argmax(axis=1)
+        return [(self.user_ids[i], float(scores[row, i])) for row, i in enumerate(best)]
+
+
+class EnrolledIndexService:
+    def __init__(self, column: str = 'voice_embedding', snapshot: bool = None):
+        """
+        Memory-resident index of one users embedding column
+
+        The matrix is loaded once at startup, from an on-disk snapshot
+        (memory-mapped) when its version still matches the database,
+        otherwise from the users table. A listener thread then applies
+        changes announced by the users triggers, so searches never touch
+        the database.
+
+        Args:
+            column: 'voice_embedding' or 'face_embedding'
+            snapshot: Use snapshot files under config.EMBEDDING_INDEX_PATH
+                (default: config.EMBEDDING_INDEX_SNAPSHOT)
+        """
+        if column not in ENROLLED_COLUMNS:
+            raise ValueError(f"Unknown embedding column: {column}")
+        self.column = column
+        self.snapshot = config.EMBEDDING_INDEX_SNAPSHOT if snapshot is None else snapshot
+        self.snapshot_dir = Path(config.EMBEDDING_INDEX_PATH)
+        self.matrix = EmbeddingMatrix()
+        self.version = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.db = None
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def _snapshot_paths(self) -> Tuple[Path, Path, Path]:
+        base = self.snapshot_dir / self.column
+        return base.with_suffix('.npy'), base.with_suffix('.ids.npy'), base.with_suffix('.json')
+
+    def _load_snapshot(self, version: int) -> bool:
+        vectors_path, ids_path, meta_path = self._snapshot_paths()
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta['version'] != version:
+                return False
+            vectors = np.load(vectors_path, mmap_mode='r')
+            user_ids = np.load(ids_path).tolist()
+        except (OSError, ValueError, KeyError):
+            return False
+
+        with self._lock:
+            self.matrix = EmbeddingMatrix()
+            self.matrix.build(user_ids, vectors)
+            self.version = version
+        logger.info("Loaded %d %s rows from snapshot (version %d)", len(user_ids), self.column, version)
+        return True
+
+    def save_snapshot(self):
+        """Write the matrix to disk, tagged with the database version it reflects"""
+        vectors_path, ids_path, meta_path = self._snapshot_paths()
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            n = len(self.matrix)
+            vectors = np.ascontiguousarray(self.matrix.vectors[:n], dtype=np.float32)
+            user_ids = np.array(self.matrix.user_ids, dtype=np.int64)
+            version = self.version
+
+        # Metadata goes last: a snapshot is only trusted once its version is written
+        meta_path.unlink(missing_ok=True)
+        for path, array in ((vectors_path, vectors), (ids_path, user_ids)):
+            tmp = path.with_name(path.name + '.part')
+            with open(tmp, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp, path)
+        meta_path.write_text(json.dumps({'version': version, 'rows': n, 'dim': self.matrix.dim}))
+        self._dirty = False
+        logger.info("Saved %s snapshot: %d rows (version %d)", self.column, n, version)
+
+    def _load_from_database(self):
+        cur = self.db.conn.cursor()
+        # One snapshot of the table and its version
+        cur.execute("BEGIN ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        cur.execute("SELECT version FROM embedding_index_versions WHERE name = %s", (self.column,))
+        row = cur.fetchone()
+        version = row[0] if row else 0
+
+        if not (self.snapshot and self._load_snapshot(version)):
+            cur.execute(f"SELECT user_id, {self.column} FROM users WHERE {self.column} IS NOT NULL ORDER BY user_id")
+            rows = cur.fetchall()
+            with self._lock:
+                self.matrix = EmbeddingMatrix()
+                if rows:
+                    # All blobs have the same length, so one join + frombuffer decodes the lot
+                    vectors = np.frombuffer(b''.join(bytes(blob) for _, blob in rows), dtype='<f4')
+                    self.matrix.build([user_id for user_id, _ in rows], vectors.reshape(len(rows), -1).copy())
+                self.version = version
+            logger.info("Loaded %d %s rows from the database (version %d)", len(rows), self.column, version)
+            if self.snapshot:
+                self.save_snapshot()
+        cur.execute("COMMIT")
+        cur.close()
+
+    def _apply(self, user_id: int, version: int):
+        cur = self.db.conn.cursor()
+        cur.execute(f"SELECT {self.column} FROM users WHERE user_id = %s", (user_id,))
+        row = cur.fetchone()
+        cur.close()
+
+        with self._lock:
+            if row is None or row[0] is None:
+                self.matrix.remove(user_id)
+            else:
+                self.matrix.upsert(user_id, unpack_embedding(row[0]))
+            self.version = max(self.version, version)
+            self._dirty = True
+
+    def _listen(self):
+        while not self._stop.is_set():
+            try:
+                if select.select([self.db.conn], [], [], 1.0)[0]:
+                    self.db.conn.poll()
+                    while self.db.conn.notifies:
+                        notify = self.db.conn.notifies.pop(0)
+                        payload = json.loads(notify.payload)
+                        if payload.get('column') == self.column:
+                            self._apply(payload['user_id'], payload.get('version', 0))
+            except Exception as e:
+                logger.error("Enrolled index listener error: %s", e)
+                # Anything may have been missed: reconnect and reload
+                self._stop.wait(5)
+                if not self._stop.is_set():
+                    try:
+                        self._connect()
+                    except Exception as e:
+                        logger.error("Enrolled index reconnect failed: %s", e)
+
+    def _connect(self):
+        if self.db:
+            self.db.close()
+        self.db = DatabaseService()
+        self.db.conn.autocommit = True
+        cur = self.db.conn.cursor()
+        # Listen before loading so no change falls between the two
+        cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        cur.close()
+        self._load_from_database()
+
+    def start(self):
+        """Load the index and keep it in sync on a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._connect()
+        self._thread = threading.Thread(target=self._listen, name=f"{self.column}-index", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop listening, save a snapshot if anything changed and close the connection"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self.snapshot and self._dirty:
+            self.save_snapshot()
+        if self.db:
+            self.db.close()
+
+    def get(self, user_id: int) -> Optional[np.ndarray]:
+        """A user's enrolled embedding, or None"""
+        with self._lock:
+            return self.matrix.get(user_id)
+
+    def upsert(self, user_id: int, vector: np.ndarray):
+        """Apply a local enrollment right away instead of waiting for its notification"""
+        with self._lock:
+            self.matrix.upsert(user_id, vector)
+
+    def search(self, query: np.ndarray, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Find the enrolled users most similar to an embedding
+
+        Args:
+            query: L2-normalized embedding
+            k: Number of results
+
+        Returns:
+            List of (user_id, score) pairs, best first
+        """
+        with self._lock:
+            return self.matrix.search(query, k)
+
+    def best_matches(self, queries: np.ndarray) -> List[Tuple[Optional[int], float]]:
+        """Best enrolled user for each row of queries (see EmbeddingMatrix.best_matches)"""
+        with self._lock:
+            return self.matrix.best_matches(queries)
@@ -0,0 +1,174 @@
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.enrolled_index_service import EnrolledIndexService
+from services.tracing_service import tracer
+from services.logging_service import get_logger
+
+logger = get_logger('face')
+
+# Detector and recognizer, loaded once per worker process by _init_worker
+_detector = None
+_recognizer = None
+
+
+def _init_worker(detection_model: str, recognition_model: str, score_threshold: float):
+    global _detector, _recognizer
+    # One OpenCV thread per process; the pool provides the parallelism
+    cv2.setNumThreads(1)
+    _detector = cv2.FaceDetectorYN.create(detection_model, '', (320, 320), score_threshold)
+    _recognizer = cv2.FaceRecognizerSF.create(recognition_model, '')
+
+
+def _embed_frames(frames: List[np.ndarray]) -> List[List[Tuple[List[int], np.ndarray]]]:
+    """Detect and embed every face in a batch of frames (runs in a worker)"""
+    results = []
+    for frame in frames:
+        height, width = frame.shape[:2]
+        _detector.setInputSize((width, height))
+        _, detections = _detector.detect(frame)
+
+        faces = []
+        for detection in detections if detections is not None else []:
+            aligned = _recognizer.alignCrop(frame, detection)
+            feature = _recognizer.feature(aligned).ravel().astype(np.float32)
+            norm = np.linalg.norm(feature)
+            if norm > 0:
+                faces.append((detection[:4].astype(int).tolist(), feature / norm))
+        results.append(faces)
+    return results
+
+
+class FaceService:
+    def __init__(self, index: EnrolledIndexService = None, workers: int = None, batch_size: int = None):
+        """
+        Face detection, embedding and matching against enrolled users
+
+        Frames are sent in batches to a process pool where each worker
+        holds its own YuNet detector and SFace recognizer. The resulting
+        embeddings are matched against the users.face_embedding index with
+        one matrix product per batch.
+
+        Args:
+            index: Enrolled face index (a started 'face_embedding' index is created if not provided)
+            workers: Worker processes (default: config.FACE_WORKERS, 0 = CPU count)
+            batch_size: Frames per worker task (default: config.FACE_BATCH_SIZE)
+        """
+        for model in (config.FACE_DETECTION_MODEL, config.FACE_RECOGNITION_MODEL):
+            if not Path(model).exists():
+                raise FileNotFoundError(f"Face model not found: {model} (see README)")
+
+        self._owns_index = index is None
+        self.index = index or EnrolledIndexService('face_embedding').start()
+        self.workers = workers or config.FACE_WORKERS or os.cpu_count() or 1
+        self.batch_size = batch_size or config.FACE_BATCH_SIZE
+        self.pool = ProcessPoolExecutor(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(str(config.FACE_DETECTION_MODEL), str(config.FACE_RECOGNITION_MODEL),
+                      config.FACE_DETECTION_THRESHOLD)
+        )
+        logger.info("Face Service initialized (%d workers, batches of %d)", self.workers, self.batch_size)
+
+    def submit(self, frames: List[np.ndarray]) -> Future:
+        """Embed a batch of frames in the pool"""
+        return self.pool.submit(_embed_frames, frames)
+
+    @tracer.traced('face.match')
+    def match(self, faces_per_frame: List[List[Tuple[List[int], np.ndarray]]]) -> List[List[Dict]]:
+        """
+        Match every face in a batch against the enrolled users
+
+        Args:
+            faces_per_frame: (box, embedding) pairs for each frame
+
+        Returns:
+            For each frame, a list of {'box', 'user_id', 'score'}; user_id is
+            None when the best score is under FACE_MATCH_THRESHOLD
+        """
+        embeddings = [embedding for faces in faces_per_frame for _, embedding in faces]
+        if not embeddings:
+            return [[] for _ in faces_per_frame]
+        matches = iter(self.index.best_matches(np.stack(embeddings)))
+
+        results = []
+        for faces in faces_per_frame:
+            frame_results = []
+            for box, _ in faces:
+                user_id, score = next(matches)
+                if score < config.FACE_MATCH_THRESHOLD:
+                    user_id = None
+                frame_results.append({'box': box, 'user_id': user_id, 'score': round(score, 4)})
+            results.append(frame_results)
+        return results
+
+    def identify(self, snapshots: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Identify faces in a stream of snapshots (e.g. CaptureService.snapshots())
+
+        Up to one batch per worker is in flight while the next batch is
+        being collected, so capture and inference overlap.
+
+        Yields:
+            Each snapshot dict (without its frame) plus 'faces'
+        """
+        pending: List[Tuple[Future, List[Dict]]] = []
+        batch: List[Dict] = []
+
+        def finish(future: Future, batch_snapshots: List[Dict]) -> Iterator[Dict]:
+            with tracer.span('face.embed'):
+                faces_per_frame = future.result()
+            for snapshot, faces in zip(batch_snapshots, self.match(faces_per_frame)):
+                yield {key: value for key, value in snapshot.items() if key != 'frame'} | {'faces': faces}
+
+        for snapshot in snapshots:
+            batch.append(snapshot)
+            if len(batch) < self.batch_size:
+                continue
+            pending.append((self.submit([s['frame'] for s in batch]), batch))
+            batch = []
+            if len(pending) >= self.workers:
+                yield from finish(*pending.pop(0))
+
+        if batch:
+            pending.append((self.submit([s['frame'] for s in batch]), batch))
+        for future, batch_snapshots in pending:
+            yield from finish(future, batch_snapshots)
+
+    def embed_frames(self, frames: List[np.ndarray]) -> List[List[Tuple[List[int], np.ndarray]]]:
+        """Detect and embed faces in frames without matching (e.g. for enrollment)"""
+        return self.submit(frames).result()
+
+    @staticmethod
+    def summarize(results: Iterable[Dict]) -> Dict:
+        """
+        Reduce identification results to conversations.metadata keys
+
+        Returns:
+            {'faces': [{'user_id', 'score', 'snapshot'}, ...] best sighting
+            per recognised user, 'unknown_faces': count of unmatched faces}
+        """
+        best: Dict[int, Dict] = {}
+        unknown = 0
+        for result in results:
+            for face in result['faces']:
+                if face['user_id'] is None:
+                    unknown += 1
+                elif face['user_id'] not in best or face['score'] > best[face['user_id']]['score']:
+                    best[face['user_id']] = {'user_id': face['user_id'], 'score': face['score'],
+                                             'snapshot': result.get('path')}
+        return {'faces': sorted(best.values(), key=lambda f: -f['score']), 'unknown_faces': unknown}
+
+    def cleanup(self):
+        """Shut down the worker pool (and the index if this service created it)"""
+        self.pool.shutdown()
+        if self._owns_index:
+            self.index.stop()
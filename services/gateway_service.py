@@ -0,0 +1,477 @@
+import asyncio
+import itertools
+import json
+import queue
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+import sys
+
+import numpy as np
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+try:
+    import opuslib
+except ImportError:
+    opuslib = None
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.audio_frontend import AudioFrontend, normalize_gain
+from services.audio_service import AudioService, block_count
+from services.tracing_service import tracer
+from services.worker_supervisor import heartbeat
+from services.logging_service import get_logger
+
+logger = get_logger('gateway')
+
+SAMPLE_RATE = 16000
+# Samples per queued block, matching what split_speech expects
+BLOCK = SAMPLE_RATE * config.AUDIO_BLOCK_MS // 1000
+HELLO_TIMEOUT_SECONDS = 10
+# Synthesized speech is sent in chunks of this length
+SPEECH_CHUNK_MS = 100
+# A client that acknowledges no speech audio for this long is treated as gone
+ACK_TIMEOUT_SECONDS = 30
+# Largest Opus frame (120 ms at 48 kHz), per channel
+OPUS_MAX_FRAME = 5760
+
+# Queue markers: the client ended its utterance / the connection closed
+_END = object()
+_CLOSED = object()
+
+
+class ClientDisconnected(Exception):
+    """The remote client went away while its session was using it"""
+
+
+def parse_hello(message) -> Dict:
+    """
+    Validate a client's first message
+
+    Raises:
+        ValueError: Not a usable hello message
+    """
+    if not isinstance(message, str):
+        raise ValueError("expected a hello message first")
+    hello = json.loads(message)
+    if hello.get('type') != 'hello':
+        raise ValueError("expected a hello message first")
+
+    sample_rate = int(hello.get('sample_rate', SAMPLE_RATE))
+    channels = int(hello.get('channels', 1))
+    codec = hello.get('codec', 'pcm')
+    endpointing = hello.get('endpointing', 'server')
+    if not 8000 <= sample_rate <= 48000 or channels not in (1, 2):
+        raise ValueError("sample_rate must be 8000-48000 and channels 1 or 2")
+    if codec not in ('pcm', 'opus'):
+        raise ValueError(f"unsupported codec: {codec}")
+    if codec == 'opus' and opuslib is None:
+        raise ValueError("opus is not available on this server (pip install opuslib); send pcm")
+    if endpointing not in ('server', 'client'):
+        raise ValueError(f"unsupported endpointing: {endpointing}")
+    return {'sample_rate': sample_rate, 'channels': channels, 'codec': codec, 'endpointing': endpointing}
+
+
+class GatewayConnection:
+    def __init__(self, websocket, loop: asyncio.AbstractEventLoop, hello: Dict):
+        """
+        One remote client, bridged between the event loop and its session thread
+
+        Incoming audio is decoded and converted to 16 kHz blocks on the
+        event loop as it arrives, and queued for the session thread only
+        while the session is listening (audio sent while it is thinking or
+        speaking is dropped). The queue is bounded: if the session falls
+        behind, the oldest audio goes first. Synthesized speech goes the
+        other way in chunks, with at most GATEWAY_PLAYBACK_WINDOW_MS of
+        audio sent ahead of the client's playback acknowledgements.
+
+        Args:
+            websocket: Server side of the connection
+            loop: Event loop serving it
+            hello: The client's validated hello (see parse_hello)
+        """
+        self.websocket = websocket
+        self.loop = loop
+        self.id = uuid.uuid4().hex[:12]
+        self.sample_rate = hello['sample_rate']
+        self.channels = hello['channels']
+        self.codec = hello['codec']
+        self.endpointing = hello['endpointing']
+
+        self.decoder = opuslib.Decoder(self.sample_rate, self.channels) if self.codec == 'opus' else None
+        self.frontend = AudioFrontend(self.sample_rate, self.channels, SAMPLE_RATE)
+        self.blocks = queue.Queue(maxsize=block_count(config.GATEWAY_MAX_BUFFER_SECONDS * 1000))
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.listening = False
+        self.closed = False
+
+        self.unacked = 0
+        self.acked = threading.Condition()
+        self.stats = {'frames': 0, 'dropped_blocks': 0, 'speech_bytes': 0}
+
+    # Event loop side
+
+    def receive(self, message):
+        """Handle one message from the client"""
+        if isinstance(message, bytes):
+            self._receive_audio(message)
+            return
+
+        try:
+            control = json.loads(message)
+            kind = control.get('type')
+            acked = int(control.get('bytes', 0)) if kind == 'ack' else 0
+        except (AttributeError, TypeError, ValueError):
+            logger.debug("Client %s sent an invalid control message: %.100r", self.id, message)
+            return
+        if kind == 'end':
+            if self.listening:
+                self._put(_END)
+        elif kind == 'ack':
+            with self.acked:
+                self.unacked = max(0, self.unacked - acked)
+                self.acked.notify_all()
+        else:
+            logger.debug("Client %s: ignoring %s message", self.id, kind)
+
+    def _receive_audio(self, frame: bytes):
+        self.stats['frames'] += 1
+        if not self.listening:
+            return
+
+        if self.decoder:
+            try:
+                frame = self.decoder.decode(frame, OPUS_MAX_FRAME)
+            except opuslib.OpusError as e:
+                logger.debug("Client %s sent an undecodable Opus packet: %s", self.id, e)
+                return
+        frame = frame[:len(frame) - len(frame) % (2 * self.channels)]
+        self.pending = np.concatenate([self.pending, self.frontend.process(frame)])
+        while len(self.pending) >= BLOCK:
+            self._put(self.pending[:BLOCK])
+            self.pending = self.pending[BLOCK:]
+
+    def _put(self, item):
+        while True:
+            try:
+                self.blocks.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.blocks.get_nowait()
+                    self.stats['dropped_blocks'] += 1
+                except queue.Empty:
+                    pass
+
+    def close(self):
+        """Mark the connection closed and wake the session thread"""
+        self.closed = True
+        self.listening = False
+        self._put(_CLOSED)
+        with self.acked:
+            self.acked.notify_all()
+
+    # Session thread side
+
+    def _call(self, coroutine):
+        """Run a coroutine on the event loop and wait for it"""
+        if self.closed:
+            coroutine.close()
+            raise ClientDisconnected(f"client {self.id} disconnected")
+        try:
+            return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+        except ConnectionClosed as e:
+            raise ClientDisconnected(f"client {self.id} disconnected") from e
+
+    def send_json(self, message: Dict):
+        self._call(self.websocket.send(json.dumps(message)))
+
+    def start_listening(self):
+        """Discard stale audio and ask the client for the next utterance"""
+        heartbeat()
+
+        async def begin():
+            # On the event loop, so no frame is half-processed during the reset
+            while not self.blocks.empty():
+                if self.blocks.get_nowait() is _CLOSED:
+                    self._put(_CLOSED)
+                    break
+            self.pending = np.zeros(0, dtype=np.float32)
+            self.frontend.reset()
+            self.listening = True
+            await self.websocket.send(json.dumps({'type': 'listening'}))
+
+        self._call(begin())
+
+    def stop_listening(self):
+        self.listening = False
+
+    def audio_blocks(self, idle_timeout: float) -> Iterator[np.ndarray]:
+        """
+        16 kHz blocks of the current utterance
+
+        Ends when the client sends 'end' or no audio arrives for idle_timeout seconds.
+
+        Raises:
+            ClientDisconnected: The connection closed
+        """
+        while True:
+            try:
+                item = self.blocks.get(timeout=idle_timeout)
+            except queue.Empty:
+                logger.debug("Client %s sent no audio for %.0fs", self.id, idle_timeout)
+                return
+            if item is _CLOSED:
+                self._put(_CLOSED)
+                raise ClientDisconnected(f"client {self.id} disconnected")
+            if item is _END:
+                return
+            heartbeat()
+            yield item
+
+    def _wait_for_acks(self, ready: Callable[[], bool]):
+        with self.acked:
+            if not self.acked.wait_for(lambda: self.closed or ready(), timeout=ACK_TIMEOUT_SECONDS):
+                raise ClientDisconnected(f"client {self.id} stopped acknowledging audio")
+            if self.closed:
+                raise ClientDisconnected(f"client {self.id} disconnected")
+
+    def send_speech(self, pcm: bytes, rate: int, text: str = None, drain: bool = True):
+        """
+        Stream synthesized speech to the client
+
+        Args:
+            pcm: 16-bit mono PCM
+            rate: Its sample rate
+            text: What is being said (for clients that show captions)
+            drain: Wait until the client has played it all (else return
+                once it is sent, with up to the playback window unplayed)
+        """
+        window = max(rate * 2 * config.GATEWAY_PLAYBACK_WINDOW_MS // 1000, 2)
+        chunk = max(rate * 2 * SPEECH_CHUNK_MS // 1000 // 2 * 2, 2)
+
+        self.send_json({'type': 'speech', 'text': text, 'sample_rate': rate, 'bytes': len(pcm)})
+        for offset in range(0, len(pcm), chunk):
+            data = pcm[offset:offset + chunk]
+            self._wait_for_acks(lambda: self.unacked == 0 or self.unacked + len(data) <= window)
+            with self.acked:
+                self.unacked += len(data)
+            self._call(self.websocket.send(data))
+            heartbeat()
+        self.send_json({'type': 'speech_end'})
+        self.stats['speech_bytes'] += len(pcm)
+        if drain:
+            self.drain()
+
+    def drain(self):
+        """Wait until the client has played all speech sent so far"""
+        self._wait_for_acks(lambda: self.unacked == 0)
+
+    def finish(self):
+        """Tell the client the session is over and close the connection"""
+        try:
+            self.send_json({'type': 'end'})
+            self._call(self.websocket.close())
+        except ClientDisconnected:
+            pass
+
+
+class GatewayAudio(AudioService):
+    def __init__(self, connection: GatewayConnection, transcriber):
+        """
+        AudioService for a remote client
+
+        Utterances come from the connection instead of a local device and
+        are always endpointed: by server-side VAD over the streamed audio,
+        or by the client's 'end' message if it asked for client
+        endpointing. Transcription goes through the same admission control
+        as local sessions and every transcript is echoed to the client.
+
+        Args:
+            connection: The client's connection
+            transcriber: Shared TranscriptionService
+        """
+        self.CHANNELS = 1
+        self.RATE = SAMPLE_RATE
+        self.connection = connection
+        self.transcriber = transcriber
+        self.endpointing = True
+
+    def _read_blocks(self) -> Iterator[np.ndarray]:
+        return self.connection.audio_blocks(config.VAD_START_TIMEOUT_SECONDS)
+
+    def _save(self, samples: np.ndarray, filename: str = None) -> str:
+        # Sessions run concurrently: keep recordings made in the same second apart
+        return super()._save(samples, filename or f"{datetime.now():%Y%m%d_%H%M%S}_{self.connection.id}_recording.wav")
+
+    def capture_until_silence(self, max_duration: float = None, start_timeout: float = None) -> Optional[np.ndarray]:
+        self.connection.start_listening()
+        try:
+            if self.connection.endpointing == 'server':
+                return super().capture_until_silence(max_duration, start_timeout)
+            max_blocks = block_count((max_duration or config.VAD_MAX_UTTERANCE_SECONDS) * 1000)
+            blocks = list(itertools.islice(self._read_blocks(), max_blocks))
+            return normalize_gain(np.concatenate(blocks)) if blocks else None
+        finally:
+            self.connection.stop_listening()
+
+    def transcribe_audio(self, audio, profile: str = None, on_wait=None):
+        text = super().transcribe_audio(audio, profile, on_wait)
+        self.connection.send_json({'type': 'transcript', 'text': text})
+        return text
+
+    def cleanup(self):
+        pass
+
+
+class GatewayTTS:
+    def __init__(self, connection: GatewayConnection, synthesizer):
+        """
+        TTSService stand-in that streams speech to a remote client
+
+        Args:
+            connection: The client's connection
+            synthesizer: Shared TTSService used to render speech (see TTSService.stream)
+        """
+        self.connection = connection
+        self.synthesizer = synthesizer
+
+    @tracer.traced('tts')
+    def speak(self, text: str):
+        if not text:
+            return
+        # Sentence by sentence: the client starts playing while the rest is synthesized
+        for sentence, pcm, rate in self.synthesizer.stream(text):
+            self.connection.send_speech(pcm, rate, sentence, drain=False)
+        self.connection.drain()
+
+    def cleanup(self):
+        pass
+
+
+class AudioGateway:
+    def __init__(self, session: Callable[[GatewayConnection], None], host: str = None, port: int = None,
+                 max_sessions: int = None):
+        """
+        WebSocket server running one voice session per remote client
+
+        Protocol - JSON text messages plus binary audio:
+
+        client → server
+            {"type": "hello", "sample_rate": 48000, "channels": 1,
+             "codec": "pcm" | "opus", "endpointing": "server" | "client"}   (first message)
+            binary: int16 little-endian interleaved PCM, or one Opus packet
+            {"type": "end"}                  end of utterance (client endpointing)
+            {"type": "ack", "bytes": n}      n bytes of speech audio played
+
+        server → client
+            {"type": "ready", "session_id": ...}
+            {"type": "listening"}            send the next utterance now
+            {"type": "transcript", "text": ...}
+            {"type": "speech", "text": ..., "sample_rate": ..., "bytes": n},
+                binary 16-bit mono PCM chunks, then {"type": "speech_end"}
+            {"type": "end"}                  session over; the server closes
+            {"type": "error", "message": ...}
+
+        Clients beyond max_sessions are closed with code 1013 (try again later).
+
+        Args:
+            session: Runs a whole session for a connection (called on a session thread)
+            host: Interface to listen on (default: config.GATEWAY_HOST)
+            port: Port to listen on (default: config.GATEWAY_PORT)
+            max_sessions: Concurrent sessions (default: config.GATEWAY_MAX_SESSIONS)
+        """
+        self.session = session
+        self.host = host or config.GATEWAY_HOST
+        self.port = port or config.GATEWAY_PORT
+        self.max_sessions = max_sessions or config.GATEWAY_MAX_SESSIONS
+        self.executor = ThreadPoolExecutor(self.max_sessions, thread_name_prefix='session')
+        self.active = 0
+        self._loop = None
+        self._stopped = None
+
+    async def _handle(self, websocket):
+        if self.active >= self.max_sessions:
+            logger.warning("Turning away client: %d sessions active", self.active)
+            await websocket.close(1013, "server busy")
+            return
+
+        # Reserved before the handshake so a burst of clients can't overshoot max_sessions
+        self.active += 1
+        connection = None
+        try:
+            try:
+                hello = parse_hello(await asyncio.wait_for(websocket.recv(), HELLO_TIMEOUT_SECONDS))
+            except (asyncio.TimeoutError, ValueError) as e:
+                await websocket.send(json.dumps({'type': 'error', 'message': str(e) or "no hello received"}))
+                await websocket.close(1002, "protocol error")
+                return
+            except ConnectionClosed:
+                return
+
+            loop = asyncio.get_running_loop()
+            connection = GatewayConnection(websocket, loop, hello)
+            logger.info("Client %s connected from %s (%d Hz, %d ch, %s, %s endpointing)", connection.id,
+                        websocket.remote_address, connection.sample_rate, connection.channels,
+                        connection.codec, connection.endpointing)
+            await websocket.send(json.dumps({'type': 'ready', 'session_id': connection.id}))
+            session = loop.run_in_executor(self.executor, self._run_session, connection)
+            try:
+                async for message in websocket:
+                    connection.receive(message)
+            except ConnectionClosed:
+                pass
+            finally:
+                connection.close()
+                await session
+        finally:
+            self.active -= 1
+            if connection:
+                logger.info("Client %s disconnected (%s)", connection.id,
+                            ", ".join(f"{k}: {v}" for k, v in connection.stats.items()))
+
+    def _run_session(self, connection: GatewayConnection):
+        try:
+            self.session(connection)
+        except ClientDisconnected:
+            logger.info("Client %s left mid-session", connection.id)
+        except Exception as e:
+            logger.exception("Session for client %s failed", connection.id)
+            try:
+                connection.send_json({'type': 'error', 'message': str(e)})
+            except ClientDisconnected:
+                pass
+        finally:
+            connection.finish()
+
+    async def _idle_heartbeats(self):
+        """Heartbeats while no session is running; sessions send their own as audio flows"""
+        while True:
+            if not self.active:
+                heartbeat()
+            await asyncio.sleep(config.WORKER_HEARTBEAT_SECONDS)
+
+    async def serve(self, sock=None):
+        """Serve until stop() (on an inherited listening socket if given)"""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        address = {'sock': sock} if sock else {'host': self.host, 'port': self.port}
+        async with serve(self._handle, max_size=2 ** 20, **address):
+            logger.info("Gateway listening on %s", sock.getsockname() if sock else f"{self.host}:{self.port}")
+            idle = asyncio.create_task(self._idle_heartbeats())
+            await self._stopped.wait()
+            idle.cancel()
+        self.executor.shutdown(wait=False)
+
+    def run(self, sock=None):
+        asyncio.run(self.serve(sock))
+
+    def stop(self):
+        """Stop accepting clients and return from serve() (callable from any thread or a signal handler)"""
+        if self._loop and self._stopped:
+            self._loop.call_soon_threadsafe(self._stopped.set)
@@ -1,32 +1,185 @@
 import ollama
+import re
+import time
 from typing import List, Dict, Optional
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.tracing_service import tracer
+from services.resource_scheduler import resources
+from services.admission_service import Overloaded, llm_admission
+from services.logging_service import get_logger
+
+logger = get_logger('llm')
+
+# Route names used for classification and latency stats
+ROUTE_SMALL = 'small'
+ROUTE_LARGE = 'large'
+# Small-model turns that failed and were answered by the large model (latency includes the failed try)
+ROUTE_FALLBACK = 'fallback'
+
+# Words that signal the user wants reasoning, generation or detail
+COMPLEX_KEYWORDS = [
+    'explain', 'why', 'how do', 'how does', 'how can', 'how would', 'compare',
+    'difference', 'summarize', 'summary', 'analyze', 'analyse', 'plan',
+    'write', 'draft', 'code', 'calculate', 'step by step', 'recommend',
+    'should i', 'pros and cons', 'in detail', 'translate'
+]
+
+# Phrases that reach back into older conversation history
+HISTORY_KEYWORDS = [
+    'remember', 'earlier', 'last time', 'yesterday', 'before',
+    'did i tell', 'did we talk', 'what did i', 'what did we', 'previously'
+]
+
+
+def _keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """Match any of the keywords as whole words ("plan" but not "planet")"""
+    alternatives = (r'\s+'.join(map(re.escape, keyword.split())) for keyword in keywords)
+    return re.compile(rf"\b(?:{'|'.join(alternatives)})\b")
+
+
+_COMPLEX_PATTERN = _keyword_pattern(COMPLEX_KEYWORDS)
+_HISTORY_PATTERN = _keyword_pattern(HISTORY_KEYWORDS)
+
+# History length (in messages) beyond which recall questions go to the large model
+LONG_HISTORY_MESSAGES = 20
+
 
 class LLMService:
-    def __init__(self, model_name: str = "llama3.1:8b"):
-        self.model_name = model_name
-        print(f"🤖 LLM Service initialized with model: {model_name}")
+    def __init__(self, model_name: str = None, small_model_name: str = None):
+        self.model_name = model_name or config.LLM_MODEL
+        self.small_model_name = small_model_name if small_model_name is not None else config.LLM_SMALL_MODEL
+        self.route_max_words = config.LLM_ROUTE_MAX_WORDS
+        self.client = ollama.Client(host=config.OLLAMA_HOST)
+        self.route_stats = {
+            ROUTE_SMALL: {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0},
+            ROUTE_LARGE: {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0},
+            ROUTE_FALLBACK: {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0},
+        }
+        logger.info("LLM Service initialized with model: %s", self.model_name)
+        if self.small_model_name:
+            logger.info("Routing trivial turns to: %s", self.small_model_name)
+
+    def classify_request(
+        self,
+        user_input: str,
+        conversation_history: Optional[List[Dict]] = None
+    ) -> str:
+        """
+        Cheaply decide which model should answer a turn
+
+        Short small-talk and simple lookups go to the small model. Long
+        inputs, multi-part questions, requests for reasoning or generation,
+        and recall questions over a long history go to the large model.
+
+        Args:
+            user_input: The user's message
+            conversation_history: List of previous messages with roles
+
+        Returns:
+            ROUTE_SMALL or ROUTE_LARGE
+        """
+        if not self.small_model_name:
+            return ROUTE_LARGE
+
+        text = user_input.lower().strip()
+
+        if len(text.split()) > self.route_max_words:
+            return ROUTE_LARGE
 
+        if text.count('?') > 1:
+            return ROUTE_LARGE
+
+        if _COMPLEX_PATTERN.search(text):
+            return ROUTE_LARGE
+
+        history_length = len(conversation_history) if conversation_history else 0
+        if history_length > LONG_HISTORY_MESSAGES and _HISTORY_PATTERN.search(text):
+            return ROUTE_LARGE
+
+        return ROUTE_SMALL
+
+    def _record_latency(self, route: str, elapsed: float):
+        stats = self.route_stats[route]
+        stats['count'] += 1
+        stats['total_seconds'] += elapsed
+        stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+
+    def get_route_stats(self) -> Dict[str, Dict]:
+        """
+        Get per-route latency statistics
+
+        Returns:
+            Dict keyed by route with count, average and max latency in seconds
+        """
+        summary = {}
+        for route, stats in self.route_stats.items():
+            count = stats['count']
+            summary[route] = {
+                'count': count,
+                'avg_seconds': stats['total_seconds'] / count if count else 0.0,
+                'max_seconds': stats['max_seconds'],
+            }
+        return summary
+
+    def _chat(self, model: str, messages: List[Dict]) -> str:
+        options = {'temperature': 0.7}
+        if resources.threads('llm'):
+            options['num_thread'] = resources.threads('llm')
+
+        with resources.stage('llm'):
+            response = self.client.chat(
+                model=model,
+                messages=messages,
+                options=options
+            )
+
+        # Ollama reports its own prompt-eval and generation timings in nanoseconds
+        if response.get('prompt_eval_duration'):
+            tracer.record('llm.prompt_eval', response['prompt_eval_duration'] / 1e9,
+                          model=model, tokens=response.get('prompt_eval_count'))
+        if response.get('eval_duration'):
+            tracer.record('llm.eval', response['eval_duration'] / 1e9,
+                          model=model, tokens=response.get('eval_count'))
+
+        return response['message']['content']
+
+    @tracer.traced('llm')
     def generate_response(
         self,
         user_input: str,
-        conversation_history: Optional[List[Dict]] = None
+        conversation_history: Optional[List[Dict]] = None,
+        priority: str = 'interactive',
+        on_wait=None
     ) -> str:
         """
         Generate AI response using Ollama
 
+        The turn is routed to the small or large model by classify_request().
+        If the small model fails the turn is retried on the large model and
+        counted as a fallback; if it is missing (not pulled), routing to it
+        stops. Requests from all sessions pass through LLM admission
+        control first.
+
         Args:
             user_input: The user's message
             conversation_history: List of previous messages with roles
+            priority: Admission class ('auth' or 'interactive')
+            on_wait: Called if the request has to queue for a while
 
         Returns:
             AI response as string
+
+        Raises:
+            Overloaded: The LLM is too busy to take the request
         """
         try:
-            print("🤖 Generating response...")
+            route = self.classify_request(user_input, conversation_history)
+            model = self.small_model_name if route == ROUTE_SMALL else self.model_name
+            logger.debug("Generating response", extra={'route': route, 'model': model})
 
             # Build messages list
             messages = []
@@ -41,40 +194,62 @@ class LLMService:
                 'content': user_input
             })
 
-            # Call Ollama API
-            response = ollama.chat(
-                model=self.model_name,
-                messages=messages,
-                options={
-                    'temperature': 0.7
-                }
-            )
-
-            # Extract response text
-            ai_response = response['message']['content']
-            print(f"✅ Response generated ({len(ai_response)} chars)")
+            with llm_admission.admit(priority, on_wait):
+                start = time.perf_counter()
+                try:
+                    ai_response = self._chat(model, messages)
+                except Exception as e:
+                    if route != ROUTE_SMALL:
+                        raise
+                    logger.warning("Small model failed (%s), falling back to %s", e, self.model_name)
+                    if isinstance(e, ollama.ResponseError) and e.status_code == 404:
+                        self._disable_small_model()
+                    route = ROUTE_FALLBACK
+                    ai_response = self._chat(self.model_name, messages)
+                elapsed = time.perf_counter() - start
+
+            self._record_latency(route, elapsed)
+            logger.debug("Response generated", extra={'route': route, 'chars': len(ai_response), 'seconds': round(elapsed, 3)})
 
             return ai_response
 
+        except Overloaded:
+            raise
         except Exception as e:
-            error_msg = f"❌ Error generating response: {str(e)}"
-            print(error_msg)
+            logger.error("Error generating response: %s", e)
             return f"I apologize, but I encountered an error: {str(e)}"
 
+    def _disable_small_model(self):
+        if self.small_model_name:
+            logger.warning("Not routing to %s; all turns will use %s", self.small_model_name, self.model_name)
+            self.small_model_name = None
+
     def test_connection(self) -> bool:
         """Test if Ollama is accessible"""
         try:
-            print("🔍 Testing Ollama connection...")
+            logger.info("Testing Ollama connection")
 
             # Simple test with ollama.generate
-            ollama.generate(
+            self.client.generate(
                 model=self.model_name,
                 prompt="test"
             )
 
-            print("✅ Ollama connection successful")
+            logger.info("Ollama connection successful")
+
+            if self.small_model_name:
+                try:
+                    self.client.generate(
+                        model=self.small_model_name,
+                        prompt="test"
+                    )
+                    logger.info("Small model available: %s", self.small_model_name)
+                except Exception as e:
+                    logger.warning("Small model unavailable: %s", e)
+                    self._disable_small_model()
+
             return True
 
         except Exception as e:
-            print(f"❌ Ollama connection failed: {str(e)}")
+            logger.error("Ollama connection failed: %s", e)
             return False
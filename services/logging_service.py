@@ -0,0 +1,169 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+
+ROOT_LOGGER = 'conversationalist'
+
+# Context fields attached to every record logged from the current thread/task
+_context = contextvars.ContextVar('log_context', default={})
+
+# Attributes every LogRecord has; anything else was passed via extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+_queue_handler = None
+
+
+class ContextFilter(logging.Filter):
+    """Copy session_id/user_id (and any other bound fields) onto the record"""
+
+    def filter(self, record):
+        fields = _context.get()
+        record.session_id = fields.get('session_id', '-')
+        record.user_id = fields.get('user_id', '-')
+        for key, value in fields.items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including context and extra= fields"""
+
+    def format(self, record):
+        event = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in event:
+                event[key] = value
+        if record.exc_info:
+            event['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(event, default=str)
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s [session=%(session_id)s user=%(user_id)s] %(message)s"
+
+
+def setup_logging(level: str = None, log_format: str = None, log_file: Path = None):
+    """
+    Configure the service loggers
+
+    Records are put on an in-memory queue by the calling thread and written
+    to the sinks by a QueueListener thread, so slow stderr or disk never
+    blocks the audio or LLM path.
+
+    get_logger() sets up the config defaults on first use, usually at
+    import time. Calling this again replaces the current setup (records
+    already queued are written first), so entry points can choose the
+    level, format and file after importing the services.
+
+    Args:
+        level: Log level name (default: config.LOG_LEVEL)
+        log_format: 'text' or 'json' (default: config.LOG_FORMAT)
+        log_file: Also write to this file (default: config.LOG_FILE, None disables)
+    """
+    global _listener, _queue_handler
+    level = (level or config.LOG_LEVEL).upper()
+    log_format = log_format or config.LOG_FORMAT
+    log_file = log_file if log_file is not None else config.LOG_FILE
+
+    formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
+
+    sinks = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        sinks.append(logging.FileHandler(log_file))
+    for sink in sinks:
+        sink.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Context is read on the logging thread, before the record is queued
+    _queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger(ROOT_LOGGER)
+    previous = _listener.handlers if _listener is not None else ()
+    shutdown_logging()
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    for sink in previous:
+        sink.close()
+
+    root.setLevel(level)
+    root.addHandler(_queue_handler)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, *sinks, respect_handler_level=True)
+    _listener.start()
+    # Registered once however often the setup is replaced
+    atexit.unregister(shutdown_logging)
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _after_fork():
+    """Give a forked child its own queue and listener: the parent's listener thread did not survive the fork"""
+    global _listener
+    if _listener is None:
+        return
+    # A fresh queue, so records the parent had not written yet are not written twice
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a service logger under the 'conversationalist' hierarchy
+
+    Args:
+        name: Short logger name, e.g. 'audio'
+
+    Returns:
+        Configured logger
+    """
+    if _listener is None:
+        setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def bind_context(**fields):
+    """Attach fields (e.g. session_id, user_id) to all later records from this thread"""
+    _context.set({**_context.get(), **fields})
+
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields to records logged inside the block"""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
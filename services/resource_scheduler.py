@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Set
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.tracing_service import tracer
+from services.logging_service import get_logger
+
+logger = get_logger('resources')
+
+STAGES = ('whisper', 'llm', 'tts')
+# Stages that run on threads of this process; the LLM runs in the Ollama server process
+LOCAL_STAGES = ('whisper', 'tts')
+
+
+def parse_cores(spec: str) -> Set[int]:
+    """
+    Parse a CPU list like "0-3,6" (the taskset -c format)
+
+    Cores the process may not run on are dropped, so a config written for
+    a bigger machine degrades to fewer cores instead of failing.
+    """
+    cores = set()
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        first, _, last = part.partition('-')
+        cores.update(range(int(first), int(last or first) + 1))
+    if cores and hasattr(os, 'sched_getaffinity'):
+        cores &= os.sched_getaffinity(0)
+    return cores
+
+
+def _runqueue_ns() -> Optional[int]:
+    """Time the calling thread has spent runnable but waiting for a CPU"""
+    try:
+        with open('/proc/thread-self/schedstat') as f:
+            return int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class ResourceScheduler:
+    def __init__(self):
+        """
+        CPU partitioning between Whisper, Ollama and TTS
+
+        Each stage gets a core set and a thread count from config. Whisper
+        and TTS work done inside stage() is pinned to the stage's cores
+        (per thread, so other stages running concurrently keep their own
+        cores). Ollama runs in its own server process: its cores are
+        applied with taskset when starting it, and its thread count is
+        sent with each request, so an 'llm' stage only counts overlap.
+        Concurrency limits are admission control's job
+        (services/admission_service.py).
+
+        Contention shows up in the tracer as '<stage>.runqueue' (runnable
+        but waiting for a CPU, from /proc schedstat), plus per-stage
+        overlap counts and admission queue times in contention().
+        """
+        specs = {'whisper': config.WHISPER_CPU_CORES, 'llm': config.OLLAMA_CPU_CORES, 'tts': config.TTS_CPU_CORES}
+        self.cores: Dict[str, Set[int]] = {stage: parse_cores(spec) for stage, spec in specs.items()}
+        self.pinning = hasattr(os, 'sched_setaffinity')
+        self._lock = threading.Lock()
+        self.active: Dict[str, int] = defaultdict(int)
+        self.stats = {stage: {'runs': 0, 'overlapped': 0} for stage in STAGES}
+
+        for stage in STAGES:
+            if specs[stage] and not self.cores[stage]:
+                logger.warning("%s: none of cores %s are available; not pinning", stage, specs[stage])
+            elif self.cores[stage]:
+                logger.info("%s: cores %s, %s threads", stage, sorted(self.cores[stage]), self.threads(stage))
+
+    def threads(self, stage: str) -> Optional[int]:
+        """Thread count for a stage: the configured value, else one per assigned core (None = library default)"""
+        configured = {'whisper': config.WHISPER_THREADS, 'llm': config.OLLAMA_NUM_THREAD}.get(stage)
+        return configured or len(self.cores.get(stage, ())) or None
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Run the enclosed block as pipeline stage `name`
+
+        Pins the calling thread to a local stage's cores and records
+        contention metrics. Threads created inside the block (e.g. torch's
+        OpenMP pool on first use) inherit the pinning. For 'llm' the
+        calling thread only waits on Ollama, so it is neither pinned nor
+        measured for CPU wait.
+        """
+        local = name in LOCAL_STAGES
+        previous = None
+        cores = self.cores.get(name) if local else None
+        if cores and self.pinning:
+            previous = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, cores)
+
+        with self._lock:
+            overlapped = any(count for stage, count in self.active.items() if stage != name)
+            self.active[name] += 1
+            self.stats[name]['runs'] += 1
+            if overlapped:
+                self.stats[name]['overlapped'] += 1
+        runqueue = _runqueue_ns() if local else None
+
+        try:
+            yield
+        finally:
+            if runqueue is not None:
+                tracer.record(f"{name}.runqueue", (_runqueue_ns() - runqueue) / 1e9)
+            with self._lock:
+                self.active[name] -= 1
+            if previous is not None:
+                os.sched_setaffinity(0, previous)
+
+    def contention(self) -> Dict[str, Dict]:
+        """
+        Per-stage overlap and wait summary
+
+        Returns:
+            Dict of stage → {runs, overlapped (fraction of runs that started
+            while another stage was active), queue_p95 (admission wait, any
+            class), runqueue_p95 (seconds)}
+        """
+        spans = tracer.summary()
+        with self._lock:
+            stats = {stage: dict(values) for stage, values in self.stats.items()}
+        return {
+            stage: {
+                'runs': values['runs'],
+                'overlapped': values['overlapped'] / values['runs'] if values['runs'] else 0.0,
+                'queue_p95': max((values['p95'] for span, values in spans.items()
+                                  if span.startswith(f"{stage}.admit.")), default=0.0),
+                'runqueue_p95': spans.get(f"{stage}.runqueue", {}).get('p95', 0.0),
+            }
+            for stage, values in stats.items()
+        }
+
+
+resources = ResourceScheduler()
@@ -0,0 +1,275 @@
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.database_service import DatabaseService
+from services.embedding_service import EmbeddingService, unpack_embedding
+from services.logging_service import get_logger
+
+logger = get_logger('retrieval')
+
+
+class BruteForceIndex:
+    """Exact cosine search over a contiguous float32 matrix"""
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.ids: List[str] = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, ids: Sequence[str], vectors: np.ndarray):
+        """
+        Replace the index contents
+
+        Args:
+            ids: Conversation IDs, one per row of vectors
+            vectors: (n, dim) matrix of L2-normalized embeddings
+        """
+        self.vectors = np.array(vectors, dtype=np.float32, copy=True).reshape(-1, self.dim)
+        self.ids = list(ids)
+
+    def add(self, conv_id: str, vector: np.ndarray):
+        """Append one embedding, growing the matrix geometrically"""
+        n = len(self.ids)
+        if n == self.vectors.shape[0]:
+            grown = np.zeros((max(1, n) * 2, self.dim), dtype=np.float32)
+            grown[:n] = self.vectors[:n]
+            self.vectors = grown
+        self.vectors[n] = vector
+        self.ids.append(conv_id)
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """
+        Find the k most similar embeddings
+
+        Args:
+            query: L2-normalized query vector
+            k: Number of results
+
+        Returns:
+            List of (conversation_id, score) pairs, best first
+        """
+        n = len(self.ids)
+        if n == 0 or k <= 0:
+            return []
+
+        scores = self.vectors[:n] @ query
+        return _top_k(scores, np.arange(n), self.ids, k)
+
+
+class IVFIndex(BruteForceIndex):
+    """
+    Approximate cosine search with an inverted-file (IVF) index
+
+    Embeddings are clustered with spherical k-means; a query only scans
+    the n_probe clusters whose centroids are closest to it.
+    """
+
+    def __init__(self, dim: int, n_lists: int = None, n_probe: int = 8, n_iter: int = 10, seed: int = 0):
+        super().__init__(dim)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.rng = np.random.default_rng(seed)
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.lists: List[List[int]] = []
+
+    def build(self, ids: Sequence[str], vectors: np.ndarray):
+        """
+        Cluster the embeddings and assign each one to its nearest centroid
+
+        Args:
+            ids: Conversation IDs, one per row of vectors
+            vectors: (n, dim) matrix of L2-normalized embeddings
+        """
+        super().build(ids, vectors)
+        n = len(self.ids)
+        if n == 0:
+            self.centroids = np.zeros((0, self.dim), dtype=np.float32)
+            self.lists = []
+            return
+
+        data = self.vectors[:n]
+        n_lists = min(n, self.n_lists or max(1, int(np.sqrt(n))))
+        centroids = data[self.rng.choice(n, size=n_lists, replace=False)].copy()
+
+        for _ in range(self.n_iter):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Keep the previous centroid for clusters that emptied out
+            nonempty = norms[:, 0] > 0
+            centroids[nonempty] = sums[nonempty] / norms[nonempty]
+
+        assignments = np.argmax(data @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.lists = [[] for _ in range(n_lists)]
+        for row, cluster in enumerate(assignments):
+            self.lists[cluster].append(row)
+
+    def add(self, conv_id: str, vector: np.ndarray):
+        """Append one embedding and assign it to its nearest existing centroid"""
+        if len(self.centroids) == 0:
+            self.build([conv_id], vector.reshape(1, -1))
+            return
+
+        super().add(conv_id, vector)
+        cluster = int(np.argmax(self.centroids @ vector))
+        self.lists[cluster].append(len(self.ids) - 1)
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """
+        Find approximately the k most similar embeddings
+
+        Args:
+            query: L2-normalized query vector
+            k: Number of results
+
+        Returns:
+            List of (conversation_id, score) pairs, best first
+        """
+        if not self.ids or k <= 0:
+            return []
+
+        centroid_scores = self.centroids @ query
+        n_probe = min(self.n_probe, len(self.centroids))
+        probe = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+        rows = np.fromiter(
+            (row for cluster in probe for row in self.lists[cluster]),
+            dtype=np.int64
+        )
+        if rows.size == 0:
+            return []
+
+        scores = self.vectors[rows] @ query
+        return _top_k(scores, rows, self.ids, k)
+
+
+def _top_k(scores: np.ndarray, rows: np.ndarray, ids: List[str], k: int) -> List[Tuple[str, float]]:
+    k = min(k, scores.size)
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best])]
+    return [(ids[rows[i]], float(scores[i])) for i in best]
+
+
+class RetrievalService:
+    def __init__(self, db: DatabaseService, embedder: EmbeddingService = None):
+        """
+        Semantic retrieval over a user's past conversations
+
+        Indexes are built lazily per user from the stored embeddings and
+        kept in memory; new turns are added incrementally.
+
+        Args:
+            db: Database service instance
+            embedder: Embedding service (created if not provided)
+        """
+        self.db = db
+        self.embedder = embedder or EmbeddingService()
+        self.ann_threshold = config.RETRIEVAL_ANN_THRESHOLD
+        self.indexes: Dict[int, object] = {}
+        logger.info("Retrieval Service initialized")
+
+    def _make_index(self, dim: int, size: int):
+        if size >= self.ann_threshold:
+            return IVFIndex(dim)
+        return BruteForceIndex(dim)
+
+    def _load_index(self, user_id: int):
+        rows = self.db.get_conversation_embeddings(user_id)
+
+        # Embeddings from another model (EMBEDDING_MODEL changed) live in a
+        # different space and often have a different dimension; leave them
+        # out until scripts/backfill_embeddings.py redoes them
+        model_name = self.embedder.model_name
+        current = [(str(conv_id), unpack_embedding(blob)) for conv_id, blob, model in rows
+                   if model is None or model == model_name]
+        if not current:
+            return None
+
+        # Rows from before the model was recorded can still differ; the
+        # recorded ones (or else the majority) decide the dimension
+        recorded = [vector.shape[0] for (_, vector), row in zip(current, rows) if row[2] is not None]
+        dims = Counter(vector.shape[0] for _, vector in current)
+        dim = recorded[0] if recorded else dims.most_common(1)[0][0]
+        current = [(conv_id, vector) for conv_id, vector in current if vector.shape[0] == dim]
+        if len(current) < len(rows):
+            logger.warning("Skipped %d of %d embeddings for user %s from another model; "
+                           "run scripts/backfill_embeddings.py", len(rows) - len(current), len(rows), user_id)
+
+        ids = [conv_id for conv_id, _ in current]
+        vectors = np.vstack([vector for _, vector in current])
+        index = self._make_index(dim, len(ids))
+        index.build(ids, vectors)
+        logger.info("Loaded %d embeddings for user %s (%s)", len(ids), user_id, type(index).__name__)
+        return index
+
+    def get_index(self, user_id: int):
+        """Get (loading on first use) the in-memory index for a user"""
+        if user_id not in self.indexes:
+            self.indexes[user_id] = self._load_index(user_id)
+        return self.indexes[user_id]
+
+    def add_to_index(self, user_id: int, conv_id: str, embedding: Optional[np.ndarray]):
+        """
+        Add a freshly saved turn to the user's index
+
+        Args:
+            user_id: Integer ID of the user
+            conv_id: Conversation ID returned by create_conversation()
+            embedding: Embedding stored with the conversation (None is ignored)
+        """
+        if embedding is None:
+            return
+
+        index = self.get_index(user_id)
+        if index is not None and index.dim != embedding.shape[0]:
+            # The embedding model changed under a loaded index: start over
+            # with the new model's vectors rather than mixing dimensions
+            logger.warning("Embedding dimension changed from %d to %d; rebuilding user %s's index",
+                           index.dim, embedding.shape[0], user_id)
+            index = None
+        if index is None:
+            index = self._make_index(embedding.shape[0], 1)
+            self.indexes[user_id] = index
+        elif isinstance(index, BruteForceIndex) and len(index) + 1 >= self.ann_threshold:
+            # Promote to the approximate index once the history gets large
+            promoted = IVFIndex(index.dim)
+            promoted.build(index.ids, index.vectors[:len(index)])
+            self.indexes[user_id] = index = promoted
+
+        index.add(conv_id, embedding)
+
+    def retrieve(self, user_id: int, query: str, top_k: int = None, exclude: Sequence[str] = ()) -> List[str]:
+        """
+        Find the past turns most relevant to a query
+
+        Args:
+            user_id: Integer ID of the user
+            query: Text to search for (usually the current user input)
+            top_k: Number of turns to return (default: config.RETRIEVAL_TOP_K)
+            exclude: Conversation IDs to leave out (e.g. turns already in context)
+
+        Returns:
+            List of conversation IDs, most relevant first
+        """
+        top_k = config.RETRIEVAL_TOP_K if top_k is None else top_k
+        index = self.get_index(user_id)
+        if index is None or top_k <= 0:
+            return []
+
+        query_vector = self.embedder.embed(query)
+        if query_vector is None or query_vector.shape[0] != index.dim:
+            return []
+
+        excluded = set(exclude)
+        results = index.search(query_vector, top_k + len(excluded))
+        return [conv_id for conv_id, _ in results if conv_id not in excluded][:top_k]
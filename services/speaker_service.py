@@ -0,0 +1,132 @@
+import numpy as np
+from pathlib import Path
+from typing import Optional, Tuple, Union
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.audio_io import read_wav
+from services.audio_features import SAMPLE_RATE, N_MFCC, MFCCExtractor, frame_level_db
+from services.tracing_service import tracer
+from services.logging_service import get_logger
+
+logger = get_logger('speaker')
+
+# Utterances with fewer voiced frames than this are too short to embed (~0.5 s)
+MIN_VOICED_FRAMES = 50
+# Recordings quieter than this overall are silence; voiced frames are only picked relative to the loudest
+MIN_LEVEL_DB = -55.0
+
+
+class SpeakerService:
+    def __init__(self):
+        """
+        Lightweight speaker embeddings for voice login
+
+        An utterance is summarised as the mean and standard deviation of
+        its MFCCs (plus the spread of their deltas) over voiced frames,
+        giving a fixed 57-dimensional L2-normalized vector. Enrolled
+        embeddings are stored packed in users.voice_embedding.
+
+        These statistics mostly capture the channel and the phrase, not
+        the speaker: different voices, and even noise, can score above
+        the thresholds against an enrolled voice. Treat a match as a
+        convenience, not proof of identity - voice login stays off unless
+        VOICE_LOGIN_ENABLED is set.
+        """
+        self.features = MFCCExtractor()
+        self.dim = 3 * (N_MFCC - 1)
+        logger.info("Speaker Service initialized (%d-dim embeddings)", self.dim)
+
+    @tracer.traced('speaker.embed')
+    def embed(self, audio: Union[str, Path, np.ndarray]) -> Optional[np.ndarray]:
+        """
+        Compute a speaker embedding for one utterance
+
+        Args:
+            audio: Path to a 16-bit WAV recording or 16 kHz mono float32 samples
+
+        Returns:
+            L2-normalized float32 vector, or None if there is too little speech
+        """
+        if isinstance(audio, np.ndarray):
+            samples = audio.astype(np.float32, copy=False)
+        else:
+            samples, rate = read_wav(audio)
+            if rate != SAMPLE_RATE:
+                positions = np.arange(0, len(samples), rate / SAMPLE_RATE)
+                samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+        if frame_level_db(samples) < MIN_LEVEL_DB:
+            logger.debug("Too quiet for a speaker embedding")
+            return None
+
+        coeffs = self.features.mfcc(samples, voiced_only=True)
+        if len(coeffs) < MIN_VOICED_FRAMES:
+            logger.debug("Too little speech for a speaker embedding (%d voiced frames)", len(coeffs))
+            return None
+
+        # c0 is overall loudness, which says more about the mic than the speaker
+        coeffs = coeffs[:, 1:]
+        deltas = np.diff(coeffs, axis=0)
+        vector = np.concatenate([coeffs.mean(axis=0), coeffs.std(axis=0), deltas.std(axis=0)])
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return (vector / norm).astype(np.float32)
+
+    @staticmethod
+    def similarity(embedding: np.ndarray, enrolled: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity against one or many enrolled embeddings
+
+        Args:
+            embedding: L2-normalized query vector
+            enrolled: One vector or an (n, dim) matrix of L2-normalized vectors
+
+        Returns:
+            Scalar or (n,) array of scores
+        """
+        return enrolled @ embedding
+
+    def verify(self, embedding: np.ndarray, enrolled: np.ndarray) -> Tuple[bool, float]:
+        """
+        Check a voice against one user's enrolled embedding
+
+        Embeddings of a different size (enrolled with another version of
+        the features) are rejected.
+
+        Returns:
+            (accepted, score)
+        """
+        if np.shape(enrolled) != np.shape(embedding):
+            logger.warning("Enrolled voice has %s dims, expected %d; not verifying",
+                           np.shape(enrolled), len(embedding))
+            return False, 0.0
+        score = float(self.similarity(embedding, enrolled))
+        return score >= config.SPEAKER_VERIFY_THRESHOLD, score
+
+    def identify(self, embedding: np.ndarray, index) -> Tuple[Optional[int], float]:
+        """
+        Pick the enrolled user whose voice matches best
+
+        A match needs the stricter SPEAKER_IDENTIFY_THRESHOLD and a clear
+        margin over the runner-up, since no user ID was given.
+
+        Args:
+            embedding: L2-normalized query vector
+            index: Enrolled voices (EnrolledIndexService or EmbeddingMatrix)
+
+        Returns:
+            (user_id or None, best score)
+        """
+        matches = index.search(embedding, k=2)
+        if not matches:
+            return None, 0.0
+
+        best_user, best_score = matches[0]
+        runner_up = matches[1][1] if len(matches) > 1 else -1.0
+
+        if best_score >= config.SPEAKER_IDENTIFY_THRESHOLD and best_score - runner_up >= config.SPEAKER_IDENTIFY_MARGIN:
+            return best_user, best_score
+        return None, best_score
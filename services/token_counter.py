@@ -0,0 +1,38 @@
+import re
+from typing import Optional
+
+# Chat template tokens around each message (role header, end-of-turn marker)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_PIECES = re.compile(r"\d+|[^\W\d_]+|\S")
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Approximate the LLM token count of a text without loading a tokenizer
+
+    Mirrors how BPE vocabularies (llama, mistral) split English: common
+    words are one token, long words a few, digits go in groups of up to
+    three, punctuation is a token each and non-Latin scripts about a
+    token per character. It errs slightly high so context budgets built
+    on it don't overflow.
+
+    Args:
+        text: Message text (None counts as empty)
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    count = 0
+    for piece in _PIECES.findall(text):
+        if piece.isdigit():
+            count += (len(piece) + 2) // 3
+        elif not piece.isascii():
+            count += len(piece)
+        elif piece.isalpha():
+            count += 1 + (len(piece) - 1) // 8
+        else:
+            count += 1
+    return count
@@ -0,0 +1,259 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.logging_service import get_logger
+
+logger = get_logger('tracing')
+
+# Samples kept per histogram for percentile estimates
+MAX_SAMPLES = 4096
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Running count/sum plus a bounded window of recent samples"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+        stats = {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+        }
+        for q in QUANTILES:
+            stats[f"p{int(q * 100)}"] = ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+        return stats
+
+
+class Tracer:
+    def __init__(self, enabled: bool = None, jsonl_path: Path = None):
+        """
+        Span timings for the conversation loop
+
+        Spans are timed with a monotonic clock and folded into global and
+        per-session histograms. Finished spans are handed to a background
+        thread that appends them to a JSON-lines file, so the calling
+        thread never waits on disk I/O.
+
+        Args:
+            enabled: Record spans at all (default: config.TRACING_ENABLED)
+            jsonl_path: JSON-lines span log (default: config.TRACE_LOG_PATH, None disables)
+        """
+        self.enabled = config.TRACING_ENABLED if enabled is None else enabled
+        self.jsonl_path = config.TRACE_LOG_PATH if jsonl_path is None else jsonl_path
+        self._local = threading.local()
+        self.histograms: Dict[str, Histogram] = {}
+        self.session_histograms: Dict[str, Dict[str, Histogram]] = {}
+        self._lock = threading.Lock()
+        self._export_queue = None
+        self._export_thread = None
+        self._http_server = None
+
+    @property
+    def session_id(self) -> Optional[str]:
+        """Session the calling thread's spans are attributed to"""
+        return getattr(self._local, 'session_id', None)
+
+    def start_session(self, session_id: str = None) -> str:
+        """Start attributing spans to a new session and return its ID"""
+        session_id = session_id or uuid.uuid4().hex[:12]
+        self._local.session_id = session_id
+        with self._lock:
+            self.session_histograms.setdefault(session_id, {})
+        return session_id
+
+    def end_session(self) -> Dict[str, Dict[str, float]]:
+        """Stop attributing spans to the current session and return its summary"""
+        session_id = self.session_id
+        summary = self.summary(session_id) if session_id else {}
+        self._local.session_id = None
+        return summary
+
+    def record(self, name: str, seconds: float, **attrs):
+        """
+        Record a duration measured elsewhere (e.g. Ollama's eval timings)
+
+        Args:
+            name: Span name, e.g. 'llm.eval'
+            seconds: Duration in seconds
+            **attrs: Extra fields for the JSON-lines log
+        """
+        if not self.enabled:
+            return
+
+        session_id = self.session_id
+        with self._lock:
+            self.histograms.setdefault(name, Histogram()).add(seconds)
+            if session_id is not None:
+                self.session_histograms.setdefault(session_id, {}).setdefault(name, Histogram()).add(seconds)
+
+        if self.jsonl_path:
+            self._export({'ts': time.time(), 'session_id': session_id, 'span': name,
+                          'seconds': round(seconds, 6), **attrs})
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time the enclosed block as a span"""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter_ns() - start) / 1e9, **attrs)
+
+    def traced(self, name: str):
+        """Decorator form of span()"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, (time.perf_counter_ns() - start) / 1e9)
+            return wrapper
+        return decorator
+
+    def summary(self, session_id: str = None) -> Dict[str, Dict[str, float]]:
+        """
+        Percentile summary per span
+
+        Args:
+            session_id: Summarize one session instead of the whole process
+
+        Returns:
+            Dict of span name → {count, mean, p50, p95, p99} in seconds
+        """
+        with self._lock:
+            histograms = self.session_histograms.get(session_id, {}) if session_id else self.histograms
+            return {name: hist.summary() for name, hist in sorted(histograms.items())}
+
+    def format_summary(self, session_id: str = None) -> str:
+        """Human-readable table of summary()"""
+        rows = [f"{'span':<18}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}"]
+        for name, stats in self.summary(session_id).items():
+            rows.append(
+                f"{name:<18}{stats['count']:>7}{stats['p50']:>8.3f}s{stats['p95']:>8.3f}s{stats['p99']:>8.3f}s"
+            )
+        return "\n".join(rows)
+
+    def prometheus_text(self) -> str:
+        """Process-wide span summaries in the Prometheus text exposition format"""
+        lines = [
+            "# HELP conversationalist_span_seconds Duration of conversation loop stages",
+            "# TYPE conversationalist_span_seconds summary",
+        ]
+        with self._lock:
+            for name, hist in sorted(self.histograms.items()):
+                stats = hist.summary()
+                for q in QUANTILES:
+                    lines.append(f'conversationalist_span_seconds{{span="{name}",quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.6f}')
+                lines.append(f'conversationalist_span_seconds_sum{{span="{name}"}} {hist.total:.6f}')
+                lines.append(f'conversationalist_span_seconds_count{{span="{name}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+    def _export(self, event: Dict):
+        if self._export_queue is None:
+            with self._lock:
+                if self._export_queue is None:
+                    self._export_queue = queue.SimpleQueue()
+                    self._export_thread = threading.Thread(target=self._export_loop, name='trace-export', daemon=True)
+                    self._export_thread.start()
+        self._export_queue.put(event)
+
+    def _export_loop(self):
+        path = Path(self.jsonl_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a') as f:
+            while True:
+                event = self._export_queue.get()
+                if event is None:
+                    break
+                f.write(json.dumps(event, default=str) + "\n")
+                # Batch writes: only flush once the queue is drained
+                if self._export_queue.empty():
+                    f.flush()
+
+    def start_http_server(self, port: int = None, host: str = '127.0.0.1'):
+        """
+        Serve prometheus_text() at /metrics on a daemon thread
+
+        Args:
+            port: Port to listen on (default: config.METRICS_PORT)
+            host: Interface to bind (default: localhost only)
+        """
+        port = port or config.METRICS_PORT
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._http_server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._http_server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info("Metrics available at http://%s:%s/metrics", host, port)
+
+    def shutdown(self):
+        """Flush the span log and stop the metrics server"""
+        if self._export_queue is not None:
+            self._export_queue.put(None)
+            self._export_thread.join(timeout=5)
+            self._export_queue = None
+        if self._http_server:
+            self._http_server.shutdown()
+            self._http_server = None
+
+    def _after_fork(self):
+        """Start a forked child with empty histograms and no inherited threads or sockets"""
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.histograms = {}
+        self.session_histograms = {}
+        # The export and metrics threads did not survive the fork
+        self._export_queue = None
+        self._export_thread = None
+        if self._http_server:
+            self._http_server.socket.close()
+            self._http_server = None
+
+
+tracer = Tracer()
+os.register_at_fork(after_in_child=tracer._after_fork)
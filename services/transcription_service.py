@@ -0,0 +1,119 @@
+import whisper
+import torch
+from pathlib import Path
+from typing import Union
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.tracing_service import tracer
+from services.resource_scheduler import resources
+from services.logging_service import get_logger
+
+logger = get_logger('transcription')
+
+# torch's own intra-op thread count, from before any profile changed it
+DEFAULT_THREADS = torch.get_num_threads()
+
+# Decoding options per use case, fastest first. language None means
+# config.WHISPER_LANGUAGE (auto-detect if that is empty too). threads names
+# the setting resolved by profile_threads() each time the profile is used.
+PROFILES = {
+    # Short ID / password utterances: one greedy pass, no fallback, no timestamps
+    'auth': {
+        'beam_size': None,
+        'best_of': None,
+        'temperature': 0.0,
+        'condition_on_previous_text': False,
+        'without_timestamps': True,
+        'threads': 'interactive',
+    },
+    # Conversation turns: greedy, with one fallback step for garbled output
+    'conversation': {
+        'beam_size': None,
+        'best_of': None,
+        'temperature': (0.0, 0.4),
+        'condition_on_previous_text': False,
+        'without_timestamps': True,
+        'threads': 'interactive',
+    },
+    # Offline re-transcription: Whisper's accuracy defaults
+    'archive': {
+        'beam_size': 5,
+        'best_of': 5,
+        'temperature': (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        'condition_on_previous_text': True,
+        'without_timestamps': False,
+        'threads': 'archive',
+    },
+}
+
+
+def profile_threads(profile: str) -> int:
+    """
+    torch intra-op threads for a profile, from the current config
+
+    Every profile gets an explicit count, so one never inherits the
+    threads of the profile used before it.
+    """
+    if PROFILES[profile]['threads'] == 'archive':
+        threads = config.WHISPER_ARCHIVE_THREADS
+    else:
+        threads = resources.threads('whisper')
+    return threads or DEFAULT_THREADS
+
+
+class TranscriptionService:
+    def __init__(self, model_name: str = None):
+        """
+        Whisper speech-to-text, independent of audio capture
+
+        Args:
+            model_name: Whisper model size (default: config.WHISPER_MODEL)
+        """
+        self.model_name = model_name or config.WHISPER_MODEL
+        self.model = whisper.load_model(self.model_name)
+        # fp16 only helps on GPU; on CPU Whisper warns and falls back to fp32 on every call
+        self.fp16 = self.model.device.type == 'cuda'
+        logger.info("Whisper model loaded: %s (%s)", self.model_name, self.model.device)
+
+    def _options(self, profile: str, threads: int = None) -> dict:
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown transcription profile: {profile} (expected one of {', '.join(PROFILES)})")
+        options = dict(PROFILES[profile])
+
+        del options['threads']
+        threads = threads or profile_threads(profile)
+        if torch.get_num_threads() != threads:
+            torch.set_num_threads(threads)
+
+        options['language'] = options.get('language') or config.WHISPER_LANGUAGE or None
+        options['fp16'] = self.fp16
+        return options
+
+    @tracer.traced('transcribe')
+    def transcribe(self, audio: Union[str, Path, np.ndarray], profile: str = None, threads: int = None) -> str:
+        """
+        Transcribe a recording
+
+        Args:
+            audio: Path to an audio file (anything ffmpeg reads) or a
+                16 kHz mono float32 array
+            profile: Decoding profile from PROFILES (default: config.WHISPER_PROFILE)
+            threads: torch threads for this call instead of the profile's
+                (e.g. 1 in a process pool that parallelizes across files)
+
+        Returns:
+            Transcribed text
+        """
+        if isinstance(audio, Path):
+            audio = str(audio)
+        profile = profile or config.WHISPER_PROFILE
+        logger.debug("Transcribing %s (%s)", audio if isinstance(audio, str) else f"{len(audio)} samples", profile)
+        with resources.stage('whisper'):
+            result = self.model.transcribe(audio, **self._options(profile, threads))
+        text = result['text'].strip()
+        logger.debug("Transcribed: %s", text)
+        return text
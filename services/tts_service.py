@@ -1,26 +1,248 @@
+import pyaudio
 import pyttsx3
-from typing import List
+import re
+from abc import ABC, abstractmethod
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Iterator, List, Tuple
 import sys
 from pathlib import Path
 
+import numpy as np
+
+try:
+    from piper import PiperVoice
+except ImportError:
+    PiperVoice = None
+
 sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.audio_io import read_audio
+from services.tracing_service import tracer
+from services.resource_scheduler import resources
+from services.logging_service import get_logger
 
+logger = get_logger('tts')
+
+# Fragments shorter than this ("Hi.", "1.") are spoken together with the next sentence
+MIN_SENTENCE_CHARS = 20
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a reply into the units synthesized one at a time"""
+    sentences = []
+    carry = ''
+    for part in _SENTENCE_END.split(text.strip()):
+        part = f"{carry} {part}".strip() if carry else part.strip()
+        if not part:
+            continue
+        if len(part) < MIN_SENTENCE_CHARS:
+            carry = part
+            continue
+        sentences.append(part)
+        carry = ''
+    if carry:
+        sentences.append(carry)
+    return sentences
+
+
+class TTSBackend(ABC):
+    """
+    A speech synthesizer rendering text to 16-bit mono PCM
+
+    Backends that are not `concurrent` are only called from one thread
+    at a time.
+    """
+    name = 'base'
+    concurrent = False
+
+    @abstractmethod
+    def synthesize(self, text: str) -> Tuple[bytes, int]:
+        """
+        Returns:
+            (16-bit mono PCM bytes, sample rate)
+        """
+
+    def list_voices(self) -> List:
+        return []
+
+    def set_voice(self, voice_index: int):
+        logger.warning("The %s backend has a single voice", self.name)
+
+    def close(self):
+        pass
+
+
+class Pyttsx3Backend(TTSBackend):
+    """
+    The system speech engine (espeak, SAPI5, NSSS) through pyttsx3, rendered via a file
+
+    SAPI5 (COM) and NSSS only work from the thread that created the
+    engine, while synthesize() is called from the pipeline's worker
+    threads - so the engine lives on one dedicated thread and every call
+    is handed to it. The rendered file is read by its header: NSSS writes
+    AIFF even when asked for a .wav.
+    """
+    name = 'pyttsx3'
 
-class TTSService:
     def __init__(self):
-        """Initialize text-to-speech engine"""
+        self._engine_thread = ThreadPoolExecutor(1, thread_name_prefix='pyttsx3')
+        self.engine = self._call(self._init_engine)
+
+    @staticmethod
+    def _init_engine():
+        engine = pyttsx3.init()
+        engine.setProperty('rate', 165)  # Speed of speech
+        engine.setProperty('volume', 0.9)  # Volume (0.0 to 1.0)
+        return engine
+
+    def _call(self, fn, *args):
+        """Run fn on the engine's thread and wait for it"""
+        return self._engine_thread.submit(fn, *args).result()
+
+    def _render(self, text: str) -> Tuple[np.ndarray, int]:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'speech.wav'
+            self.engine.save_to_file(text, str(path))
+            self.engine.runAndWait()
+            if not path.exists():
+                raise RuntimeError(f"The speech engine wrote no audio for: {text[:50]}")
+            return read_audio(path)
+
+    def synthesize(self, text: str) -> Tuple[bytes, int]:
+        samples, rate = self._call(self._render, text)
+        return (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes(), rate
+
+    def list_voices(self) -> List:
+        return self._call(self.engine.getProperty, 'voices')
+
+    def set_voice(self, voice_index: int):
+        voices = self._call(self.engine.getProperty, 'voices')
+        if 0 <= voice_index < len(voices):
+            self._call(self.engine.setProperty, 'voice', voices[voice_index].id)
+            logger.info("Voice set to: %s", voices[voice_index].name)
+        else:
+            logger.warning("Invalid voice index %d. Available: 0-%d", voice_index, len(voices) - 1)
+
+    def close(self):
         try:
-            self.engine = pyttsx3.init()
+            self._call(self.engine.stop)
+        finally:
+            self._engine_thread.shutdown(wait=True)
+
+
+class PiperBackend(TTSBackend):
+    """
+    Piper neural voices (VITS exported to ONNX), fully offline
+
+    Renders straight to memory. ONNX Runtime sessions can run from
+    several threads at once, so sessions and the sentence pipeline
+    synthesize in parallel.
+    """
+    name = 'piper'
+    concurrent = True
 
-            # Set properties
-            self.engine.setProperty('rate', 165)  # Speed of speech
-            self.engine.setProperty('volume', 0.9)  # Volume (0.0 to 1.0)
+    def __init__(self, model_path: Path = None):
+        if PiperVoice is None:
+            raise ImportError("The piper backend needs piper-tts (pip install piper-tts==1.2.0)")
+        model_path = Path(model_path or config.PIPER_VOICE)
+        if not model_path.exists():
+            raise FileNotFoundError(f"Piper voice not found: {model_path} (see README)")
+        # Reads the voice config from <model>.onnx.json next to it
+        self.voice = PiperVoice.load(str(model_path))
+        self.sample_rate = self.voice.config.sample_rate
+        logger.info("Piper voice loaded: %s (%d Hz)", model_path.name, self.sample_rate)
 
-            print("🔊 TTS Service initialized")
+    def synthesize(self, text: str) -> Tuple[bytes, int]:
+        return b''.join(self.voice.synthesize_stream_raw(text, sentence_silence=0.0)), self.sample_rate
+
+
+BACKENDS = {'pyttsx3': Pyttsx3Backend, 'piper': PiperBackend}
+
+
+class TTSService:
+    def __init__(self, backend: TTSBackend = None):
+        """
+        Text-to-speech with sentence pipelining
+
+        Replies are split into sentences. While one sentence plays, the
+        next ones are already being synthesized on worker threads, so
+        after the first sentence playback runs without gaps and a long
+        reply takes about as long as its audio.
+
+        Args:
+            backend: Synthesizer (default: config.TTS_BACKEND)
+        """
+        try:
+            self.backend = backend or BACKENDS[config.TTS_BACKEND]()
+            # Non-concurrent engines are shared by the pipeline and by sessions: they take turns
+            self._lock = nullcontext() if self.backend.concurrent else threading.Lock()
+            self.executor = ThreadPoolExecutor(config.TTS_SYNTH_WORKERS, thread_name_prefix='tts')
+            self.lookahead = max(config.TTS_LOOKAHEAD_SENTENCES, 0)
+            self.audio = None  # Opened on first local playback
+
+            logger.info("TTS Service initialized (%s backend)", self.backend.name)
         except Exception as e:
-            print(f"❌ Error initializing TTS engine: {e}")
+            logger.error("Error initializing TTS engine: %s", e)
             raise
 
+    @tracer.traced('tts.synthesize')
+    def synthesize(self, text: str) -> Tuple[bytes, int]:
+        """
+        Render speech to PCM without playing it
+
+        Args:
+            text: The text to speak
+
+        Returns:
+            (16-bit mono PCM bytes, sample rate)
+        """
+        with self._lock, resources.stage('tts'):
+            return self.backend.synthesize(text)
+
+    def stream(self, text: str) -> Iterator[Tuple[str, bytes, int]]:
+        """
+        Synthesize a reply sentence by sentence, keeping the next ones in flight
+
+        The consumer plays (or sends) each sentence while the following
+        `TTS_LOOKAHEAD_SENTENCES` are synthesized in the background. Time
+        the consumer spends waiting for a sentence after the first is
+        recorded as 'tts.underrun' - audible gaps in playback.
+
+        Yields:
+            (sentence, 16-bit mono PCM bytes, sample rate)
+        """
+        sentences = iter(split_sentences(text))
+        ahead = deque()
+        try:
+            for sentence in sentences:
+                ahead.append((sentence, self.executor.submit(self.synthesize, sentence)))
+                if len(ahead) > self.lookahead:
+                    break
+            first = True
+            while ahead:
+                sentence, future = ahead.popleft()
+                start = time.perf_counter()
+                pcm, rate = future.result()
+                if not first:
+                    tracer.record('tts.underrun', time.perf_counter() - start)
+                first = False
+                yield sentence, pcm, rate
+
+                # Topped up once the consumer is done with a sentence, so `lookahead` stay in flight
+                following = next(sentences, None)
+                if following:
+                    ahead.append((following, self.executor.submit(self.synthesize, following)))
+        finally:
+            for _, future in ahead:
+                future.cancel()
+
+    @tracer.traced('tts')
     def speak(self, text: str):
         """
         Convert text to speech and play it
@@ -30,18 +252,36 @@ class TTSService:
         """
         try:
             if not text:
-                print("⚠️  No text provided to speak")
+                logger.warning("No text provided to speak")
                 return
 
             # Show what we're speaking (first 50 chars)
             preview = text[:50] + "..." if len(text) > 50 else text
-            print(f"🔊 Speaking: {preview}")
+            logger.debug("Speaking: %s", preview)
 
-            self.engine.say(text)
-            self.engine.runAndWait()
+            stream = stream_rate = None
+            try:
+                for _, pcm, rate in self.stream(text):
+                    if stream_rate != rate:
+                        if stream is not None:
+                            stream.stop_stream()
+                            stream.close()
+                        stream, stream_rate = self._open_output(rate), rate
+                    # Returns once the audio is queued, while the next sentence is synthesized
+                    stream.write(pcm)
+            finally:
+                if stream is not None:
+                    # Blocks until the queued audio has played
+                    stream.stop_stream()
+                    stream.close()
 
         except Exception as e:
-            print(f"❌ Error speaking text: {e}")
+            logger.error("Error speaking text: %s", e)
+
+    def _open_output(self, rate: int):
+        if self.audio is None:
+            self.audio = pyaudio.PyAudio()
+        return self.audio.open(format=pyaudio.paInt16, channels=1, rate=rate, output=True)
 
     def list_voices(self) -> List:
         """
@@ -51,13 +291,13 @@ class TTSService:
             List of available voice objects
         """
         try:
-            voices = self.engine.getProperty('voices')
-            print(f"\n📋 Available voices ({len(voices)}):")
+            voices = self.backend.list_voices()
+            logger.info("Available voices (%d):", len(voices))
             for idx, voice in enumerate(voices):
-                print(f"  [{idx}] {voice.name} - {voice.id}")
+                logger.info("  [%d] %s - %s", idx, voice.name, voice.id)
             return voices
         except Exception as e:
-            print(f"❌ Error listing voices: {e}")
+            logger.error("Error listing voices: %s", e)
             return []
 
     def set_voice(self, voice_index: int = 0):
@@ -68,25 +308,20 @@ class TTSService:
             voice_index: Index of the voice to use (default: 0)
         """
         try:
-            voices = self.engine.getProperty('voices')
-
-            if 0 <= voice_index < len(voices):
-                self.engine.setProperty('voice', voices[voice_index].id)
-                print(f"✅ Voice set to: {voices[voice_index].name}")
-            else:
-                print(f"⚠️  Invalid voice index {voice_index}. Available: 0-{len(voices)-1}")
-
+            self.backend.set_voice(voice_index)
         except Exception as e:
-            print(f"❌ Error setting voice: {e}")
+            logger.error("Error setting voice: %s", e)
 
     def cleanup(self):
         """Clean up TTS engine"""
         try:
-            if hasattr(self, 'engine') and self.engine:
-                self.engine.stop()
-                print("🔇 TTS Service stopped")
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.backend.close()
+            if self.audio is not None:
+                self.audio.terminate()
+            logger.info("TTS Service stopped")
         except Exception as e:
-            print(f"❌ Error cleaning up TTS engine: {e}")
+            logger.error("Error cleaning up TTS engine: %s", e)
 
 
 # Test code
@@ -0,0 +1,187 @@
+import cv2
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Union
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.tracing_service import tracer
+from services.logging_service import get_logger
+
+logger = get_logger('vision')
+
+
+def dhash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Difference hash of a frame
+
+    The frame is shrunk to (hash_size + 1) x hash_size grayscale and each
+    bit records whether a pixel is brighter than its right-hand neighbour,
+    so small changes in lighting or compression leave the hash unchanged.
+
+    Args:
+        frame: BGR or grayscale image
+        hash_size: Bits per row/column (64-bit hash by default)
+
+    Returns:
+        Hash as an int
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class CaptureService:
+    def __init__(self, source: Union[int, str, Path] = None, sample_fps: float = None,
+                 dedup_distance: int = None):
+        """
+        Sampled camera capture with near-duplicate filtering
+
+        Frames are sampled at sample_fps; a sampled frame whose difference
+        hash is within dedup_distance bits of the last kept frame is
+        dropped before anything expensive runs on it. Kept frames are
+        written as JPEG snapshots by a background thread.
+
+        Args:
+            source: Camera index or a video file (default: config.CAMERA_SOURCE)
+            sample_fps: Frames kept per second (default: config.CAPTURE_SAMPLE_FPS)
+            dedup_distance: Max hash distance treated as a duplicate (default: config.SNAPSHOT_DEDUP_DISTANCE)
+        """
+        source = config.CAMERA_SOURCE if source is None else source
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        self.source = source
+        # Video files are sampled on their own timeline, cameras on the wall clock
+        self.is_file = not isinstance(source, int)
+        self.sample_interval = 1.0 / (sample_fps or config.CAPTURE_SAMPLE_FPS)
+        self.dedup_distance = config.SNAPSHOT_DEDUP_DISTANCE if dedup_distance is None else dedup_distance
+
+        self.capture = cv2.VideoCapture(str(source) if self.is_file else source)
+        if not self.capture.isOpened():
+            raise RuntimeError(f"Could not open video source: {source}")
+
+        self.stats = {'frames': 0, 'sampled': 0, 'duplicates': 0, 'written': 0, 'dropped': 0}
+        self._last_hash = None
+        self._writes = queue.Queue(maxsize=config.SNAPSHOT_QUEUE_SIZE)
+        self._writer = threading.Thread(target=self._write_snapshots, name='snapshot-writer', daemon=True)
+        self._writer.start()
+        logger.info("Capture Service initialized (source=%s, %.2f fps)", source, 1.0 / self.sample_interval)
+
+    def _position(self) -> float:
+        if self.is_file:
+            return self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        return time.monotonic()
+
+    def sample_frames(self) -> Iterator[Dict]:
+        """
+        Yield frames at the sampling rate
+
+        Frames between samples are grabbed but never decoded into images.
+
+        Yields:
+            {'frame': BGR image, 'captured_at': datetime, 'position': seconds}
+        """
+        next_sample = None
+        while True:
+            if not self.capture.grab():
+                break
+            self.stats['frames'] += 1
+            position = self._position()
+            if next_sample is not None and position < next_sample:
+                continue
+
+            ok, frame = self.capture.retrieve()
+            if not ok:
+                break
+            next_sample = position + self.sample_interval
+            self.stats['sampled'] += 1
+            yield {'frame': frame, 'captured_at': datetime.now(), 'position': position}
+
+    def is_duplicate(self, frame: np.ndarray) -> bool:
+        """Check a frame against the last kept one (and remember it if it is new)"""
+        frame_hash = dhash(frame)
+        if self._last_hash is not None and hamming_distance(frame_hash, self._last_hash) <= self.dedup_distance:
+            return True
+        self._last_hash = frame_hash
+        return False
+
+    def snapshot_path(self, captured_at: datetime) -> Path:
+        return (config.SNAPSHOTS_PATH / f"{captured_at:%Y}" / f"{captured_at:%m}" / f"{captured_at:%d}"
+                / f"{captured_at:%H%M%S_%f}.jpg")
+
+    def snapshots(self, max_snapshots: int = None, duration: float = None) -> Iterator[Dict]:
+        """
+        Yield distinct sampled frames and queue each for writing
+
+        Args:
+            max_snapshots: Stop after this many snapshots (optional)
+            duration: Stop after this many seconds of source time (optional)
+
+        Yields:
+            {'frame', 'captured_at', 'position', 'path'} for each kept frame
+        """
+        kept = 0
+        start = None
+        for sample in self.sample_frames():
+            start = sample['position'] if start is None else start
+            if duration is not None and sample['position'] - start >= duration:
+                break
+
+            with tracer.span('vision.dedup'):
+                duplicate = self.is_duplicate(sample['frame'])
+            if duplicate:
+                self.stats['duplicates'] += 1
+                continue
+
+            sample['path'] = str(self.snapshot_path(sample['captured_at']))
+            try:
+                self._writes.put_nowait((sample['path'], sample['frame']))
+            except queue.Full:
+                # Never stall capture on a slow disk
+                self.stats['dropped'] += 1
+                logger.warning("Snapshot queue full, not saving %s", sample['path'])
+                sample['path'] = None
+
+            yield sample
+            kept += 1
+            if max_snapshots is not None and kept >= max_snapshots:
+                break
+
+    def _write_snapshots(self):
+        quality = [cv2.IMWRITE_JPEG_QUALITY, config.SNAPSHOT_JPEG_QUALITY]
+        while True:
+            item = self._writes.get()
+            if item is None:
+                break
+            path, frame = item
+            try:
+                with tracer.span('vision.write'):
+                    Path(path).parent.mkdir(parents=True, exist_ok=True)
+                    if not cv2.imwrite(path, frame, quality):
+                        raise OSError("imwrite failed")
+                self.stats['written'] += 1
+            except Exception as e:
+                logger.error("Failed to write snapshot %s: %s", path, e)
+            finally:
+                self._writes.task_done()
+
+    def flush(self):
+        """Wait until every queued snapshot is on disk"""
+        self._writes.join()
+
+    def cleanup(self):
+        """Finish pending writes and release the source"""
+        self._writes.put(None)
+        self._writer.join()
+        self.capture.release()
@@ -0,0 +1,163 @@
+import itertools
+import numpy as np
+from pathlib import Path
+from typing import List, Optional, Union
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.audio_features import MFCCExtractor
+from services.tracing_service import tracer
+from services.logging_service import get_logger
+
+logger = get_logger('wake_word')
+
+# Calibrated threshold = worst distance between enrollment examples times this
+THRESHOLD_MARGIN = 1.25
+
+
+def dtw_distance(template: np.ndarray, segment: np.ndarray) -> float:
+    """
+    Subsequence DTW distance between a template and a longer segment
+
+    The template may match anywhere inside the segment (leading and
+    trailing silence are free). Each template frame advances the segment
+    by 0-2 frames, so a row of the cost matrix depends only on the row
+    before it and is computed in one vectorized step.
+
+    Args:
+        template: (m, d) feature frames
+        segment: (n, d) feature frames
+
+    Returns:
+        Mean per-frame distance along the best path (inf for empty input)
+    """
+    m, n = len(template), len(segment)
+    if m == 0 or n == 0:
+        return float('inf')
+
+    # (m, n) Euclidean frame distances
+    cost = np.sqrt(np.maximum(
+        (template ** 2).sum(axis=1)[:, None] + (segment ** 2).sum(axis=1)[None, :] - 2.0 * template @ segment.T,
+        0.0
+    ))
+
+    previous = cost[0].copy()
+    for i in range(1, m):
+        best = previous.copy()
+        best[1:] = np.minimum(best[1:], previous[:-1])
+        best[2:] = np.minimum(best[2:], previous[:-2])
+        previous = cost[i] + best
+    return float(previous.min() / m)
+
+
+class KeywordSpotter:
+    def __init__(self, templates_path: Union[str, Path] = None):
+        """
+        Template-matching wake word detector
+
+        Enrollment examples of the wake word are stored as MFCC sequences
+        (see scripts/enroll_wake_word.py); a speech segment triggers when
+        its DTW distance to any template is under the threshold calibrated
+        at enrollment.
+
+        Args:
+            templates_path: Saved templates (default: config.WAKE_WORD_TEMPLATES)
+        """
+        self.templates_path = Path(templates_path or config.WAKE_WORD_TEMPLATES)
+        self.features = MFCCExtractor()
+        self.templates: List[np.ndarray] = []
+        self.threshold = config.WAKE_WORD_THRESHOLD or None
+        if self.templates_path.exists():
+            self.load()
+
+    def sequence(self, samples: np.ndarray) -> np.ndarray:
+        """Mean-normalized MFCCs (without c0) of the voiced part of a segment"""
+        coeffs = self.features.mfcc(samples, voiced_only=True)[:, 1:]
+        return coeffs - coeffs.mean(axis=0) if len(coeffs) else coeffs
+
+    def enroll(self, examples: List[np.ndarray]):
+        """
+        Replace the templates with enrollment examples and calibrate the threshold
+
+        Args:
+            examples: 16 kHz float32 recordings of the wake word (at least 2)
+        """
+        if len(examples) < 2:
+            raise ValueError("Need at least two wake word examples")
+        self.templates = [self.sequence(example) for example in examples]
+        distances = [
+            min(dtw_distance(a, b), dtw_distance(b, a))
+            for a, b in itertools.combinations(self.templates, 2)
+        ]
+        self.threshold = max(distances) * THRESHOLD_MARGIN
+        logger.info("Enrolled %d wake word templates (threshold %.2f)", len(self.templates), self.threshold)
+
+    def save(self):
+        self.templates_path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(self.templates_path, threshold=self.threshold,
+                 **{f"template_{i}": template for i, template in enumerate(self.templates)})
+
+    def load(self):
+        with np.load(self.templates_path) as data:
+            self.templates = [data[key] for key in sorted(data.files) if key.startswith('template_')]
+            if not config.WAKE_WORD_THRESHOLD:
+                self.threshold = float(data['threshold'])
+        logger.info("Loaded %d wake word templates", len(self.templates))
+
+    @tracer.traced('wake_word')
+    def score(self, samples: np.ndarray) -> float:
+        """Best (lowest) DTW distance between a speech segment and the templates"""
+        segment = self.sequence(samples)
+        return min((dtw_distance(template, segment) for template in self.templates), default=float('inf'))
+
+    def detect(self, samples: np.ndarray) -> bool:
+        distance = self.score(samples)
+        logger.debug("Wake word distance %.2f (threshold %.2f)", distance, self.threshold)
+        return distance <= self.threshold
+
+
+class WakeWordService:
+    def __init__(self, audio, spotter: Optional[KeywordSpotter] = None):
+        """
+        Always-listening trigger
+
+        Only the energy VAD runs on the live stream; the keyword spotter
+        runs once per short speech segment, and Whisper not at all until
+        the wake word is heard.
+
+        Args:
+            audio: AudioService providing the microphone stream
+            spotter: Keyword spotter (loaded from config.WAKE_WORD_TEMPLATES if not provided)
+        """
+        self.audio = audio
+        self.spotter = spotter or KeywordSpotter()
+        if not self.spotter.templates:
+            raise RuntimeError(
+                f"No wake word templates at {self.spotter.templates_path} - run scripts/enroll_wake_word.py"
+            )
+        logger.info("Wake Word Service initialized")
+
+    def wait_for_wake_word(self) -> bool:
+        """
+        Block until the wake word is spoken
+
+        Returns:
+            True once the wake word has been detected
+        """
+        segments = self.audio.speech_segments(
+            end_silence_ms=config.WAKE_WORD_END_SILENCE_MS,
+            max_seconds=config.WAKE_WORD_MAX_SECONDS + 1
+        )
+        try:
+            for samples in segments:
+                seconds = len(samples) / self.audio.RATE
+                # Long segments are ordinary speech, not the wake word
+                if seconds > config.WAKE_WORD_MAX_SECONDS:
+                    continue
+                if self.spotter.detect(samples):
+                    logger.info("Wake word detected")
+                    return True
+        finally:
+            segments.close()
+        return False
@@ -0,0 +1,323 @@
+import gc
+import os
+import select
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.tracing_service import tracer
+from services.logging_service import get_logger, shutdown_logging
+
+logger = get_logger('supervisor')
+
+# Workers that ran at least this long before crashing restart without backoff
+STABLE_SECONDS = 60.0
+# Exited workers get this long to finish after SIGTERM before SIGKILL
+SHUTDOWN_GRACE_SECONDS = 10.0
+
+# Write end of the heartbeat pipe, set in worker processes only
+_heartbeat_fd = None
+# Monotonic time of the worker's last heartbeat() call
+_progress_at = 0.0
+
+
+def preload(model_name: str = None):
+    """
+    Import the heavy modules and load Whisper once, before any fork
+
+    A short warm-up transcription fills Whisper's lazy caches (mel
+    filters, tokenizer) so workers share them too. It runs with a single
+    torch thread: OpenMP thread pools do not survive fork(). Finally
+    everything allocated so far is moved out of the garbage collector's
+    reach - a collection in a worker would otherwise write to the header
+    of every shared object and copy its page.
+
+    Returns:
+        The loaded TranscriptionService, to be used by the workers
+    """
+    import torch
+    from services.transcription_service import TranscriptionService
+
+    start = time.perf_counter()
+    threads = torch.get_num_threads()
+    torch.set_num_threads(1)
+    transcriber = TranscriptionService(model_name)
+    transcriber.transcribe(np.zeros(16000, dtype=np.float32), 'archive', threads=1)
+    torch.set_num_threads(threads)
+
+    gc.collect()
+    gc.freeze()
+    logger.info("Preloaded Whisper %s in %.1fs (%d objects frozen)",
+                transcriber.model_name, time.perf_counter() - start, gc.get_freeze_count())
+    return transcriber
+
+
+def heartbeat():
+    """
+    Report that this worker is making progress (harmless outside a supervised worker)
+
+    Call it from the worker's own loop - per request, per session step,
+    per tick of an idle wait. A relay thread passes beats on to the
+    supervisor only while these calls keep coming, so a worker stuck in
+    a deadlock is restarted even though the process is still running.
+    """
+    global _progress_at
+    _progress_at = time.monotonic()
+
+
+def _relay_heartbeats(interval: float):
+    sent = None
+    while True:
+        if _progress_at != sent:
+            sent = _progress_at
+            try:
+                os.write(_heartbeat_fd, b'.')
+            except BlockingIOError:
+                # Pipe full: the supervisor has plenty of unread heartbeats
+                pass
+        time.sleep(interval)
+
+
+def memory_usage(pid: int) -> Dict[str, float]:
+    """
+    Memory of a process in MB from /proc/<pid>/smaps_rollup
+
+    'private' is what the process alone costs (pages it wrote since the
+    fork); 'pss' charges shared pages proportionally to each sharer.
+
+    Returns:
+        {'rss', 'pss', 'private', 'shared'}, or {} where smaps_rollup is unavailable
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {
+        'rss': fields.get('Rss', 0.0),
+        'pss': fields.get('Pss', 0.0),
+        'private': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0),
+        'shared': fields.get('Shared_Clean', 0.0) + fields.get('Shared_Dirty', 0.0),
+    }
+
+
+class WorkerSupervisor:
+    def __init__(self, target: Callable[[int], None], workers: int = None):
+        """
+        Fork-server for session workers
+
+        Call preload() (and anything else workers should share) before
+        run(): workers are forked from this process and share those pages
+        copy-on-write instead of each importing torch and loading Whisper.
+        Don't open database connections or start threads before forking.
+
+        Each worker runs target(slot), which must call heartbeat() as it
+        makes progress; the beats reach the supervisor over a pipe. Workers
+        that exit with status 0 are replaced immediately (e.g. recycled
+        after N sessions); crashed workers and workers with no heartbeat
+        for WORKER_HEARTBEAT_TIMEOUT are restarted with exponential backoff.
+
+        Args:
+            target: Worker main function, called with the worker's slot number
+            workers: Number of workers (default: config.SUPERVISOR_WORKERS)
+        """
+        self.target = target
+        self.count = workers or config.SUPERVISOR_WORKERS
+        self.slots: Dict[int, Dict] = {}
+        self.running = False
+        self.stats = {'spawned': 0, 'recycled': 0, 'crashed': 0, 'hung': 0}
+
+    def _spawn(self, slot: int):
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(write_fd, False)
+        started = time.perf_counter()
+
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            self._run_worker(slot, write_fd)
+
+        os.close(write_fd)
+        state = self.slots.setdefault(slot, {'failures': 0})
+        state.update(pid=pid, fd=read_fd, started=started, last_beat=time.monotonic(),
+                     ready=False, restart_at=None)
+        self.stats['spawned'] += 1
+        logger.info("Worker %d started (pid %d)", slot, pid)
+
+    def _run_worker(self, slot: int, write_fd: int):
+        """Body of a forked worker; never returns"""
+        global _heartbeat_fd
+        code = 1
+        try:
+            # The supervisor coordinates shutdown; Ctrl+C reaches the whole process group
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            for other in self.slots.values():
+                if other.get('fd') is not None:
+                    os.close(other['fd'])
+
+            _heartbeat_fd = write_fd
+            heartbeat()
+            threading.Thread(target=_relay_heartbeats, args=(config.WORKER_HEARTBEAT_SECONDS,),
+                             name='heartbeat', daemon=True).start()
+
+            self.target(slot)
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            logger.exception("Worker %d failed", slot)
+        finally:
+            tracer.shutdown()
+            # os._exit skips atexit: flush this worker's queued log records first
+            shutdown_logging()
+            os._exit(code)
+
+    def _poll(self, timeout: float):
+        """Read heartbeats until one arrives or timeout"""
+        fds = {state['fd']: slot for slot, state in self.slots.items() if state.get('fd') is not None}
+        if not fds:
+            time.sleep(timeout)
+            return
+        readable, _, _ = select.select(list(fds), [], [], timeout)
+        now = time.monotonic()
+        for fd in readable:
+            state = self.slots[fds[fd]]
+            if not os.read(fd, 4096):
+                # EOF: the worker exited; _reap() handles it
+                os.close(fd)
+                state['fd'] = None
+                continue
+            state['last_beat'] = now
+            if not state['ready']:
+                state['ready'] = True
+                tracer.record('worker.spawn', time.perf_counter() - state['started'], slot=fds[fd])
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            slot = next((s for s, state in self.slots.items() if state.get('pid') == pid), None)
+            if slot is None:
+                continue
+            state = self.slots[slot]
+            if state.get('fd') is not None:
+                os.close(state['fd'])
+            state.update(pid=None, fd=None)
+            if not self.running:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            if code == 0:
+                self.stats['recycled'] += 1
+                state['failures'] = 0
+                state['restart_at'] = time.monotonic()
+                logger.info("Worker %d (pid %d) exited; replacing it", slot, pid)
+                continue
+
+            self.stats['crashed'] += 1
+            if time.perf_counter() - state['started'] >= STABLE_SECONDS:
+                state['failures'] = 0
+            delay = min(config.WORKER_RESTART_BACKOFF_SECONDS * 2 ** state['failures'],
+                        config.WORKER_RESTART_BACKOFF_MAX)
+            state['failures'] += 1
+            state['restart_at'] = time.monotonic() + delay
+            reason = f"signal {-code}" if code < 0 else f"status {code}"
+            logger.warning("Worker %d (pid %d) died with %s; restarting in %.1fs", slot, pid, reason, delay)
+
+    def _check_heartbeats(self):
+        now = time.monotonic()
+        for slot, state in self.slots.items():
+            if state.get('pid') and now - state['last_beat'] > config.WORKER_HEARTBEAT_TIMEOUT:
+                logger.error("Worker %d (pid %d) missed heartbeats for %.0fs; killing it",
+                             slot, state['pid'], now - state['last_beat'])
+                self.stats['hung'] += 1
+                # Don't kill it twice while waiting for the exit
+                state['last_beat'] = float('inf')
+                os.kill(state['pid'], signal.SIGKILL)
+
+    def _restart_due(self):
+        now = time.monotonic()
+        for slot, state in self.slots.items():
+            if state.get('pid') is None and state.get('restart_at') is not None and state['restart_at'] <= now:
+                self._spawn(slot)
+
+    def run(self):
+        """Fork the workers and supervise them until stop(), SIGTERM or SIGINT"""
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                handlers[sig] = signal.signal(sig, lambda signum, frame: self.stop())
+
+        self.running = True
+        try:
+            for slot in range(self.count):
+                self._spawn(slot)
+            logger.info("Supervising %d workers", self.count)
+            while self.running:
+                self._poll(timeout=0.5)
+                self._reap()
+                self._check_heartbeats()
+                self._restart_due()
+        finally:
+            self.running = False
+            self._shutdown()
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+
+    def stop(self):
+        """Ask run() to shut the workers down and return"""
+        self.running = False
+
+    def _shutdown(self):
+        live = [state['pid'] for state in self.slots.values() if state.get('pid')]
+        for pid in live:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + SHUTDOWN_GRACE_SECONDS
+        while any(state.get('pid') for state in self.slots.values()) and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+
+        for state in self.slots.values():
+            if state.get('pid'):
+                logger.warning("Worker pid %d ignored SIGTERM; killing it", state['pid'])
+                os.kill(state['pid'], signal.SIGKILL)
+                os.waitpid(state['pid'], 0)
+                state.update(pid=None)
+            if state.get('fd') is not None:
+                os.close(state['fd'])
+                state['fd'] = None
+        logger.info("All workers stopped (%s)", ", ".join(f"{k}: {v}" for k, v in self.stats.items()))
+
+    def status(self) -> List[Dict]:
+        """Per-worker pid, readiness, uptime and memory_usage()"""
+        return [
+            {
+                'slot': slot,
+                'pid': state.get('pid'),
+                'ready': state.get('ready', False),
+                'uptime': time.perf_counter() - state['started'] if state.get('pid') else 0.0,
+                **(memory_usage(state['pid']) if state.get('pid') else {}),
+            }
+            for slot, state in sorted(self.slots.items())
+        ]
@@ -9,18 +9,181 @@ CREATE TABLE IF NOT EXISTS users (
     metadata JSONB DEFAULT '{}'
 );
 
+-- Partitioned by month on timestamp so indexes and vacuum work stay bounded
+-- per partition; scripts/manage_partitions.py creates future partitions and
+-- detaches/archives expired ones
 CREATE TABLE IF NOT EXISTS conversations (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
     user_id INTEGER REFERENCES users(user_id),
-    timestamp TIMESTAMP DEFAULT NOW(),
+    timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
     location VARCHAR(100),
     trigger_type VARCHAR(50),
     user_input TEXT,
     ai_response TEXT,
     audio_path TEXT,
     video_file_path TEXT,
-    metadata JSONB DEFAULT '{}'
-);
+    metadata JSONB DEFAULT '{}',
+    embedding BYTEA,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Packed float32 embedding of each turn, used for semantic retrieval
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS embedding BYTEA;
+-- Model that produced the embedding (config.EMBEDDING_MODEL). Retrieval skips
+-- embeddings from other models; scripts/backfill_embeddings.py redoes them
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS embedding_model TEXT;
 
-CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations(user_id);
+-- Estimated LLM tokens per side of the turn (services/token_counter.py), so
+-- history can be fitted to a context budget in SQL; NULL until backfilled
+-- by scripts/backfill_token_counts.py
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS user_input_tokens INTEGER;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS ai_response_tokens INTEGER;
+
+-- Full-text search over both sides of each turn (user text ranks higher).
+-- The composite GIN index (btree_gin) answers "this user's turns matching
+-- these words" from one index scan. Adding the column rewrites the table.
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(user_input, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(ai_response, '')), 'B')
+) STORED;
+CREATE INDEX IF NOT EXISTS idx_conversations_search ON conversations USING GIN (user_id, search_vector);
+
+-- Serves per-user history reads and (timestamp, id) keyset pagination;
+-- supersedes the old single-column user_id index
+DROP INDEX IF EXISTS idx_conversations_user_id;
+CREATE INDEX IF NOT EXISTS idx_conversations_user_timestamp ON conversations(user_id, timestamp DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations(timestamp);
+-- Bulk rewrites keyed by recording path (audio archiver, batch re-transcription)
+CREATE INDEX IF NOT EXISTS idx_conversations_audio_path ON conversations(audio_path) WHERE audio_path IS NOT NULL;
+
+-- Create the monthly partition containing month_start (no-op if it exists).
+-- Rows that already landed in the default partition for that month are moved.
+CREATE OR REPLACE FUNCTION create_conversation_partition(month_start DATE) RETURNS TEXT AS $$
+DECLARE
+    start_date DATE := date_trunc('month', month_start)::date;
+    end_date DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::date;
+    partition_name TEXT := 'conversations_' || to_char(start_date, 'YYYY_MM');
+    column_list TEXT;
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    IF to_regclass('conversations_default') IS NOT NULL THEN
+        -- Generated columns cannot be copied, so move only the stored ones
+        SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO column_list
+        FROM pg_attribute
+        WHERE attrelid = 'conversations'::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = '';
+
+        EXECUTE format(
+            'CREATE TEMP TABLE conversations_moving AS SELECT %s FROM conversations_default WHERE timestamp >= %L AND timestamp < %L',
+            column_list, start_date, end_date
+        );
+        EXECUTE format(
+            'DELETE FROM conversations_default WHERE timestamp >= %L AND timestamp < %L',
+            start_date, end_date
+        );
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF conversations FOR VALUES FROM (%L) TO (%L)',
+            partition_name, start_date, end_date
+        );
+        EXECUTE format(
+            'INSERT INTO conversations (%s) SELECT %s FROM conversations_moving',
+            column_list, column_list
+        );
+        DROP TABLE conversations_moving;
+    ELSE
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF conversations FOR VALUES FROM (%L) TO (%L)',
+            partition_name, start_date, end_date
+        );
+    END IF;
+
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Default partition plus the current and next two months. Skipped (with a
+-- notice) on databases whose conversations table predates partitioning.
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'conversations'::regclass) = 'p' THEN
+        CREATE TABLE IF NOT EXISTS conversations_default PARTITION OF conversations DEFAULT;
+        PERFORM create_conversation_partition((date_trunc('month', NOW()) + make_interval(months => n))::date)
+        FROM generate_series(0, 2) AS n;
+    ELSE
+        RAISE NOTICE 'conversations is not partitioned; run scripts/manage_partitions.py --migrate';
+    END IF;
+END $$;
+
+-- Enrolled voice/face embeddings are cached in memory by
+-- services/enrolled_index_service.py. Every change bumps a per-column
+-- version (so on-disk snapshots can be validated cheaply) and is
+-- announced on the user_embedding_changed channel.
+CREATE TABLE IF NOT EXISTS embedding_index_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION notify_user_embedding_change() RETURNS trigger AS $$
+DECLARE
+    column_name TEXT := TG_ARGV[0];
+    changed_user INTEGER;
+    new_version BIGINT;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed_user := OLD.user_id;
+    ELSE
+        changed_user := NEW.user_id;
+    END IF;
+
+    INSERT INTO embedding_index_versions (name, version) VALUES (column_name, 1)
+    ON CONFLICT (name) DO UPDATE SET version = embedding_index_versions.version + 1
+    RETURNING version INTO new_version;
+
+    PERFORM pg_notify('user_embedding_changed', json_build_object(
+        'column', column_name, 'user_id', changed_user, 'version', new_version
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only rows that actually gain, change or lose an embedding bump the version
+DROP TRIGGER IF EXISTS users_voice_embedding_changed ON users;
+DROP TRIGGER IF EXISTS users_voice_embedding_inserted ON users;
+CREATE TRIGGER users_voice_embedding_inserted
+    AFTER INSERT ON users
+    FOR EACH ROW WHEN (NEW.voice_embedding IS NOT NULL)
+    EXECUTE FUNCTION notify_user_embedding_change('voice_embedding');
+
+DROP TRIGGER IF EXISTS users_voice_embedding_updated ON users;
+CREATE TRIGGER users_voice_embedding_updated
+    AFTER UPDATE OF voice_embedding ON users
+    FOR EACH ROW WHEN (OLD.voice_embedding IS DISTINCT FROM NEW.voice_embedding)
+    EXECUTE FUNCTION notify_user_embedding_change('voice_embedding');
+
+DROP TRIGGER IF EXISTS users_voice_embedding_deleted ON users;
+CREATE TRIGGER users_voice_embedding_deleted
+    AFTER DELETE ON users
+    FOR EACH ROW WHEN (OLD.voice_embedding IS NOT NULL)
+    EXECUTE FUNCTION notify_user_embedding_change('voice_embedding');
+
+DROP TRIGGER IF EXISTS users_face_embedding_changed ON users;
+DROP TRIGGER IF EXISTS users_face_embedding_inserted ON users;
+CREATE TRIGGER users_face_embedding_inserted
+    AFTER INSERT ON users
+    FOR EACH ROW WHEN (NEW.face_embedding IS NOT NULL)
+    EXECUTE FUNCTION notify_user_embedding_change('face_embedding');
+
+DROP TRIGGER IF EXISTS users_face_embedding_updated ON users;
+CREATE TRIGGER users_face_embedding_updated
+    AFTER UPDATE OF face_embedding ON users
+    FOR EACH ROW WHEN (OLD.face_embedding IS DISTINCT FROM NEW.face_embedding)
+    EXECUTE FUNCTION notify_user_embedding_change('face_embedding');
+
+DROP TRIGGER IF EXISTS users_face_embedding_deleted ON users;
+CREATE TRIGGER users_face_embedding_deleted
+    AFTER DELETE ON users
+    FOR EACH ROW WHEN (OLD.face_embedding IS NOT NULL)
+    EXECUTE FUNCTION notify_user_embedding_change('face_embedding');
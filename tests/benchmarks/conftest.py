@@ -0,0 +1,97 @@
+"""
+Micro-benchmark harness for the pure-Python hot paths
+
+Each test calls the ``benchmark`` fixture with the function under test.
+The fixture calibrates an iteration count, takes the best of several
+rounds and records seconds per call.
+
+    pytest tests/benchmarks --benchmark-save      # record baseline.json
+    pytest tests/benchmarks --benchmark-compare   # fail on regressions
+
+Baselines are machine-specific: re-record them on the machine that runs
+the comparison. The command-line options live in tests/conftest.py so
+they are registered however pytest is invoked.
+"""
+import json
+import platform
+import time
+from pathlib import Path
+
+import pytest
+
+# Best-of rounds per benchmark and minimum wall time per round
+ROUNDS = 5
+MIN_ROUND_SECONDS = 0.02
+
+_results = {}
+
+
+def _load_baseline(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text()).get('results', {})
+
+
+def _time_call(func, args, kwargs) -> float:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_ROUND_SECONDS:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(MIN_ROUND_SECONDS / elapsed * 1.2))
+
+    best = elapsed / number
+    for _ in range(ROUNDS - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func(*args, **kwargs)
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+@pytest.fixture
+def benchmark(request):
+    """Time func(*args, **kwargs) and check it against the baseline"""
+    options = request.config.option
+
+    def run(func, *args, **kwargs):
+        seconds = _time_call(func, args, kwargs)
+        name = request.node.name
+        _results[name] = seconds
+
+        if options.benchmark_compare:
+            baseline = _load_baseline(options.benchmark_baseline).get(name)
+            if baseline is not None and seconds > baseline * (1 + options.benchmark_threshold):
+                pytest.fail(
+                    f"{name} regressed: {seconds * 1e6:.2f}µs/call vs. baseline {baseline * 1e6:.2f}µs/call "
+                    f"(+{(seconds / baseline - 1) * 100:.0f}%, threshold {options.benchmark_threshold * 100:.0f}%)"
+                )
+        return seconds
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _results:
+        return
+
+    baseline = _load_baseline(config.option.benchmark_baseline)
+    terminalreporter.section('benchmarks (µs per call)')
+    for name, seconds in sorted(_results.items()):
+        line = f"{name:<60}{seconds * 1e6:>12.2f}"
+        if name in baseline:
+            line += f"   baseline {baseline[name] * 1e6:>10.2f}  ({(seconds / baseline[name] - 1) * 100:+.0f}%)"
+        terminalreporter.write_line(line)
+
+    if config.option.benchmark_save:
+        path = config.option.benchmark_baseline
+        results = {**_load_baseline(path), **_results}
+        path.write_text(json.dumps({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': dict(sorted(results.items())),
+        }, indent=2) + "\n")
+        terminalreporter.write_line(f"baseline saved to {path}")
@@ -0,0 +1,167 @@
+import io
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.audio_io import write_wav
+from config.config import config
+from services.conversation_service import parse_user_id, is_exit_command, build_conversation_history
+from services.token_counter import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+from services.speaker_service import SpeakerService
+from services.enrolled_index_service import EmbeddingMatrix
+from services.audio_features import EnergyVAD, MFCCExtractor
+from services.audio_frontend import AudioFrontend
+from services.wake_word_service import dtw_distance
+
+# AudioService capture parameters
+CHUNK = 1024
+RATE = 16000
+
+
+class HistoryDatabase:
+    """In-memory stand-in exposing the DatabaseService reads used by build_conversation_history"""
+
+    def __init__(self, turns: int):
+        start = datetime(2024, 1, 1)
+        self.conversations = [
+            {
+                'id': f"00000000-0000-0000-0000-{i:012d}",
+                'user_id': 1234,
+                'timestamp': start + timedelta(minutes=i),
+                'user_input': f"Question number {i} about the weather and my calendar?",
+                'ai_response': f"Answer number {i}: it will be sunny, and you have two meetings tomorrow.",
+            }
+            for i in range(turns)
+        ]
+        for conv in self.conversations:
+            conv['user_input_tokens'] = estimate_tokens(conv['user_input'])
+            conv['ai_response_tokens'] = estimate_tokens(conv['ai_response'])
+
+    def get_user_conversations(self, user_id, limit=10, include_media=False, oldest_first=False):
+        recent = self.conversations[-limit:]
+        return [dict(conv) for conv in (recent if oldest_first else reversed(recent))]
+
+    def search_conversations(self, user_id, query, limit=10, match_any=False):
+        # Full-text search runs in PostgreSQL; stand in with the oldest turns as matches
+        return [
+            dict(conv, rank=0.1, tokens=conv['user_input_tokens'] + conv['ai_response_tokens'] + 2 * MESSAGE_OVERHEAD_TOKENS)
+            for conv in self.conversations[:limit]
+        ]
+
+    def get_conversations_within_budget(self, user_id, token_budget, max_turns=1000):
+        # Same selection as the SQL running sum (database_service.TURN_TOKENS_SQL)
+        selected, total = [], 0
+        for conv in reversed(self.conversations[-max_turns:]):
+            total += conv['user_input_tokens'] + conv['ai_response_tokens'] + 2 * MESSAGE_OVERHEAD_TOKENS
+            if total > token_budget:
+                break
+            selected.append(dict(conv))
+        return selected[::-1]
+
+
+@pytest.mark.parametrize('transcription', [
+    "1234",
+    "one two three four",
+    "my user id is for five six seven",
+    "um I think it's twelve thirty four or maybe one two three four",
+], ids=['digits', 'spelled', 'sentence', 'rambling'])
+def test_parse_user_id(benchmark, transcription):
+    benchmark(parse_user_id, transcription)
+
+
+@pytest.mark.parametrize('words', [5, 50, 500])
+def test_is_exit_command(benchmark, words):
+    text = " ".join(["tell me more about the forecast"] * (words // 5))
+    assert not is_exit_command(text)
+    benchmark(is_exit_command, text)
+
+
+@pytest.mark.parametrize('turns', [10, 100, 1000])
+def test_build_conversation_history(benchmark, monkeypatch, turns):
+    # Unbudgeted: every stored turn (up to 1000) goes into the context
+    monkeypatch.setattr(config, 'HISTORY_TOKEN_BUDGET', 0)
+    db = HistoryDatabase(turns)
+    messages = build_conversation_history(db, 1234, "What did we talk about?")
+    assert len(messages) == 2 * turns + 2
+    benchmark(build_conversation_history, db, 1234, "What did we talk about?")
+
+
+@pytest.mark.parametrize('turns', [100, 1000])
+def test_build_conversation_history_budget(benchmark, monkeypatch, turns):
+    monkeypatch.setattr(config, 'HISTORY_TOKEN_BUDGET', 1536)
+    db = HistoryDatabase(turns)
+    messages = build_conversation_history(db, 1234, "What did we talk about?")
+    used = sum(estimate_tokens(m['content']) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+    assert 2 < len(messages) < 2 * turns + 2 and used <= 1536
+    # Search matches (the oldest turns here) come first, then the newest turns
+    assert messages[1]['content'] == db.conversations[0]['user_input']
+    assert messages[-2]['content'] == db.conversations[-1]['ai_response']
+    benchmark(build_conversation_history, db, 1234, "What did we talk about?")
+
+
+@pytest.mark.parametrize('words', [20, 200])
+def test_estimate_tokens(benchmark, words):
+    # Runs on every saved turn and on every prompt
+    text = " ".join(["Answer number 42: it will be sunny tomorrow, and you have two meetings."] * (words // 13 + 1))
+    benchmark(estimate_tokens, text)
+
+
+@pytest.mark.parametrize('seconds', [1, 5, 30])
+def test_write_wav(benchmark, seconds):
+    # In-memory target: measures frame joining and WAV encoding, not the disk
+    frames = [bytes(CHUNK * 2)] * int(RATE / CHUNK * seconds)
+    benchmark(lambda: write_wav(io.BytesIO(), frames, 1, 2, RATE))
+
+
+@pytest.mark.parametrize('seconds', [1, 5])
+def test_speaker_embed(benchmark, seconds):
+    speaker = SpeakerService()
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal(RATE * seconds) * 0.1).astype(np.float32)
+    assert speaker.embed(samples).shape == (speaker.dim,)
+    benchmark(speaker.embed, samples)
+
+
+@pytest.mark.parametrize('users', [100, 10000])
+def test_speaker_identify(benchmark, users):
+    speaker = SpeakerService()
+    rng = np.random.default_rng(0)
+    enrolled = rng.standard_normal((users, speaker.dim)).astype(np.float32)
+    enrolled /= np.linalg.norm(enrolled, axis=1, keepdims=True)
+    index = EmbeddingMatrix()
+    index.build(list(range(users)), enrolled)
+    assert speaker.identify(enrolled[0], index)[1] > 0.99
+    benchmark(speaker.identify, enrolled[0], index)
+
+
+def test_vad_block(benchmark):
+    # Runs on every captured block while idle, so it bounds idle CPU
+    vad = EnergyVAD()
+    block = (np.random.default_rng(0).standard_normal(CHUNK) * 0.01).astype(np.float32)
+    for _ in range(vad.warmup_blocks):
+        vad.is_speech(block)
+    benchmark(vad.is_speech, block)
+
+
+@pytest.mark.parametrize('device_rate, channels', [(48000, 2), (44100, 1)])
+def test_audio_frontend_block(benchmark, device_rate, channels):
+    # Runs on every captured block, ahead of the VAD
+    frontend = AudioFrontend(device_rate, channels, noise_gate=True)
+    frames = int(device_rate * 0.064)
+    pcm = (np.random.default_rng(0).standard_normal(frames * channels) * 300).astype('<i2').tobytes()
+    for _ in range(8):
+        frontend.process(pcm)
+    benchmark(frontend.process, pcm)
+
+
+@pytest.mark.parametrize('seconds', [1, 2.5])
+def test_wake_word_dtw(benchmark, seconds):
+    rng = np.random.default_rng(0)
+    features = MFCCExtractor()
+    template = features.mfcc((rng.standard_normal(int(RATE * 0.8)) * 0.1).astype(np.float32))[:, 1:]
+    segment = features.mfcc((rng.standard_normal(int(RATE * seconds)) * 0.1).astype(np.float32))[:, 1:]
+    benchmark(dtw_distance, template, segment)
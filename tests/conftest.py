@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.tracing_service import tracer
+
+# Benchmark results recorded by tests/benchmarks --benchmark-save
+DEFAULT_BASELINE = Path(__file__).parent / 'benchmarks' / 'baseline.json'
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark')
+    group.addoption('--benchmark-save', action='store_true',
+                    help="write this run's results to the baseline file")
+    group.addoption('--benchmark-compare', action='store_true',
+                    help="fail benchmarks slower than the baseline by more than the threshold")
+    group.addoption('--benchmark-threshold', type=float, default=0.25,
+                    help="allowed slowdown vs. baseline as a fraction (default: 0.25)")
+    group.addoption('--benchmark-baseline', type=Path, default=DEFAULT_BASELINE,
+                    help="baseline results file")
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _no_trace_log():
+    """Keep span timing on the hot paths but don't write span logs from tests"""
+    jsonl_path = tracer.jsonl_path
+    tracer.jsonl_path = None
+    yield
+    tracer.jsonl_path = jsonl_path
@@ -0,0 +1,158 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.admission_service import AdmissionController, Overloaded
+
+LIMITS = {'auth': 4, 'interactive': 4}
+
+
+def controller(**kwargs) -> AdmissionController:
+    options = {'queue_limits': LIMITS, 'backpressure_after': 0, 'max_wait': 0}
+    return AdmissionController('test', 1, **{**options, **kwargs})
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class Holder:
+    """Occupies one slot of a controller from another thread until released"""
+
+    def __init__(self, admission: AdmissionController, priority: str = 'interactive'):
+        self.release = threading.Event()
+        admitted = threading.Event()
+
+        def hold():
+            with admission.admit(priority):
+                admitted.set()
+                self.release.wait()
+
+        self.thread = threading.Thread(target=hold, daemon=True)
+        self.thread.start()
+        assert admitted.wait(5)
+
+    def done(self):
+        self.release.set()
+        self.thread.join(5)
+
+
+def request(admission: AdmissionController, priority: str, order: list, **kwargs) -> threading.Thread:
+    def run():
+        try:
+            with admission.admit(priority, **kwargs):
+                order.append(priority)
+        except Overloaded:
+            order.append(f"{priority} rejected")
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_admits_up_to_capacity():
+    admission = AdmissionController('test', 2, LIMITS, 0, 0)
+    with admission.admit('interactive'), admission.admit('auth'):
+        assert admission.snapshot()['running'] == 2
+    assert admission.snapshot()['running'] == 0
+
+
+def test_auth_overtakes_queued_interactive():
+    admission = controller()
+    holder = Holder(admission)
+    order = []
+    threads = [request(admission, 'interactive', order)]
+    wait_until(lambda: admission.queued['interactive'] == 1)
+    threads.append(request(admission, 'interactive', order))
+    wait_until(lambda: admission.queued['interactive'] == 2)
+    threads.append(request(admission, 'auth', order))
+    wait_until(lambda: admission.queued['auth'] == 1)
+
+    holder.done()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ['auth', 'interactive', 'interactive']
+    assert admission.snapshot()['running'] == 0
+
+
+def test_full_queue_is_rejected_at_once():
+    admission = controller(queue_limits={'auth': 1, 'interactive': 1})
+    holder = Holder(admission)
+    order = []
+    queued = request(admission, 'interactive', order)
+    wait_until(lambda: admission.queued['interactive'] == 1)
+
+    start = time.perf_counter()
+    with pytest.raises(Overloaded):
+        with admission.admit('interactive'):
+            pass
+    assert time.perf_counter() - start < 0.5
+    # Other classes have their own bound
+    auth = request(admission, 'auth', order)
+    wait_until(lambda: admission.queued['auth'] == 1)
+
+    holder.done()
+    queued.join(5)
+    auth.join(5)
+    assert order == ['auth', 'interactive']
+    assert admission.snapshot()['stats']['interactive']['rejected'] == 1
+
+
+@pytest.mark.parametrize('backpressure_after, calls', [(0.05, 1), (0, 0), (1.0, 0)],
+                         ids=['backpressure', 'no-backpressure', 'backpressure-after-max-wait'])
+def test_gives_up_after_max_wait(backpressure_after, calls):
+    admission = controller(backpressure_after=backpressure_after, max_wait=0.3)
+    holder = Holder(admission)
+    waits = []
+
+    start = time.perf_counter()
+    with pytest.raises(Overloaded):
+        with admission.admit('interactive', on_wait=lambda: waits.append(time.perf_counter() - start)):
+            pass
+    elapsed = time.perf_counter() - start
+    holder.done()
+
+    assert 0.3 <= elapsed < 1.0
+    assert len(waits) == calls
+    assert admission.snapshot()['queued']['interactive'] == 0
+    assert admission.snapshot()['running'] == 0
+
+
+def test_on_wait_fires_once():
+    admission = controller(backpressure_after=0.05, max_wait=5)
+    holder = Holder(admission)
+    waits = []
+    order = []
+    thread = request(admission, 'interactive', order, on_wait=lambda: waits.append(1))
+    wait_until(lambda: waits)
+    time.sleep(0.2)
+
+    holder.done()
+    thread.join(5)
+
+    assert order == ['interactive']
+    assert waits == [1]
+    assert admission.snapshot()['stats']['interactive']['backpressure'] == 1
+
+
+def test_no_on_wait_when_admitted_quickly():
+    admission = controller(backpressure_after=1.0, max_wait=5)
+    holder = Holder(admission)
+    waits = []
+    order = []
+    thread = request(admission, 'interactive', order, on_wait=lambda: waits.append(1))
+    wait_until(lambda: admission.queued['interactive'] == 1)
+
+    holder.done()
+    thread.join(5)
+
+    assert order == ['interactive']
+    assert waits == []
@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.audio_archive_service import ORPHAN_SECONDS, AudioArchiveService
+
+
+class PathsDatabase:
+    """Conversation rows pointing at recordings; optionally fails updates like a lost connection"""
+
+    def __init__(self, paths=(), fail: bool = False):
+        self.paths = [str(path) for path in paths]
+        self.fail = fail
+        self.updates = []
+
+    def referenced_audio_paths(self, paths, since=None):
+        return set(paths) & set(self.paths)
+
+    def update_audio_paths(self, path_updates, since=None):
+        if self.fail:
+            raise RuntimeError("connection lost")
+        self.updates.extend(path_updates)
+        new_paths = dict(path_updates)
+        updated = sum(path in new_paths for path in self.paths)
+        self.paths = [new_paths.get(path, path) for path in self.paths]
+        return updated
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def recordings(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, 'AUDIO_PATH', tmp_path)
+    monkeypatch.setattr(config, 'AUDIO_ARCHIVE_MIN_AGE_SECONDS', 0)
+    paths = [tmp_path / '20240301_101500_recording.wav', tmp_path / '20240302_090000_recording.wav']
+    for path in paths:
+        path.write_bytes(b'RIFF' + path.name.encode())
+    return paths
+
+
+def archiver(db: PathsDatabase) -> AudioArchiveService:
+    service = AudioArchiveService(db, 'flac')
+    service.ffmpeg = None  # Shard without transcoding
+    return service
+
+
+def test_archive_without_ffmpeg(recordings, tmp_path):
+    db = PathsDatabase(recordings)
+
+    assert archiver(db).archive_pending() == 2
+
+    assert sorted(db.updates) == [
+        (str(recordings[0]), str(tmp_path / '2024' / '03' / '01' / recordings[0].name)),
+        (str(recordings[1]), str(tmp_path / '2024' / '03' / '02' / recordings[1].name)),
+    ]
+    for src, dest in db.updates:
+        assert not Path(src).exists()
+        assert Path(dest).read_bytes() == b'RIFF' + Path(src).name.encode()
+    assert not list(tmp_path.rglob('*.part'))
+
+
+def test_failed_update_keeps_originals(recordings, tmp_path):
+    with pytest.raises(RuntimeError):
+        archiver(PathsDatabase(recordings, fail=True)).archive_pending()
+
+    # The database still points at the originals, which must still be there
+    assert all(path.exists() for path in recordings)
+    assert sorted(p for p in tmp_path.rglob('*') if p.is_file()) == sorted(recordings)
+
+
+def test_recordings_without_a_row_wait(recordings, tmp_path):
+    """A turn still running has no row yet: its recording stays where the row will point"""
+    db = PathsDatabase(recordings[:1])
+
+    assert archiver(db).archive_pending() == 1
+    assert recordings[1].exists()
+    assert db.paths == [str(tmp_path / '2024' / '03' / '01' / recordings[0].name)]
+
+    # The row arrives: the next run archives it
+    db.paths.append(str(recordings[1]))
+    assert archiver(db).archive_pending() == 1
+    assert not recordings[1].exists()
+    assert db.paths[1] == str(tmp_path / '2024' / '03' / '02' / recordings[1].name)
+
+
+def test_orphans_are_archived(recordings, tmp_path):
+    old = time.time() - ORPHAN_SECONDS - 60
+    os.utime(recordings[0], (old, old))
+    db = PathsDatabase()
+
+    assert archiver(db).archive_pending() == 1
+    assert not recordings[0].exists() and recordings[1].exists()
+    assert (tmp_path / '2024' / '03' / '01' / recordings[0].name).exists()
+
+
+class RetentionDatabase(PathsDatabase):
+    def __init__(self, fail: bool = False):
+        super().__init__(fail=fail)
+        self.files_at_update = None
+
+    def update_audio_paths(self, path_updates, since=None):
+        self.files_at_update = [Path(path).exists() for path, _ in path_updates]
+        return super().update_audio_paths(path_updates, since)
+
+
+@pytest.mark.parametrize('fail', [False, True], ids=['updated', 'update-failed'])
+def test_retention_updates_rows_before_deleting(monkeypatch, tmp_path, fail):
+    monkeypatch.setattr(config, 'AUDIO_PATH', tmp_path)
+    monkeypatch.setattr(config, 'AUDIO_RETENTION_DAYS', 30)
+    expired = tmp_path / '2020' / '01' / '01' / '20200101_120000_recording.flac'
+    expired.parent.mkdir(parents=True)
+    expired.write_bytes(b'fLaC')
+    db = RetentionDatabase(fail=fail)
+
+    if fail:
+        with pytest.raises(RuntimeError):
+            archiver(db).enforce_retention()
+        assert expired.exists()
+    else:
+        assert archiver(db).enforce_retention() == 1
+        assert db.files_at_update == [True]
+        assert db.updates == [(str(expired), None)]
+        assert not expired.exists() and not (tmp_path / '2020').exists()
@@ -0,0 +1,69 @@
+import io
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.audio_io import read_aiff, read_audio, read_wav, write_wav
+
+PCM = np.array([0, 1000, -1000, 32767, -32768, 12345], dtype=np.int16)
+
+
+def aiff(pcm: np.ndarray, rate: int, channels: int = 1, compression: bytes = None) -> bytes:
+    """An AIFF file, or AIFF-C when compression is given, as macOS's speech synthesizer writes them"""
+    exponent = rate.bit_length() - 1
+    comm = struct.pack('>hIh', channels, len(pcm) // channels, 16)
+    comm += struct.pack('>HQ', exponent + 16383, rate << (63 - exponent))
+    if compression:
+        # Compression type, then its name as a pascal string
+        comm += compression + b'\x03raw'
+    samples = pcm.astype('<i2' if compression == b'sowt' else '>i2').tobytes()
+    chunks = [(b'COMM', comm), (b'SSND', struct.pack('>II', 0, 0) + samples)]
+    if compression:
+        chunks.insert(0, (b'FVER', struct.pack('>I', 0xA2805140)))
+    body = b''.join(name + struct.pack('>I', len(data)) + data + b'\0' * (len(data) & 1) for name, data in chunks)
+    kind = b'AIFC' if compression else b'AIFF'
+    return b'FORM' + struct.pack('>I', len(body) + 4) + kind + body
+
+
+@pytest.mark.parametrize('compression', [None, b'NONE', b'sowt'])
+@pytest.mark.parametrize('rate', [22050, 16000, 44100])
+def test_read_aiff(rate, compression):
+    samples, read_rate = read_aiff(io.BytesIO(aiff(PCM, rate, compression=compression)))
+    assert read_rate == rate
+    np.testing.assert_array_equal(samples, PCM / 32768.0)
+
+
+def test_read_aiff_mixes_stereo_to_mono():
+    stereo = np.array([100, 300, -200, -400], dtype=np.int16)
+    samples, _ = read_aiff(io.BytesIO(aiff(stereo, 22050, channels=2)))
+    np.testing.assert_array_equal(samples, np.array([200, -300]) / 32768.0)
+
+
+def test_read_aiff_rejects_compressed_audio():
+    with pytest.raises(ValueError, match='ulaw'):
+        read_aiff(io.BytesIO(aiff(PCM, 22050, compression=b'ulaw')))
+
+
+def test_read_audio_goes_by_header(tmp_path):
+    # Named .wav, as pyttsx3 asks for, but holding AIFF
+    path = tmp_path / 'speech.wav'
+    path.write_bytes(aiff(PCM, 22050))
+    samples, rate = read_audio(path)
+    assert rate == 22050
+    np.testing.assert_array_equal(samples, PCM / 32768.0)
+
+    write_wav(path, [PCM.astype('<i2').tobytes()], 1, 2, 16000)
+    assert read_audio(path)[1] == 16000
+    np.testing.assert_array_equal(read_audio(path)[0], read_wav(path)[0])
+
+
+@pytest.mark.parametrize('content, message', [(b'', 'empty'), (b'OggS' + bytes(40), 'Unsupported')])
+def test_read_audio_rejects_other_files(tmp_path, content, message):
+    path = tmp_path / 'speech.wav'
+    path.write_bytes(content)
+    with pytest.raises(ValueError, match=message):
+        read_audio(path)
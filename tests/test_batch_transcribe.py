@@ -0,0 +1,47 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent / 'scripts'))
+from batch_transcribe import Checkpoint, iter_recordings, load_checkpoint
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    """A previous run: a retried failure, a failure and a torn last line"""
+    path = tmp_path / 'state' / 'checkpoint.jsonl'
+    log = Checkpoint(path)
+    log.write([
+        {'path': 'a.wav', 'status': 'ok', 'text': "hello"},
+        {'path': 'b.wav', 'status': 'failed', 'error': "bad header"},
+        {'path': 'c.wav', 'status': 'failed', 'error': "timeout"},
+    ])
+    log.write([{'path': 'c.wav', 'status': 'ok', 'text': "later"}])
+    log.close()
+    with open(path, 'a') as f:
+        f.write(json.dumps({'path': 'd.wav', 'status': 'ok'})[:10])
+    return path
+
+
+def test_load_checkpoint(checkpoint):
+    assert load_checkpoint(checkpoint, retry_failed=False) == {'a.wav', 'b.wav', 'c.wav'}
+    assert load_checkpoint(checkpoint, retry_failed=True) == {'a.wav', 'c.wav'}
+
+
+def test_load_missing_checkpoint(tmp_path):
+    assert load_checkpoint(tmp_path / 'none.jsonl', retry_failed=False) == set()
+
+
+def test_iter_recordings(tmp_path):
+    for name in ('2024/02/b.wav', '2024/02/a.flac', '2024/01/z.opus', '2024/01/notes.txt', 'top.wav'):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).touch()
+    done = {str(tmp_path / '2024/02/b.wav')}
+
+    recordings = iter_recordings(tmp_path, done)
+
+    assert iter(recordings) is recordings
+    assert list(recordings) == [str(tmp_path / name) for name in ('top.wav', '2024/01/z.opus', '2024/02/a.flac')]
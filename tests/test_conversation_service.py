@@ -0,0 +1,134 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.conversation_service import build_conversation_history
+from services.token_counter import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+
+TURNS = 10
+
+
+def turn(i: int) -> dict:
+    conv = {
+        'id': f"00000000-0000-0000-0000-{i:012d}",
+        'timestamp': datetime(2024, 1, 1) + timedelta(minutes=i),
+        'user_input': f"question {i}",
+        'ai_response': f"answer {i}",
+    }
+    conv['tokens'] = estimate_tokens(conv['user_input']) + estimate_tokens(conv['ai_response']) + 2 * MESSAGE_OVERHEAD_TOKENS
+    return conv
+
+
+class HistoryDatabase:
+    """DatabaseService stand-in whose full-text search returns the given turns, best first"""
+
+    def __init__(self, matches):
+        self.conversations = [turn(i) for i in range(TURNS)]
+        self.matches = matches
+        self.budget = None
+
+    def search_conversations(self, user_id, query, limit=10, match_any=False):
+        assert match_any
+        return [dict(turn(i), rank=1.0) for i in self.matches[:limit]]
+
+    def get_conversations_within_budget(self, user_id, token_budget, max_turns=1000):
+        self.budget = token_budget
+        selected, total = [], 0
+        for conv in reversed(self.conversations[-max_turns:]):
+            total += conv['tokens']
+            if total > token_budget:
+                break
+            selected.append(dict(conv))
+        return selected[::-1]
+
+    def get_user_conversations(self, user_id, limit=10, include_media=False, oldest_first=False):
+        return [dict(conv) for conv in self.conversations[-limit:]]
+
+    def get_conversations_by_ids(self, conversation_ids):
+        return [dict(conv) for conv in self.conversations if conv['id'] in conversation_ids]
+
+
+class Retrieval:
+    def __init__(self, relevant):
+        self.relevant = relevant
+
+    def retrieve(self, user_id, query, top_k=None, exclude=()):
+        return [turn(i)['id'] for i in self.relevant if turn(i)['id'] not in exclude]
+
+
+def turns_in(messages) -> list:
+    """Turn numbers of the past user messages, in context order"""
+    return [int(message['content'].split()[1]) for message in messages[1:-1] if message['role'] == 'user']
+
+
+def test_budget_history_adds_matches_once(monkeypatch):
+    # Room for the three newest turns next to the matches
+    per_turn = turn(0)['tokens']
+    prompt = build_conversation_history(HistoryDatabase([]), 1234, "now")[0]['content']
+    budget = estimate_tokens(prompt) + estimate_tokens("now") + 2 * MESSAGE_OVERHEAD_TOKENS + 6 * per_turn
+    monkeypatch.setattr(config, 'HISTORY_TOKEN_BUDGET', budget)
+    monkeypatch.setattr(config, 'HISTORY_SEARCH_RESULTS', 3)
+    db = HistoryDatabase(matches=[8, 4, 1])
+
+    messages = build_conversation_history(db, 1234, "now")
+
+    # Matches cost budget whether or not they were recent: 6 turns - 3 matches
+    assert db.budget == 3 * per_turn
+    # Older matches first, oldest first; the match already among the recent turns is not repeated
+    assert turns_in(messages) == [1, 4, 7, 8, 9]
+    assert messages[-1] == {'role': 'user', 'content': "now"}
+
+
+def test_retrieval_history_adds_matches_once(monkeypatch):
+    monkeypatch.setattr(config, 'RETRIEVAL_RECENT_TURNS', 2)
+    monkeypatch.setattr(config, 'HISTORY_SEARCH_RESULTS', 3)
+    db = HistoryDatabase(matches=[9, 3, 0])
+
+    messages = build_conversation_history(db, 1234, "now", retrieval=Retrieval([5, 3]))
+
+    # Matches, then relevant turns, then recent turns; turn 3 (relevant and matched) and 9 appear once
+    assert turns_in(messages) == [0, 3, 5, 8, 9]
+
+
+@pytest.mark.parametrize('results', [0, 2])
+def test_search_results_setting(monkeypatch, results):
+    monkeypatch.setattr(config, 'HISTORY_TOKEN_BUDGET', 0)
+    monkeypatch.setattr(config, 'HISTORY_SEARCH_RESULTS', results)
+    db = HistoryDatabase(matches=[2, 5, 7])
+    db.conversations = [turn(i) for i in range(6, TURNS)]
+
+    # Unbudgeted history holds the newest turns only here, so matches from before them are added
+    assert turns_in(build_conversation_history(db, 1234, "now")) == [2, 5][:results] + [6, 7, 8, 9]
+
+
+@pytest.mark.parametrize('budget, recent', [(125, 0), (170, 4), (1000, 8)])
+def test_budget_history_fits(monkeypatch, budget, recent):
+    """Prompt, matches, recent turns and input together stay within HISTORY_TOKEN_BUDGET"""
+    monkeypatch.setattr(config, 'HISTORY_TOKEN_BUDGET', budget)
+    monkeypatch.setattr(config, 'HISTORY_SEARCH_RESULTS', 2)
+    db = HistoryDatabase(matches=[0, 1])
+    db.conversations = [turn(i) for i in range(2, TURNS)]
+
+    messages = build_conversation_history(db, 1234, "What did we talk about?")
+
+    assert turns_in(messages) == [0, 1] + list(range(TURNS - recent, TURNS))
+    assert sum(estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in messages) <= budget
+
+
+def test_retrieval_history_fits_budget(monkeypatch):
+    """Recent turns come first, then relevant ones in order of relevance, until the budget is used"""
+    per_turn = turn(0)['tokens']
+    monkeypatch.setattr(config, 'HISTORY_SEARCH_RESULTS', 0)
+    monkeypatch.setattr(config, 'RETRIEVAL_RECENT_TURNS', 2)
+    prompt = build_conversation_history(HistoryDatabase([]), 1234, "now")[0]['content']
+    budget = estimate_tokens(prompt) + estimate_tokens("now") + 2 * MESSAGE_OVERHEAD_TOKENS + 3 * per_turn
+    monkeypatch.setattr(config, 'HISTORY_TOKEN_BUDGET', budget)
+
+    messages = build_conversation_history(HistoryDatabase([]), 1234, "now", retrieval=Retrieval([5, 3, 1]))
+
+    assert turns_in(messages) == [5, 8, 9]
+    assert sum(estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in messages) <= budget
@@ -0,0 +1,121 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.enrolled_index_service import EmbeddingMatrix, EnrolledIndexService
+
+DIM = 4
+
+
+def unit(*values) -> np.ndarray:
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def matrix(users: dict) -> EmbeddingMatrix:
+    index = EmbeddingMatrix()
+    for user_id, vector in users.items():
+        index.upsert(user_id, vector)
+    return index
+
+
+USERS = {1111: unit(1, 0, 0, 0), 2222: unit(0, 1, 0, 0), 3333: unit(1, 1, 0, 0), 4444: unit(0, 0, 0, 1)}
+
+
+def test_upsert_and_update():
+    index = matrix(USERS)
+    assert len(index) == 4 and index.dim == DIM
+    index.upsert(2222, unit(0, 0, 1, 0))
+    assert len(index) == 4
+    assert np.array_equal(index.get(2222), unit(0, 0, 1, 0))
+    assert index.get(9999) is None
+
+
+def test_upsert_skips_other_dimensions():
+    index = matrix(USERS)
+    index.upsert(5555, np.ones(8, dtype=np.float32))
+    assert len(index) == 4 and index.get(5555) is None
+
+
+def test_remove_moves_last_row():
+    index = matrix(USERS)
+    index.remove(1111)
+    index.remove(9999)
+    assert len(index) == 3 and index.get(1111) is None
+    for user_id in (2222, 3333, 4444):
+        assert np.array_equal(index.get(user_id), USERS[user_id])
+
+
+def test_upsert_after_removing_everyone():
+    index = matrix(USERS)
+    for user_id in USERS:
+        index.remove(user_id)
+    assert len(index) == 0 and index.search(unit(1, 0, 0, 0), 2) == []
+
+    # The next enrollment may have a different size
+    index.upsert(5555, unit(1, 2, 3))
+    assert index.dim == 3 and index.search(unit(1, 2, 3), 2) == [(5555, pytest.approx(1.0))]
+
+
+@pytest.mark.parametrize('k', [1, 2, 4, 10])
+def test_search_top_k(k):
+    index = matrix(USERS)
+    query = unit(1, 0.2, 0, 0)
+    expected = sorted(USERS, key=lambda user_id: -float(USERS[user_id] @ query))[:k]
+
+    results = index.search(query, k)
+
+    assert [user_id for user_id, _ in results] == expected
+    assert [score for _, score in results] == pytest.approx([float(USERS[user_id] @ query) for user_id in expected])
+    assert index.search(unit(1, 0, 0), k) == []
+
+
+def test_best_matches():
+    index = matrix(USERS)
+    queries = np.stack([unit(0, 0.1, 0, 1), unit(1, 0.9, 0, 0)])
+    assert [user_id for user_id, _ in index.best_matches(queries)] == [4444, 3333]
+    assert EmbeddingMatrix().best_matches(queries) == [(None, 0.0), (None, 0.0)]
+
+
+@pytest.fixture
+def saved_index(tmp_path):
+    index = EnrolledIndexService('voice_embedding', snapshot=True)
+    index.snapshot_dir = tmp_path
+    index.matrix = matrix(USERS)
+    index.version = 7
+    index.save_snapshot()
+    return index
+
+
+def test_snapshot_matching_version_loads(saved_index):
+    loaded = EnrolledIndexService('voice_embedding', snapshot=True)
+    loaded.snapshot_dir = saved_index.snapshot_dir
+
+    assert loaded._load_snapshot(7)
+    assert loaded.version == 7 and len(loaded) == 4
+    assert not loaded.matrix.vectors.flags.writeable
+    for user_id, vector in USERS.items():
+        assert np.array_equal(loaded.get(user_id), vector)
+
+    # The memory map is copied on the first write
+    loaded.upsert(5555, unit(1, 1, 1, 1))
+    loaded.matrix.remove(1111)
+    assert len(loaded) == 4 and loaded.search(unit(1, 1, 1, 1), 1)[0][0] == 5555
+
+
+def test_snapshot_other_version_is_ignored(saved_index):
+    loaded = EnrolledIndexService('voice_embedding', snapshot=True)
+    loaded.snapshot_dir = saved_index.snapshot_dir
+    assert not loaded._load_snapshot(8)
+    assert len(loaded) == 0 and loaded.version == 0
+
+
+def test_snapshot_without_metadata_is_ignored(saved_index):
+    _, _, meta_path = saved_index._snapshot_paths()
+    meta_path.unlink()
+    loaded = EnrolledIndexService('voice_embedding', snapshot=True)
+    loaded.snapshot_dir = saved_index.snapshot_dir
+    assert not loaded._load_snapshot(7)
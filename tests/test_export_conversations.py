@@ -0,0 +1,157 @@
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent / 'scripts'))
+from export_conversations import EXPORT_COLUMNS, _copy_field, _read_rows, export_conversations
+
+EMBEDDING = bytes(range(0, 256, 7))
+
+# As row_to_json renders a stored row (bytea as "\x<hex>", jsonb as an object)
+ROWS = [
+    {
+        'id': '00000000-0000-0000-0000-000000000001', 'user_id': 1234, 'timestamp': '2024-03-01T10:15:30.123456',
+        'location': None, 'trigger_type': 'manual',
+        'user_input': "C:\\Users\\me\tcolumns\nnext line\r\nliteral \\N and \\x41 and \\\\ 😀",
+        'ai_response': 'Say "\\n" for a newline.\x0b\x08\x0c',
+        'audio_path': None, 'video_file_path': None,
+        'metadata': {'note': "tab\there\nand there", 'path': 'a\\b', 'nested': [1, None, "\\N"]},
+        'embedding': '\\x' + EMBEDDING.hex(), 'user_input_tokens': 17, 'ai_response_tokens': None,
+    },
+    {
+        'id': '00000000-0000-0000-0000-000000000002', 'user_id': 5678, 'timestamp': '2024-03-02T08:00:00',
+        'location': 'kitchen', 'trigger_type': 'wake_word', 'user_input': '', 'ai_response': '\\',
+        'audio_path': '/archive/2024/03/02/a.flac', 'video_file_path': None, 'metadata': None,
+        'embedding': None, 'user_input_tokens': None, 'ai_response_tokens': None,
+    },
+]
+
+_COPY_ESCAPES = {'\\': '\\\\', '\b': '\\b', '\f': '\\f', '\n': '\\n', '\r': '\\r', '\t': '\\t', '\v': '\\v'}
+_COPY_UNESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+
+
+def copy_out(value: str) -> str:
+    """One field as PostgreSQL's COPY TO writes text format"""
+    return ''.join(_COPY_ESCAPES.get(char, char) for char in value)
+
+
+def copy_in(line: str) -> list:
+    """The fields of one line as PostgreSQL's COPY FROM reads text format"""
+    # PostgreSQL rejects these: "literal carriage return/newline found in data"
+    assert '\r' not in line and '\n' not in line
+    fields = []
+    for raw in line.split('\t'):
+        if raw == '\\N':
+            fields.append(None)
+            continue
+        value, i = [], 0
+        while i < len(raw):
+            char = raw[i]
+            if char != '\\':
+                value.append(char)
+                i += 1
+                continue
+            escaped = raw[i + 1]
+            if escaped in '01234567':
+                digits = len(raw[i + 1:i + 4]) - len(raw[i + 1:i + 4].lstrip('01234567'))
+                value.append(chr(int(raw[i + 1:i + 1 + digits], 8)))
+                i += 1 + digits
+            elif escaped == 'x' and i + 2 < len(raw) and raw[i + 2] in '0123456789abcdefABCDEF':
+                digits = 2 if i + 3 < len(raw) and raw[i + 3] in '0123456789abcdefABCDEF' else 1
+                value.append(chr(int(raw[i + 2:i + 2 + digits], 16)))
+                i += 2 + digits
+            else:
+                value.append(_COPY_UNESCAPES.get(escaped, escaped))
+                i += 2
+        fields.append(''.join(value))
+    return fields
+
+
+def stored(column: str, text):
+    """A COPY FROM text field converted to the column's type, as PostgreSQL would"""
+    if text is None:
+        return None
+    if column == 'embedding':
+        assert text.startswith('\\x')
+        return bytes.fromhex(text[2:])
+    if column == 'metadata':
+        return json.loads(text)
+    if column in ('user_id', 'user_input_tokens', 'ai_response_tokens'):
+        return int(text)
+    if column == 'timestamp':
+        return datetime.fromisoformat(text)
+    return text
+
+
+def expected(row: dict, column: str):
+    value = row[column]
+    if column == 'embedding' and value is not None:
+        return bytes.fromhex(value[2:])
+    if column == 'timestamp':
+        return datetime.fromisoformat(value)
+    return value
+
+
+class CopyDatabase:
+    """DatabaseService stand-in whose COPY ... TO STDOUT writes the given rows, then optionally fails"""
+
+    def __init__(self, rows, fail_after: bool = False):
+        self.conn = self
+        self.rows = rows
+        self.fail_after = fail_after
+
+    def cursor(self):
+        return self
+
+    def copy_expert(self, sql, sink):
+        for row in self.rows:
+            sink.write(copy_out(json.dumps(row, ensure_ascii=False)).encode() + b'\n')
+        if self.fail_after:
+            raise RuntimeError("connection lost")
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize('name', ['export.jsonl', 'export.jsonl.gz'])
+def test_jsonl_round_trip(tmp_path, name):
+    """export → file → import staging lines decode to the stored values"""
+    path = tmp_path / name
+    assert export_conversations(CopyDatabase(ROWS), path, 'TRUE') == len(ROWS)
+
+    read = list(_read_rows(path))
+    assert read == ROWS
+    for row, original in zip(read, ROWS):
+        line = '\t'.join(_copy_field(row.get(column)) for column in EXPORT_COLUMNS)
+        fields = copy_in(line)
+        assert len(fields) == len(EXPORT_COLUMNS)
+        for column, text in zip(EXPORT_COLUMNS, fields):
+            assert stored(column, text) == expected(original, column), column
+
+
+def test_copy_field_parquet_values():
+    """Parquet rows carry bytes, datetimes and JSON text instead of JSON values"""
+    when = datetime(2024, 3, 1, 10, 15, 30, 123456)
+    metadata = json.dumps(ROWS[0]['metadata'])
+    fields = copy_in('\t'.join(_copy_field(value) for value in (EMBEDDING, when, metadata, b'', None)))
+
+    assert stored('embedding', fields[0]) == EMBEDDING
+    assert stored('timestamp', fields[1]) == when
+    assert stored('metadata', fields[2]) == ROWS[0]['metadata']
+    assert stored('embedding', fields[3]) == b''
+    assert fields[4] is None
+
+
+def test_failed_export_leaves_no_file(tmp_path):
+    path = tmp_path / 'export.jsonl.gz'
+    path.write_bytes(b'previous export')
+
+    with pytest.raises(RuntimeError):
+        export_conversations(CopyDatabase(ROWS, fail_after=True), path, 'TRUE')
+
+    assert path.read_bytes() == b'previous export'
+    assert list(tmp_path.iterdir()) == [path]
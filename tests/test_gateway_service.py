@@ -0,0 +1,250 @@
+import argparse
+import asyncio
+import json
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# The gateway's audio path builds on AudioService (PyAudio) and Whisper
+pytest.importorskip('pyaudio')
+pytest.importorskip('whisper')
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent / 'scripts'))
+from config.config import config
+from services.audio_io import write_wav
+from services.gateway_service import AudioGateway, ClientDisconnected, GatewayAudio, GatewayTTS
+from gateway_client import load_utterances, run_client, send_utterance
+
+RATE = 16000
+# Each reply is this much 16 kHz speech: three playback windows' worth
+REPLY_BYTES = 3 * RATE * 2 * config.GATEWAY_PLAYBACK_WINDOW_MS // 1000
+CLIENT_TIMEOUT = 20
+
+
+class StubTranscriber:
+    """Stands in for TranscriptionService: every utterance is 'hello'"""
+
+    def __init__(self):
+        self.seconds = []
+
+    def transcribe(self, audio, profile=None):
+        self.seconds.append(len(audio) / RATE)
+        return "hello"
+
+
+class StubSynthesizer:
+    """Stands in for TTSService.stream: one sentence of silence per reply"""
+
+    def stream(self, text):
+        yield text, bytes(REPLY_BYTES), RATE
+
+
+def conversation(turns: int, greet: bool = True, transcriber: StubTranscriber = None):
+    """Gateway session: an optional greeting, then answer `turns` utterances"""
+    def session(connection):
+        audio = GatewayAudio(connection, transcriber or StubTranscriber())
+        tts = GatewayTTS(connection, StubSynthesizer())
+        if greet:
+            tts.speak("How can I help you?")
+        for _ in range(turns):
+            result = audio.record_and_transcribe(profile='conversation')
+            tts.speak(f"You said {result['text']}")
+    return session
+
+
+def tone(seconds: float, rate: int = RATE) -> bytes:
+    t = np.arange(int(rate * seconds)) / rate
+    return (0.3 * np.sin(2 * np.pi * 220 * t) * 32767).astype('<i2').tobytes()
+
+
+def hello(**fields) -> str:
+    return json.dumps({'type': 'hello', 'sample_rate': RATE, 'channels': 1, 'codec': 'pcm',
+                       'endpointing': 'client', **fields})
+
+
+def talk(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, CLIENT_TIMEOUT))
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def start_gateway(monkeypatch, tmp_path):
+    """Start an AudioGateway on an ephemeral port; returns (gateway, url)"""
+    monkeypatch.setattr(config, 'AUDIO_PATH', tmp_path / 'audio')
+    running = []
+
+    def start(session, max_sessions: int = 2):
+        sock = socket.create_server(('127.0.0.1', 0))
+        gateway = AudioGateway(session, max_sessions=max_sessions)
+        thread = threading.Thread(target=gateway.run, args=(sock,), daemon=True)
+        thread.start()
+        wait_until(lambda: gateway._stopped is not None)
+        running.append((gateway, thread, sock))
+        return gateway, f"ws://127.0.0.1:{sock.getsockname()[1]}"
+
+    yield start
+    for gateway, thread, sock in running:
+        gateway.stop()
+        thread.join(timeout=5)
+        sock.close()
+
+
+@pytest.mark.parametrize('first', [
+    b'\x00\x00',
+    json.dumps({'type': 'ack', 'bytes': 10}),
+    'hello',
+    hello(sample_rate=4000),
+    hello(codec='mp3'),
+    hello(endpointing='push-to-talk'),
+], ids=['binary', 'not-hello', 'not-json', 'sample-rate', 'codec', 'endpointing'])
+def test_hello_validation(start_gateway, first):
+    def session(connection):
+        pytest.fail("session started without a valid hello")
+
+    gateway, url = start_gateway(session)
+
+    async def client():
+        async with connect(url) as websocket:
+            await websocket.send(first)
+            event = json.loads(await websocket.recv())
+            with pytest.raises(ConnectionClosed) as closed:
+                await websocket.recv()
+            return event, closed.value.rcvd.code
+
+    event, code = talk(client())
+    assert event['type'] == 'error' and event['message']
+    assert code == 1002
+    wait_until(lambda: gateway.active == 0)
+
+
+def test_session_message_order(start_gateway):
+    gateway, url = start_gateway(conversation(turns=2))
+
+    async def client():
+        received = []
+        async with connect(url) as websocket:
+            await websocket.send(hello())
+            async for message in websocket:
+                if isinstance(message, bytes):
+                    if received[-1] != 'audio':
+                        received.append('audio')
+                    await websocket.send(json.dumps({'type': 'ack', 'bytes': len(message)}))
+                    continue
+                event = json.loads(message)
+                received.append(event['type'])
+                if event['type'] == 'listening':
+                    await send_utterance(websocket, tone(1.0), RATE, False, 'client')
+        return received
+
+    reply = ['speech', 'audio', 'speech_end']
+    turn = ['listening', 'transcript', *reply]
+    assert talk(client()) == ['ready', *reply, *turn, *turn, 'end']
+    wait_until(lambda: gateway.active == 0)
+
+
+def test_playback_window(start_gateway):
+    """No more than GATEWAY_PLAYBACK_WINDOW_MS of speech is sent ahead of the client's acks"""
+    _, url = start_gateway(conversation(turns=0))
+    window = RATE * 2 * config.GATEWAY_PLAYBACK_WINDOW_MS // 1000
+
+    async def receive_audio(websocket) -> int:
+        """Bytes of speech received until the server stops sending"""
+        received = 0
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.recv(), 0.5)
+            except asyncio.TimeoutError:
+                return received
+            if isinstance(message, bytes):
+                received += len(message)
+            elif json.loads(message)['type'] == 'speech_end':
+                return received
+
+    async def client():
+        async with connect(url) as websocket:
+            await websocket.send(hello())
+            assert json.loads(await websocket.recv())['type'] == 'ready'
+            assert json.loads(await websocket.recv())['type'] == 'speech'
+
+            stalls = []
+            total = 0
+            while total < REPLY_BYTES:
+                received = await receive_audio(websocket)
+                stalls.append(received)
+                total += received
+                # Malformed messages are dropped without closing the connection
+                for junk in ("not json", "[1]", json.dumps({'type': 'ack', 'bytes': 'lots'})):
+                    await websocket.send(junk)
+                await websocket.send(json.dumps({'type': 'ack', 'bytes': received}))
+            return stalls, total
+
+    stalls, total = talk(client())
+    assert total == REPLY_BYTES
+    assert len(stalls) >= REPLY_BYTES // window
+    assert all(0 < received <= window for received in stalls)
+
+
+def test_disconnect_mid_session(start_gateway):
+    outcome = []
+    talk_to = conversation(turns=1, greet=False)
+
+    def session(connection):
+        try:
+            talk_to(connection)
+        except ClientDisconnected:
+            outcome.append('disconnected')
+            raise
+        outcome.append('finished')
+
+    gateway, url = start_gateway(session)
+
+    async def client():
+        async with connect(url) as websocket:
+            await websocket.send(hello())
+            assert json.loads(await websocket.recv())['type'] == 'ready'
+            assert json.loads(await websocket.recv())['type'] == 'listening'
+            # Half an utterance, then gone
+            await websocket.send(tone(0.5))
+
+    talk(client())
+    wait_until(lambda: outcome and gateway.active == 0)
+    assert outcome == ['disconnected']
+
+
+@pytest.mark.parametrize('endpointing', ['client', 'server'])
+def test_wav_client(start_gateway, tmp_path, endpointing):
+    transcriber = StubTranscriber()
+    _, url = start_gateway(conversation(turns=2, transcriber=transcriber))
+    paths = [tmp_path / 'one.wav', tmp_path / 'two.wav']
+    write_wav(paths[0], [tone(1.0, 48000)], 1, 2, 48000)
+    write_wav(paths[1], [tone(0.6, 48000)], 1, 2, 48000)
+    utterances, rate = load_utterances(paths)
+    args = argparse.Namespace(url=url, turns=0, endpointing=endpointing, realtime=False, output=tmp_path / 'replies')
+
+    result = talk(run_client(0, args, utterances, rate))
+
+    assert result['error'] is None
+    assert result['transcripts'] == ['hello', 'hello']
+    assert len(result['latencies']) == 2
+    # Utterances reach Whisper whole at 16 kHz; the server's VAD adds pre-roll and trailing silence
+    if endpointing == 'client':
+        assert transcriber.seconds == pytest.approx([1.0, 0.6], abs=0.05)
+    else:
+        assert len(transcriber.seconds) == 2
+        assert transcriber.seconds[0] >= 1.0 and transcriber.seconds[1] >= 0.6
+    assert len(list((tmp_path / 'replies').glob('*.wav'))) == 3
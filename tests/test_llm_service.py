@@ -0,0 +1,95 @@
+import sys
+from pathlib import Path
+
+import ollama
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.llm_service import LLMService, LONG_HISTORY_MESSAGES, ROUTE_FALLBACK, ROUTE_LARGE, ROUTE_SMALL
+
+LONG_HISTORY = [{'role': 'user', 'content': "hi"}] * (LONG_HISTORY_MESSAGES + 1)
+
+
+@pytest.fixture
+def llm():
+    return LLMService(model_name='large', small_model_name='small')
+
+
+@pytest.mark.parametrize('text, route', [
+    ("What's the plan for today?", ROUTE_LARGE),
+    ("Which planet is closest?", ROUTE_SMALL),
+    ("Why not", ROUTE_LARGE),
+    ("Who are you", ROUTE_SMALL),
+    ("Write a haiku", ROUTE_LARGE),
+    ("That was well written", ROUTE_SMALL),
+    ("Show me the   step by step version", ROUTE_LARGE),
+    ("What's the zip code", ROUTE_LARGE),
+    ("Is it encoded", ROUTE_SMALL),
+], ids=['plan', 'planet', 'why', 'who', 'write', 'written', 'phrase', 'code', 'encoded'])
+def test_complex_keywords_match_whole_words(llm, text, route):
+    assert llm.classify_request(text) == route
+
+
+@pytest.mark.parametrize('text, route', [
+    ("Do you remember my dog?", ROUTE_LARGE),
+    ("What did we say before lunch", ROUTE_LARGE),
+    ("Is it beforehand", ROUTE_SMALL),
+    ("Tell me about the earliest flight", ROUTE_SMALL),
+], ids=['remember', 'before', 'beforehand', 'earliest'])
+def test_history_keywords_need_long_history(llm, text, route):
+    assert llm.classify_request(text, LONG_HISTORY) == route
+    assert llm.classify_request(text) == ROUTE_SMALL
+
+
+class FakeClient:
+    """ollama.Client stand-in serving only the given models"""
+
+    def __init__(self, models, error=ollama.ResponseError("model not found", 404)):
+        self.models = set(models)
+        self.error = error
+        self.calls = []
+
+    def _serve(self, model):
+        self.calls.append(model)
+        if model not in self.models:
+            raise self.error
+
+    def chat(self, model, messages, options=None):
+        self._serve(model)
+        return {'message': {'content': f"{model} reply"}}
+
+    def generate(self, model, prompt):
+        self._serve(model)
+        return {'response': ''}
+
+
+def test_missing_small_model_found_by_probe(llm):
+    llm.client = FakeClient({'large'})
+
+    assert llm.test_connection()
+    assert llm.small_model_name is None
+    assert llm.generate_response("hi") == "large reply"
+    assert llm.client.calls == ['large', 'small', 'large']
+    assert llm.get_route_stats()[ROUTE_LARGE]['count'] == 1
+
+
+def test_missing_small_model_found_by_a_turn(llm):
+    llm.client = FakeClient({'large'})
+
+    assert llm.generate_response("hi") == "large reply"
+    assert llm.generate_response("hello") == "large reply"
+
+    # Tried once, then no longer routed to
+    assert llm.client.calls == ['small', 'large', 'large']
+    stats = llm.get_route_stats()
+    assert stats[ROUTE_FALLBACK]['count'] == 1 and stats[ROUTE_LARGE]['count'] == 1
+    assert stats[ROUTE_SMALL]['count'] == 0
+
+
+def test_small_model_error_falls_back_without_disabling(llm):
+    llm.client = FakeClient({'large'}, error=ollama.ResponseError("server busy", 503))
+
+    assert llm.generate_response("hi") == "large reply"
+
+    assert llm.small_model_name == 'small'
+    assert llm.get_route_stats()[ROUTE_FALLBACK]['count'] == 1
@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def test_forked_child_logs():
+    """A forked worker's records reach the sinks, though the listener thread stayed in the parent"""
+    script = textwrap.dedent("""
+        import os
+        from services.logging_service import get_logger, shutdown_logging
+
+        logger = get_logger('test')
+        logger.warning("parent before fork")
+        pid = os.fork()
+        if pid == 0:
+            logger.warning("child %d", os.getpid())
+            shutdown_logging()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        logger.warning("parent after fork")
+        print(pid)
+    """)
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, timeout=30,
+                            env={**os.environ, 'LOG_FORMAT': 'text', 'LOG_FILE': ''})
+
+    assert result.returncode == 0, result.stderr
+    child = result.stdout.strip()
+    assert f"child {child}" in result.stderr
+    assert result.stderr.count("parent before fork") == 1
+    assert "parent after fork" in result.stderr
+
+
+def test_explicit_setup_replaces_import_time_defaults(tmp_path):
+    """setup_logging() after get_logger() applies its arguments, without duplicating records"""
+    log_file = tmp_path / 'service.log'
+    script = textwrap.dedent(f"""
+        import json
+        from services.logging_service import get_logger, setup_logging
+
+        logger = get_logger('test')
+        logger.debug("hidden at the default level")
+        logger.warning("before setup")
+        setup_logging(level='DEBUG', log_format='json', log_file={str(log_file)!r})
+        logger.debug("after setup")
+        setup_logging(level='DEBUG', log_format='json', log_file={str(log_file)!r})
+        get_logger('other').info("after second setup")
+    """)
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, timeout=30,
+                            env={**os.environ, 'LOG_LEVEL': 'INFO', 'LOG_FORMAT': 'text', 'LOG_FILE': ''})
+
+    assert result.returncode == 0, result.stderr
+    lines = result.stderr.splitlines()
+    assert "hidden" not in result.stderr
+    assert [line for line in lines if "before setup" in line][0].split()[2] == 'WARNING'
+    events = [json.loads(line) for line in lines if line.startswith('{')]
+    assert [(event['level'], event['message']) for event in events] == [
+        ('DEBUG', "after setup"), ('INFO', "after second setup")
+    ]
+    written = [json.loads(line)['message'] for line in log_file.read_text().splitlines()]
+    assert written == ["after setup", "after second setup"]
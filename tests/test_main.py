@@ -0,0 +1,147 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# main.py pulls in the microphone, Whisper and speech output services
+pytest.importorskip('pyaudio')
+pytest.importorskip('pyttsx3')
+pytest.importorskip('whisper')
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from main import authenticate_user, conversation_session
+from services.token_counter import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
+from services.speaker_service import SpeakerService
+from services.enrolled_index_service import EmbeddingMatrix
+
+
+class ScriptedAudio:
+    """Returns recorded results in order, like AudioService.record_and_transcribe"""
+
+    def __init__(self, results):
+        self.results = list(results)
+
+    def record_and_transcribe(self, duration=5, profile=None, on_wait=None):
+        return self.results.pop(0)
+
+
+class SilentTTS:
+    def __init__(self):
+        self.spoken = []
+
+    def speak(self, text):
+        self.spoken.append(text)
+
+
+class Auth:
+    def __init__(self, users=()):
+        self.users = set(users)
+
+    def user_exists(self, user_id):
+        return user_id in self.users
+
+    def verify_user(self, user_id, password):
+        return password == 'open sesame'
+
+
+def no_prompt(message):
+    pass
+
+
+def test_authenticate_silence_with_voice_login():
+    """Endpointed silence has no recording: voice login must not try to embed it"""
+    silence = {'audio_path': None, 'text': ''}
+    tts = SilentTTS()
+
+    user_id = authenticate_user(ScriptedAudio([silence] * 3), None, Auth(), tts, SpeakerService(),
+                                EmbeddingMatrix(), prompt=no_prompt)
+
+    assert user_id is None
+    assert tts.spoken[-1] == "Authentication failed. Goodbye."
+
+
+def test_authenticate_after_silence():
+    silence = {'audio_path': None, 'text': ''}
+    results = [silence, {'audio_path': None, 'text': 'one two three four'}, silence,
+               {'audio_path': None, 'text': 'open sesame'}]
+
+    user_id = authenticate_user(ScriptedAudio(results), None, Auth(users={1234}), SilentTTS(), SpeakerService(),
+                                EmbeddingMatrix(), prompt=no_prompt)
+
+    assert user_id == 1234
+
+
+class ConversationDatabase:
+    """Stored turns of one user, each with a long reply"""
+
+    def __init__(self, turns: int):
+        self.conversations = [
+            {'id': str(i), 'user_input': f"question {i}", 'ai_response': "word " * 200}
+            for i in range(turns)
+        ]
+        self.saved = []
+
+    def search_conversations(self, user_id, query, limit=10, match_any=False):
+        return []
+
+    def get_user_conversations(self, user_id, limit=10, include_media=False, oldest_first=False):
+        return [dict(conv) for conv in self.conversations[-limit:]]
+
+    def get_conversations_within_budget(self, user_id, token_budget, max_turns=1000):
+        selected, total = [], 0
+        for conv in reversed(self.conversations[-max_turns:]):
+            total += estimate_tokens(conv['user_input']) + estimate_tokens(conv['ai_response']) + 2 * MESSAGE_OVERHEAD_TOKENS
+            if total > token_budget:
+                break
+            selected.append(dict(conv))
+        return selected[::-1]
+
+    def get_conversations_by_ids(self, conversation_ids):
+        return [dict(conv) for conv in self.conversations if conv['id'] in conversation_ids]
+
+    def create_conversation(self, **fields):
+        self.saved.append(fields)
+        return str(len(self.saved))
+
+
+class Retrieval:
+    """Every older turn is relevant"""
+
+    def __init__(self, db):
+        self.db = db
+        self.embedder = self
+        self.model_name = 'fake-embedder'
+
+    def retrieve(self, user_id, query, top_k=None, exclude=()):
+        return [conv['id'] for conv in self.db.conversations if conv['id'] not in exclude]
+
+    def embed_turn(self, user_input, ai_response):
+        return None
+
+    def add_to_index(self, user_id, conv_id, embedding):
+        pass
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.histories = []
+
+    def generate_response(self, user_input, conversation_history, on_wait=None):
+        self.histories.append(conversation_history)
+        return "Sure."
+
+
+def test_session_history_fits_budget(monkeypatch):
+    """The history main sends with retrieval enabled stays within HISTORY_TOKEN_BUDGET"""
+    monkeypatch.setattr(config, 'HISTORY_TOKEN_BUDGET', 1536)
+    db = ConversationDatabase(turns=20)
+    llm = RecordingLLM()
+    turns = [{'audio_path': None, 'text': 'What did we talk about?'}, {'audio_path': None, 'text': 'goodbye'}]
+
+    conversation_session(1234, ScriptedAudio(turns), db, llm, SilentTTS(), Retrieval(db), prompt=no_prompt)
+
+    history = llm.histories[0]
+    assert len(history) > 2
+    assert sum(estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in history) <= 1536
+    assert len(db.saved) == 1
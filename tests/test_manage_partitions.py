@@ -0,0 +1,73 @@
+import re
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent / 'scripts'))
+import manage_partitions
+from config.config import config
+from manage_partitions import CONVERSATION_INDEXES, SCHEMA_PATH, add_months, retire_old_partitions
+from services.database_service import _history_since
+
+
+@pytest.mark.parametrize('month, months, expected', [
+    (date(2024, 3, 1), 0, date(2024, 3, 1)),
+    (date(2024, 11, 1), 2, date(2025, 1, 1)),
+    (date(2024, 12, 1), 1, date(2025, 1, 1)),
+    (date(2024, 1, 1), -1, date(2023, 12, 1)),
+    (date(2024, 3, 1), -24, date(2022, 3, 1)),
+    (date(2024, 3, 1), -27, date(2021, 12, 1)),
+])
+def test_add_months(month, months, expected):
+    assert add_months(month, months) == expected
+
+
+def test_history_since(monkeypatch):
+    monkeypatch.setattr(config, 'HISTORY_WINDOW_DAYS', 0)
+    assert _history_since() == datetime.min
+
+    monkeypatch.setattr(config, 'HISTORY_WINDOW_DAYS', 30)
+    assert abs(_history_since() - (datetime.now() - timedelta(days=30))) < timedelta(seconds=5)
+
+
+class PartitionDatabase:
+    """DatabaseService stand-in recording the statements run against it"""
+
+    def __init__(self):
+        self.conn = self
+        self.statements = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_retire_old_partitions(monkeypatch):
+    this_month = date.today().replace(day=1)
+    months = [add_months(this_month, offset) for offset in (-14, -13, -12, -11, 0)]
+    partitions = [(f"conversations_{month:%Y_%m}", month) for month in months]
+    monkeypatch.setattr(manage_partitions, 'list_partitions', lambda db: partitions)
+    db = PartitionDatabase()
+
+    retire_old_partitions(db, 12)
+
+    retired = [name for name, _ in partitions[:2]]
+    assert db.statements == [statement for name in retired for statement in (
+        f'ALTER TABLE conversations DETACH PARTITION "{name}"', f'DROP TABLE "{name}"')]
+
+
+def test_migrate_renames_every_conversation_index():
+    """An index left on the legacy table keeps its name, and CREATE INDEX IF NOT EXISTS then skips it"""
+    created = re.findall(r'CREATE (?:UNIQUE )?INDEX IF NOT EXISTS (\w+) ON conversations\b', SCHEMA_PATH.read_text())
+    assert created and set(created) <= set(CONVERSATION_INDEXES)
@@ -0,0 +1,38 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.resource_scheduler import ResourceScheduler
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'sched_setaffinity'), reason="needs sched_setaffinity")
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    core = min(os.sched_getaffinity(0))
+    for setting in ('WHISPER_CPU_CORES', 'OLLAMA_CPU_CORES', 'TTS_CPU_CORES'):
+        monkeypatch.setattr(config, setting, str(core))
+    return ResourceScheduler()
+
+
+def test_local_stages_are_pinned(scheduler):
+    before = os.sched_getaffinity(0)
+    with scheduler.stage('whisper'):
+        assert os.sched_getaffinity(0) == scheduler.cores['whisper']
+    assert os.sched_getaffinity(0) == before
+
+
+def test_llm_stage_only_counts_overlap(scheduler):
+    """The client thread only waits on Ollama: no pinning, no concurrency limit"""
+    before = os.sched_getaffinity(0)
+    with scheduler.stage('whisper'):
+        with scheduler.stage('llm'), scheduler.stage('llm'):
+            assert os.sched_getaffinity(0) == scheduler.cores['whisper']
+    assert os.sched_getaffinity(0) == before
+
+    stats = scheduler.contention()
+    assert stats['llm']['runs'] == 2 and stats['llm']['overlapped'] == 1.0
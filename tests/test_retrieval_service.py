@@ -0,0 +1,169 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.embedding_service import pack_embedding
+from services.retrieval_service import BruteForceIndex, IVFIndex, RetrievalService
+
+DIM = 32
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)).astype(np.float32)
+
+
+def clustered(n: int, clusters: int = 20, seed: int = 1) -> np.ndarray:
+    """Unit vectors scattered around a few directions, like embeddings of related turns"""
+    rng = np.random.default_rng(seed)
+    centers = normalized(rng.standard_normal((clusters, DIM)))
+    return normalized(centers[rng.integers(clusters, size=n)] + 0.1 * rng.standard_normal((n, DIM)))
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int):
+    return [str(i) for i in np.argsort(-(vectors @ query), kind='stable')[:k]]
+
+
+class EmbeddingDatabase:
+    """DatabaseService stand-in holding one user's (id, embedding, model) rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_conversation_embeddings(self, user_id):
+        return [(conv_id, pack_embedding(vector), model) for conv_id, vector, model in self.rows]
+
+
+class Embedder:
+    def __init__(self, model_name='new-model', vectors=None):
+        self.model_name = model_name
+        self.vectors = vectors or {}
+
+    def embed(self, text):
+        return self.vectors.get(text)
+
+
+def test_brute_force_matches_exact_search():
+    vectors = clustered(300)
+    index = BruteForceIndex(DIM, capacity=4)
+    index.build([str(i) for i in range(200)], vectors[:200])
+    for i in range(200, 300):
+        index.add(str(i), vectors[i])
+
+    for query in clustered(10, seed=2):
+        results = index.search(query, 10)
+        assert [conv_id for conv_id, _ in results] == exact_top_k(vectors, query, 10)
+        scores = [score for _, score in results]
+        assert scores == sorted(scores, reverse=True)
+        assert scores[0] == pytest.approx(float(np.max(vectors @ query)), abs=1e-5)
+
+
+def test_search_returns_everything_when_k_exceeds_size():
+    vectors = clustered(5)
+    index = BruteForceIndex(DIM)
+    index.build([str(i) for i in range(5)], vectors)
+
+    assert len(index.search(vectors[0], 50)) == 5
+    assert index.search(vectors[0], 0) == []
+    assert BruteForceIndex(DIM).search(vectors[0], 5) == []
+
+
+@pytest.mark.parametrize('n_probe, min_recall', [(1, 0.6), (4, 0.95), (64, 1.0)])
+def test_ivf_recall(n_probe, min_recall):
+    # Queries come from the same topics as the stored turns
+    data = clustered(2050)
+    vectors, queries = data[:2000], data[2000:]
+    index = IVFIndex(DIM, n_probe=n_probe)
+    index.build([str(i) for i in range(len(vectors))], vectors)
+
+    recall = np.mean([
+        len({conv_id for conv_id, _ in index.search(query, 10)} & set(exact_top_k(vectors, query, 10))) / 10
+        for query in queries
+    ])
+    assert recall >= min_recall
+
+
+def test_ivf_finds_vectors_added_after_build():
+    vectors = clustered(600)
+    index = IVFIndex(DIM, n_probe=4)
+    index.build([str(i) for i in range(500)], vectors[:500])
+    for i in range(500, 600):
+        index.add(str(i), vectors[i])
+
+    for i in range(500, 600):
+        assert index.search(vectors[i], 1)[0][0] == str(i)
+
+
+def test_ivf_add_to_empty_index():
+    vector = clustered(1)[0]
+    index = IVFIndex(DIM)
+    index.add('a', vector)
+    assert index.search(vector, 3) == [('a', pytest.approx(1.0))]
+
+
+def test_load_skips_other_models_and_dimensions():
+    current = clustered(3)
+    rows = [
+        ('a', current[0], 'new-model'),
+        ('b', normalized(np.ones(DIM * 2)), 'old-model'),
+        ('c', current[1], None),
+        ('d', normalized(np.ones(DIM * 2)), None),
+        ('e', current[2], 'old-model'),
+    ]
+    retrieval = RetrievalService(EmbeddingDatabase(rows), Embedder())
+
+    index = retrieval.get_index(1)
+    assert index.dim == DIM
+    assert sorted(index.ids) == ['a', 'c']
+
+
+def test_load_without_recorded_models_keeps_majority_dimension():
+    vectors = clustered(3)
+    rows = [('a', vectors[0], None), ('b', normalized(np.ones(DIM * 2)), None), ('c', vectors[1], None)]
+    index = RetrievalService(EmbeddingDatabase(rows), Embedder()).get_index(1)
+    assert sorted(index.ids) == ['a', 'c']
+
+
+def test_load_with_only_other_models_has_no_index():
+    rows = [('a', normalized(np.ones(DIM * 2)), 'old-model')]
+    assert RetrievalService(EmbeddingDatabase(rows), Embedder()).get_index(1) is None
+
+
+def test_add_with_new_dimension_rebuilds_index():
+    vectors = clustered(2)
+    retrieval = RetrievalService(EmbeddingDatabase([('a', vectors[0], 'new-model')]), Embedder())
+    retrieval.add_to_index(1, 'b', vectors[1])
+    assert sorted(retrieval.get_index(1).ids) == ['a', 'b']
+
+    wider = normalized(np.ones(DIM * 2))
+    retrieval.add_to_index(1, 'c', wider)
+    index = retrieval.get_index(1)
+    assert (index.dim, index.ids) == (DIM * 2, ['c'])
+
+
+def test_add_promotes_to_ivf_at_threshold():
+    vectors = clustered(20)
+    retrieval = RetrievalService(EmbeddingDatabase([]), Embedder())
+    retrieval.ann_threshold = 10
+    for i, vector in enumerate(vectors):
+        retrieval.add_to_index(1, str(i), vector)
+
+    index = retrieval.get_index(1)
+    assert isinstance(index, IVFIndex)
+    assert len(index) == 20
+    assert index.search(vectors[15], 1)[0][0] == '15'
+
+
+def test_retrieve_excludes_and_limits():
+    vectors = clustered(10)
+    rows = [(str(i), vector, 'new-model') for i, vector in enumerate(vectors)]
+    embedder = Embedder(vectors={'query': vectors[4], 'wide': normalized(np.ones(DIM * 2))})
+    retrieval = RetrievalService(EmbeddingDatabase(rows), embedder)
+
+    expected = exact_top_k(vectors, vectors[4], 10)
+    assert retrieval.retrieve(1, 'query', top_k=3) == expected[:3]
+    assert retrieval.retrieve(1, 'query', top_k=3, exclude=['4']) == [i for i in expected if i != '4'][:3]
+    assert retrieval.retrieve(1, 'wide', top_k=3) == []
+    assert retrieval.retrieve(1, 'unknown', top_k=3) == []
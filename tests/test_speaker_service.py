@@ -0,0 +1,87 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.audio_io import write_wav
+from services.enrolled_index_service import EmbeddingMatrix
+from services.speaker_service import SpeakerService
+
+RATE = 16000
+
+
+def voice(pitch: float, seconds: float = 1.5, seed: int = 0) -> np.ndarray:
+    """Harmonic 'vowel' at a pitch, with a syllable-rate envelope and a little noise"""
+    t = np.arange(int(RATE * seconds)) / RATE
+    signal = sum(np.sin(2 * np.pi * pitch * h * t) / h for h in range(1, 12))
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    noise = np.random.default_rng(seed).normal(0, 0.01, len(t))
+    return (0.2 * signal * envelope + noise).astype(np.float32)
+
+
+@pytest.fixture(scope='module')
+def speaker():
+    return SpeakerService()
+
+
+def test_embedding_shape(speaker):
+    embedding = speaker.embed(voice(120))
+    assert embedding.shape == (speaker.dim,) and embedding.dtype == np.float32
+    assert np.linalg.norm(embedding) == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.parametrize('samples', [np.zeros(RATE * 2, dtype=np.float32), voice(120, seconds=0.2)],
+                         ids=['silence', 'too-short'])
+def test_no_embedding_without_enough_speech(speaker, samples):
+    assert speaker.embed(samples) is None
+
+
+def test_wav_and_samples_agree(speaker, tmp_path):
+    samples = voice(150)
+    path = tmp_path / 'id.wav'
+    write_wav(path, [(samples * 32767).astype('<i2').tobytes()], 1, 2, RATE)
+    assert speaker.similarity(speaker.embed(path), speaker.embed(samples)) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_verify_same_recording(speaker):
+    embedding = speaker.embed(voice(120))
+    accepted, score = speaker.verify(embedding, embedding.copy())
+    assert accepted and score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_verify_threshold(speaker, monkeypatch):
+    enrolled = speaker.embed(voice(120, seed=1))
+    attempt = speaker.embed(voice(120, seed=2))
+    _, score = speaker.verify(attempt, enrolled)
+    monkeypatch.setattr(config, 'SPEAKER_VERIFY_THRESHOLD', score + 0.01)
+    assert speaker.verify(attempt, enrolled) == (False, pytest.approx(score))
+
+
+@pytest.mark.parametrize('dims', [16, 128])
+def test_verify_rejects_other_dimensions(speaker, dims):
+    embedding = speaker.embed(voice(120))
+    enrolled = np.ones(dims, dtype=np.float32) / np.sqrt(dims)
+    assert speaker.verify(embedding, enrolled) == (False, 0.0)
+
+
+def test_identify_needs_a_margin(speaker, monkeypatch):
+    monkeypatch.setattr(config, 'SPEAKER_IDENTIFY_THRESHOLD', 0.5)
+    monkeypatch.setattr(config, 'SPEAKER_IDENTIFY_MARGIN', 0.03)
+    embedding = speaker.embed(voice(120))
+    index = EmbeddingMatrix()
+    index.upsert(1111, embedding)
+    assert speaker.identify(embedding, index)[0] == 1111
+
+    # A second enrolled user as close as the first: no clear winner
+    index.upsert(2222, embedding)
+    user_id, score = speaker.identify(embedding, index)
+    assert user_id is None and score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_identify_ignores_index_of_other_dimensions(speaker):
+    index = EmbeddingMatrix()
+    index.upsert(1111, np.ones(16, dtype=np.float32) / 4)
+    assert speaker.identify(speaker.embed(voice(120)), index) == (None, 0.0)
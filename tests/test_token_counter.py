@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.token_counter import estimate_tokens
+
+
+@pytest.mark.parametrize('text, tokens', [
+    (None, 0),
+    ("", 0),
+    ("hello world", 2),
+    ("Hi, there!", 4),
+    ("internationalization", 3),
+    ("call 5551234567", 5),
+    ("snake_case", 3),
+    ("你好", 2),
+    ("café", 4),
+], ids=['none', 'empty', 'words', 'punctuation', 'long-word', 'digits', 'underscore', 'cjk', 'accented'])
+def test_estimate_tokens(text, tokens):
+    assert estimate_tokens(text) == tokens
+
+
+def test_estimate_grows_with_text():
+    sentence = "The meeting moved to Thursday at 10:30, room 4B. "
+    assert estimate_tokens(sentence * 10) == 10 * estimate_tokens(sentence)
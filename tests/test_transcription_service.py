@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+whisper = pytest.importorskip('whisper')
+torch = pytest.importorskip('torch')
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services import transcription_service
+from services.resource_scheduler import resources
+from services.transcription_service import DEFAULT_THREADS, TranscriptionService, profile_threads
+
+AUDIO = np.zeros(16000, dtype=np.float32)
+
+
+class FakeModel:
+    """Whisper model that records the torch thread count and options of each call"""
+
+    def __init__(self):
+        self.device = SimpleNamespace(type='cpu')
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append((torch.get_num_threads(), options))
+        return {'text': ' hello '}
+
+
+@pytest.fixture
+def transcriber(monkeypatch):
+    monkeypatch.setattr(transcription_service.whisper, 'load_model', lambda name: FakeModel())
+    threads = torch.get_num_threads()
+    yield TranscriptionService('tiny')
+    torch.set_num_threads(threads)
+
+
+def test_profiles_set_their_own_threads(transcriber, monkeypatch):
+    monkeypatch.setattr(config, 'WHISPER_THREADS', 2)
+    monkeypatch.setattr(config, 'WHISPER_ARCHIVE_THREADS', 3)
+
+    for profile in ('conversation', 'archive', 'auth', 'archive', 'conversation'):
+        assert transcriber.transcribe(AUDIO, profile) == 'hello'
+    assert [threads for threads, _ in transcriber.model.calls] == [2, 3, 2, 3, 2]
+
+
+def test_threads_follow_config_changes(transcriber, monkeypatch):
+    monkeypatch.setattr(config, 'WHISPER_THREADS', 2)
+    transcriber.transcribe(AUDIO, 'conversation')
+    monkeypatch.setattr(config, 'WHISPER_THREADS', 1)
+    transcriber.transcribe(AUDIO, 'conversation')
+    assert [threads for threads, _ in transcriber.model.calls] == [2, 1]
+
+
+def test_unset_threads_fall_back_to_torch_default(transcriber, monkeypatch):
+    monkeypatch.setattr(config, 'WHISPER_THREADS', 0)
+    monkeypatch.setattr(config, 'WHISPER_ARCHIVE_THREADS', 0)
+    monkeypatch.setattr(resources, 'cores', {})
+    torch.set_num_threads(1)
+
+    transcriber.transcribe(AUDIO, 'archive')
+    assert transcriber.model.calls[-1][0] == DEFAULT_THREADS
+    assert profile_threads('conversation') == DEFAULT_THREADS
+
+
+def test_threads_override(transcriber, monkeypatch):
+    monkeypatch.setattr(config, 'WHISPER_ARCHIVE_THREADS', 3)
+    transcriber.transcribe(AUDIO, 'archive', threads=1)
+    threads, options = transcriber.model.calls[-1]
+    assert threads == 1
+    assert 'threads' not in options and options['beam_size'] == 5
+
+
+def test_unknown_profile(transcriber):
+    with pytest.raises(ValueError, match='Unknown transcription profile'):
+        transcriber.transcribe(AUDIO, 'fast')
@@ -0,0 +1,176 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# tts_service imports both at module level
+pytest.importorskip('pyaudio')
+pytest.importorskip('pyttsx3')
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services import tts_service
+from services.audio_io import write_wav
+from services.tts_service import Pyttsx3Backend, TTSBackend, TTSService
+
+SENTENCES = [f"This is sentence number {i} of the reply." for i in range(6)]
+
+
+class FakeBackend(TTSBackend):
+    """Concurrent synthesizer whose later sentences finish first"""
+    name = 'fake'
+    concurrent = True
+
+    def synthesize(self, text):
+        time.sleep(0.01 * (len(SENTENCES) - SENTENCES.index(text)))
+        return text.encode(), 16000
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(len(SENTENCES))
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+def test_backend_must_synthesize():
+    class Silent(TTSBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Silent()
+
+
+@pytest.mark.parametrize('lookahead', [0, 1, 3])
+def test_stream_order_and_lookahead(monkeypatch, lookahead):
+    monkeypatch.setattr(config, 'TTS_LOOKAHEAD_SENTENCES', lookahead)
+    service = TTSService(FakeBackend())
+    service.executor = CountingExecutor()
+    in_flight = []
+
+    try:
+        spoken = []
+        for sentence, pcm, rate in service.stream(' '.join(SENTENCES)):
+            # Sentences handed to the consumer, plus the ones being synthesized behind it
+            in_flight.append(service.executor.submitted - len(spoken) - 1)
+            spoken.append(sentence)
+            assert pcm == sentence.encode() and rate == 16000
+    finally:
+        service.cleanup()
+
+    assert spoken == SENTENCES
+    assert in_flight == [min(lookahead, len(SENTENCES) - i - 1) for i in range(len(SENTENCES))]
+
+
+def test_abandoned_stream_cancels_pending(monkeypatch):
+    monkeypatch.setattr(config, 'TTS_LOOKAHEAD_SENTENCES', 2)
+    release = threading.Event()
+    calls = []
+
+    class Blocking(FakeBackend):
+        def synthesize(self, text):
+            calls.append(text)
+            if text != SENTENCES[0]:
+                release.wait(5)
+            return super().synthesize(text)
+
+    service = TTSService(Blocking())
+    service.executor = ThreadPoolExecutor(1)
+    stream = service.stream(' '.join(SENTENCES))
+    assert next(stream)[0] == SENTENCES[0]
+    deadline = time.monotonic() + 5
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    stream.close()
+    release.set()
+    service.cleanup()
+
+    # The one already running finishes; the queued one never starts
+    assert calls == SENTENCES[:2]
+
+
+class FakeEngine:
+    """pyttsx3 engine that records which thread each call comes from, like SAPI5/NSSS care about"""
+
+    def __init__(self, content=None):
+        self.content = content
+        self.threads = [threading.get_ident()]
+        self.properties = {'voices': []}
+        self.queued = []
+
+    def _called(self):
+        self.threads.append(threading.get_ident())
+
+    def setProperty(self, name, value):
+        self._called()
+        self.properties[name] = value
+
+    def getProperty(self, name):
+        self._called()
+        return self.properties[name]
+
+    def save_to_file(self, text, path):
+        self._called()
+        self.queued.append((text, path))
+
+    def runAndWait(self):
+        self._called()
+        for text, path in self.queued:
+            if self.content is None:
+                pcm = np.full(len(text), 1000, dtype='<i2').tobytes()
+                write_wav(path, [pcm], 1, 2, 22050)
+            elif self.content:
+                Path(path).write_bytes(self.content)
+        self.queued = []
+
+    def stop(self):
+        self._called()
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engines = []
+
+    def init(*args, **kwargs):
+        engines.append(FakeEngine())
+        return engines[-1]
+
+    monkeypatch.setattr(tts_service.pyttsx3, 'init', init, raising=False)
+    return engines
+
+
+def test_pyttsx3_engine_stays_on_one_thread(engine, monkeypatch):
+    monkeypatch.setattr(config, 'TTS_LOOKAHEAD_SENTENCES', 3)
+    monkeypatch.setattr(config, 'TTS_SYNTH_WORKERS', 4)
+    service = TTSService(Pyttsx3Backend())
+    try:
+        spoken = [(sentence, pcm, rate) for sentence, pcm, rate in service.stream(' '.join(SENTENCES))]
+        service.set_voice(0)
+    finally:
+        service.cleanup()
+
+    assert [sentence for sentence, _, _ in spoken] == SENTENCES
+    for sentence, pcm, rate in spoken:
+        assert rate == 22050
+        assert np.frombuffer(pcm, dtype='<i2').tolist() == [999] * len(sentence)
+    # Created, driven and stopped from the same thread, which is not the caller's
+    threads = set(engine[0].threads)
+    assert len(threads) == 1 and threading.get_ident() not in threads
+
+
+@pytest.mark.parametrize('content, error', [(b'', RuntimeError), (b'OggS' + bytes(40), ValueError)])
+def test_pyttsx3_rejects_unreadable_output(engine, content, error):
+    backend = Pyttsx3Backend()
+    engine[0].content = content
+    try:
+        with pytest.raises(error):
+            backend.synthesize(SENTENCES[0])
+    finally:
+        backend.close()
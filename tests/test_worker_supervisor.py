@@ -0,0 +1,83 @@
+import gc
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+from config.config import config
+from services.worker_supervisor import WorkerSupervisor, heartbeat, preload
+
+
+def working(slot: int):
+    while True:
+        heartbeat()
+        time.sleep(0.05)
+
+
+def deadlocked(slot: int):
+    # The process stays up (and its relay thread runs), but the worker never gets anywhere
+    threading.Event().wait()
+
+
+@pytest.mark.parametrize('target, hung', [(working, False), (deadlocked, True)], ids=['working', 'deadlocked'])
+def test_heartbeats_follow_progress(monkeypatch, target, hung):
+    monkeypatch.setattr(config, 'WORKER_HEARTBEAT_SECONDS', 0.05)
+    monkeypatch.setattr(config, 'WORKER_HEARTBEAT_TIMEOUT', 1.0)
+    # No restart of the killed worker before the test ends
+    monkeypatch.setattr(config, 'WORKER_RESTART_BACKOFF_SECONDS', 10.0)
+    supervisor = WorkerSupervisor(target, workers=1)
+    threading.Timer(2.0, supervisor.stop).start()
+
+    supervisor.run()
+
+    assert supervisor.stats['spawned'] >= 1
+    assert (supervisor.stats['hung'] > 0) is hung
+
+
+def test_workers_share_preloaded_model(monkeypatch):
+    """Workers forked after preload() transcribe with the parent's model, without loading their own"""
+    pytest.importorskip('whisper')
+    monkeypatch.setattr(config, 'WORKER_HEARTBEAT_SECONDS', 0.05)
+    transcriber = preload()
+    model = id(transcriber.model)
+    reports_read, reports_write = os.pipe()
+
+    def target(slot: int):
+        text = transcriber.transcribe(np.zeros(16000, dtype=np.float32), 'conversation')
+        os.write(reports_write, f"{slot} {id(transcriber.model)} {gc.get_freeze_count()} {text!r}\n".encode())
+        while True:
+            heartbeat()
+            time.sleep(0.05)
+
+    supervisor = WorkerSupervisor(target, workers=2)
+    reports = []
+
+    def collect():
+        with os.fdopen(reports_read) as f:
+            for line in f:
+                reports.append(line.split(' ', 3))
+                if len(reports) == 2:
+                    break
+        supervisor.stop()
+
+    collector = threading.Thread(target=collect, daemon=True)
+    collector.start()
+    threading.Timer(30.0, supervisor.stop).start()
+    try:
+        supervisor.run()
+    finally:
+        os.close(reports_write)
+        gc.unfreeze()
+    collector.join(5)
+
+    assert sorted(slot for slot, *_ in reports) == ['0', '1']
+    for _, worker_model, frozen, text in reports:
+        assert int(worker_model) == model
+        assert int(frozen) > 0
+        assert text.strip() != repr('')
+    assert supervisor.stats['spawned'] == 2